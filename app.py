@@ -1,142 +1,212 @@
-import streamlit as st
-import pymysql
-import pandas as pd
-import time
-import matplotlib.pyplot as plt
-from streamlit_autorefresh import st_autorefresh
-from datetime import datetime
-import pytz
-
-# Streamlit Page Configuration
-st.set_page_config(
-    page_title="Twitch Map Tracking Dashboard",
-    page_icon="🎮",
-    layout="wide"
-)
-
-# Auto-refresh every 10 seconds
-st_autorefresh(interval=10 * 1000, limit=None, key="autorefresh")
-
-st.markdown("## 🎮 Twitch Map Tracking Dashboard")
-st.write("Live tracking of maps detected from Twitch streams.")
-
-# Database Configuration
-# load DB credentials from environment
-DB_CONFIG = {
-    "host":     os.environ.get("MYSQL_HOST"),
-    "user":     os.environ.get("MYSQL_USER"),
-    "password": os.environ.get("MYSQL_PASSWORD"),
-    "database": os.environ.get("MYSQL_DATABASE"),
-}
-
-# Database Connection Function
-def connect_to_db(retries=3, delay=5):
-    for attempt in range(1, retries + 1):
-        try:
-            connection = pymysql.connect(
-                host=DB_CONFIG["host"],
-                user=DB_CONFIG["user"],
-                password=DB_CONFIG["password"],
-                database=DB_CONFIG["database"],
-                cursorclass=pymysql.cursors.DictCursor,
-                connect_timeout=10,
-            )
-            return connection
-        except pymysql.MySQLError as e:
-            st.error(f"Database connection failed (Attempt {attempt}/{retries}): {e}")
-            if attempt < retries:
-                time.sleep(delay)
-    st.error("All connection attempts failed. Check database status and credentials.")
-    return None
-
-# Fetch data from the database
-def fetch_data():
-    connection = connect_to_db()
-    if not connection:
-        return None
-
-    try:
-        with connection.cursor() as cursor:
-            cursor.execute("SELECT * FROM twitch_maps ORDER BY timestamp DESC")
-            data = cursor.fetchall()
-
-        return pd.DataFrame(data) if data else None
-
-    except pymysql.MySQLError as e:
-        st.error(f"Database query failed: {e}")
-        return None
-
-    finally:
-        connection.close()
-
-# Main App
-# Load and filter data
-df = fetch_data()
-
-if df is not None and not df.empty:
-    # Sidebar filters
-    st.sidebar.header("Filter Options")
-    streamer_options = ["All"] + sorted(df["streamer"].unique())
-    map_options = ["All"] + sorted(df["map"].unique())
-
-    selected_streamer = st.sidebar.selectbox("Streamer", streamer_options)
-    selected_map = st.sidebar.selectbox("Map", map_options)
-
-    if selected_streamer != "All":
-        df = df[df["streamer"] == selected_streamer]
-    if selected_map != "All":
-        df = df[df["map"] == selected_map]
-
-    # Metric summary
-    col_a, col_b, col_c = st.columns(3)
-    col_a.metric("🧠 Total Detections", len(df))
-    col_b.metric("🗺️ Unique Maps", df["map"].nunique())
-    col_c.metric("📺 Unique Streamers", df["streamer"].nunique())
-
-    # Tabbed layout for content
-    tab1, tab2, tab3 = st.tabs(["📍 Latest Detection", "📊 Stats", "📅 Table"])
-
-    with tab1:
-        non_unknown_df = df[df["map"] != "Unknown Map"]
-        if not non_unknown_df.empty:
-            latest_row = non_unknown_df.iloc[0]
-
-            # Convert timestamp to EST
-            utc_time = pd.to_datetime(latest_row['timestamp']).tz_localize('UTC')
-            est_time = utc_time.tz_convert('US/Eastern')
-            formatted_time = est_time.strftime('%b %d, %-I:%M %p EST')
-
-            st.markdown(f"**{latest_row['streamer']} on {latest_row['map']} at {formatted_time}**")
-            st.image(latest_row["storage_path"], use_container_width=True)
-        else:
-            st.markdown("_No non-unknown map detections available yet._")
-            st.image(latest_row["storage_path"], use_container_width=True)
-
-    with tab2:
-        col1, col2 = st.columns(2)
-
-        with col1:
-            st.markdown("#### Top 5 Streamers")
-            top_streamers = df["streamer"].value_counts().head(5)
-            fig, ax = plt.subplots()
-            top_streamers.plot(kind="bar", ax=ax)
-            ax.set_ylabel("Detections")
-            ax.set_yticklabels(ax.get_yticklabels(), rotation=0)
-            plt.tight_layout()
-            st.pyplot(fig)
-
-        with col2:
-            st.markdown("#### Most Detected Maps")
-            top_maps = df[df["map"] != "Unknown Map"]["map"].value_counts().sort_values(ascending=True)
-            fig, ax = plt.subplots()
-            top_maps.plot(kind="barh", color="orange", ax=ax)
-            ax.set_ylabel("Frequency")
-            ax.set_xticklabels(ax.get_xticklabels(), rotation=30, ha='right')
-            plt.tight_layout()
-            st.pyplot(fig)
-
-    with tab3:
-        st.dataframe(df.reset_index(drop=True))    
-
-else:
-    st.warning(" No data available yet. Please wait for new data.")
\ No newline at end of file
+import os
+import io
+import streamlit as st
+import pymysql
+import pandas as pd
+import time
+import matplotlib.pyplot as plt
+from streamlit_autorefresh import st_autorefresh
+from datetime import datetime, timedelta
+import pytz
+from dashboard_data import DashboardData, MIN_REFRESH_INTERVAL
+from storage import thumbnail_path
+
+# Streamlit Page Configuration
+st.set_page_config(
+    page_title="Twitch Map Tracking Dashboard",
+    page_icon="🎮",
+    layout="wide"
+)
+
+# Auto-refresh every 10 seconds
+st_autorefresh(interval=10 * 1000, limit=None, key="autorefresh")
+
+st.markdown("## 🎮 Twitch Map Tracking Dashboard")
+st.write("Live tracking of maps detected from Twitch streams.")
+
+# Database Configuration
+# load DB credentials from environment
+DB_CONFIG = {
+    "host":     os.environ.get("MYSQL_HOST"),
+    "user":     os.environ.get("MYSQL_USER"),
+    "password": os.environ.get("MYSQL_PASSWORD"),
+    "database": os.environ.get("MYSQL_DATABASE"),
+}
+
+# Database Connection Function
+def connect_to_db(retries=3, delay=5):
+    for attempt in range(1, retries + 1):
+        try:
+            connection = pymysql.connect(
+                host=DB_CONFIG["host"],
+                user=DB_CONFIG["user"],
+                password=DB_CONFIG["password"],
+                database=DB_CONFIG["database"],
+                cursorclass=pymysql.cursors.DictCursor,
+                connect_timeout=10,
+            )
+            return connection
+        except pymysql.MySQLError as e:
+            st.error(f"Database connection failed (Attempt {attempt}/{retries}): {e}")
+            if attempt < retries:
+                time.sleep(delay)
+    st.error("All connection attempts failed. Check database status and credentials.")
+    return None
+
+# One connection shared by every session; DashboardData serializes its use
+@st.cache_resource
+def get_connection():
+    connection = connect_to_db()
+    if connection is None:
+        # raising keeps the failed attempt out of the cache so the next rerun retries
+        raise pymysql.MySQLError("no database connection")
+    return connection
+
+# Rollup queries and the latest-detection tracker, shared across reruns and sessions
+@st.cache_resource
+def get_dashboard_data():
+    return DashboardData(get_connection)
+
+# Query results are shared by every session for a few seconds
+@st.cache_data(ttl=MIN_REFRESH_INTERVAL, show_spinner=False)
+def load_options():
+    return get_dashboard_data().options()
+
+@st.cache_data(ttl=MIN_REFRESH_INTERVAL, max_entries=256, show_spinner=False)
+def load_summary(start, end, streamer, map_name):
+    return get_dashboard_data().summary(start, end, streamer, map_name)
+
+@st.cache_data(ttl=MIN_REFRESH_INTERVAL, max_entries=256, show_spinner=False)
+def load_table(start, end, streamer, map_name):
+    return get_dashboard_data().table(start, end, streamer, map_name)
+
+# Screenshot thumbnail written by the tracker, or the full image for screenshots stored before
+# thumbnails existed; None once the screenshot was evicted (or while it is still being written)
+@st.cache_data(ttl=MIN_REFRESH_INTERVAL, max_entries=64, show_spinner=False)
+def load_screenshot(path):
+    for candidate in (thumbnail_path(path), path):
+        try:
+            with open(candidate, "rb") as f:
+                return f.read()
+        except OSError:
+            continue
+    return None
+
+# Dates are picked in Eastern time; rollup hours and timestamps are stored in UTC
+EASTERN = pytz.timezone("US/Eastern")
+DEFAULT_RANGE_DAYS = 7
+
+def eastern_date(utc_datetime):
+    return pytz.utc.localize(utc_datetime).astimezone(EASTERN).date()
+
+def utc_midnight(day):
+    return EASTERN.localize(datetime.combine(day, datetime.min.time())).astimezone(pytz.utc).replace(tzinfo=None)
+
+# Charts are rendered once per distinct set of counts
+@st.cache_data(max_entries=64, show_spinner=False)
+def render_top_streamers(labels, values):
+    fig, ax = plt.subplots()
+    pd.Series(values, index=labels).plot(kind="bar", ax=ax)
+    ax.set_ylabel("Detections")
+    ax.set_yticklabels(ax.get_yticklabels(), rotation=0)
+    plt.tight_layout()
+    return figure_png(fig)
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def render_top_maps(labels, values):
+    fig, ax = plt.subplots()
+    pd.Series(values, index=labels).plot(kind="barh", color="orange", ax=ax)
+    ax.set_ylabel("Frequency")
+    ax.set_xticklabels(ax.get_xticklabels(), rotation=30, ha='right')
+    plt.tight_layout()
+    return figure_png(fig)
+
+def figure_png(fig):
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png")
+    plt.close(fig)
+    return buffer.getvalue()
+
+# Main App
+# Load and filter data
+try:
+    streamers, maps, (first_hour, last_hour) = load_options()
+except pymysql.MySQLError as e:
+    st.error(f"Database query failed: {e}")
+    st.stop()
+
+if streamers:
+    # Sidebar filters
+    st.sidebar.header("Filter Options")
+    streamer_options = ["All"] + streamers
+    map_options = ["All"] + maps
+
+    selected_streamer = st.sidebar.selectbox("Streamer", streamer_options)
+    selected_map = st.sidebar.selectbox("Map", map_options)
+
+    first_day = eastern_date(first_hour)
+    last_day = max(eastern_date(last_hour), datetime.now(EASTERN).date())
+    default_start = max(first_day, last_day - timedelta(days=DEFAULT_RANGE_DAYS - 1))
+    date_range = st.sidebar.date_input("Date range", value=(default_start, last_day), min_value=first_day, max_value=last_day)
+    # the picker returns a single date while the end is still being chosen
+    start_day, end_day = (date_range[0], date_range[-1]) if date_range else (default_start, last_day)
+    range_start, range_end = utc_midnight(start_day), utc_midnight(end_day + timedelta(days=1))
+
+    try:
+        summary = load_summary(range_start, range_end, selected_streamer, selected_map)
+        latest_row, latest_known = get_dashboard_data().latest(selected_streamer, selected_map)
+    except pymysql.MySQLError as e:
+        st.error(f"Database query failed: {e}")
+        st.stop()
+
+    # Metric summary
+    col_a, col_b, col_c = st.columns(3)
+    col_a.metric("🧠 Total Detections", summary["total"])
+    col_b.metric("🗺️ Unique Maps", summary["unique_maps"])
+    col_c.metric("📺 Unique Streamers", summary["unique_streamers"])
+
+    # Tabbed layout for content
+    tab1, tab2, tab3 = st.tabs(["📍 Latest Detection", "📊 Stats", "📅 Table"])
+
+    with tab1:
+        if latest_known:
+            # Convert timestamp to EST
+            utc_time = pd.to_datetime(latest_row['timestamp']).tz_localize('UTC')
+            est_time = utc_time.tz_convert('US/Eastern')
+            formatted_time = est_time.strftime('%b %d, %-I:%M %p EST')
+
+            st.markdown(f"**{latest_row['streamer']} on {latest_row['map']} at {formatted_time}**")
+        else:
+            st.markdown("_No non-unknown map detections available yet._")
+        if latest_row is not None and latest_row["storage_path"]:
+            screenshot = load_screenshot(latest_row["storage_path"])
+            if screenshot is not None:
+                st.image(screenshot)
+            else:
+                st.caption("Screenshot no longer stored.")
+
+    with tab2:
+        col1, col2 = st.columns(2)
+
+        with col1:
+            st.markdown("#### Top 5 Streamers")
+            top_streamers = summary["top_streamers"]
+            st.image(render_top_streamers(tuple(top_streamers.index), tuple(top_streamers.tolist())))
+
+        with col2:
+            st.markdown("#### Most Detected Maps")
+            top_maps = summary["top_maps"]
+            st.image(render_top_maps(tuple(top_maps.index), tuple(top_maps.tolist())))
+
+    with tab3:
+        try:
+            table = load_table(range_start, range_end, selected_streamer, selected_map)
+        except pymysql.MySQLError as e:
+            st.error(f"Database query failed: {e}")
+            table = None
+        if table is not None:
+            st.caption(f"Newest {len(table)} matching rows between {start_day:%b %d} and {end_day:%b %d}.")
+            st.dataframe(table)
+
+else:
+    st.warning(" No data available yet. Please wait for new data.")
@@ -0,0 +1,333 @@
+# per-streamer stream quality calibration and cached objective ROI geometry
+#
+# instead of always pulling "best", each streamer's renditions are sampled from the lowest up: a
+# rendition is accepted once the objective banner detects as the same map it does at "best", and
+# the cheapest accepted one is cached in a JSON file with its resolution, ROI crop coordinates and
+# the measured download rate and decode CPU of it and of "best". A streamer is recalibrated when
+# its frames arrive at a different resolution, when the banner keeps showing text that no longer
+# detects (layout change), or when its entry is older than RECALIBRATE_AFTER. The objective crop
+# uses the cached ROI while frames arrive at the calibrated resolution.
+#
+#   python calibration.py shroud Kephrii    # calibrate these streamers now
+#   python calibration.py --path /tmp/other_calibration.json --backend pytesseract shroud
+import json
+import os
+import queue
+import re
+import subprocess
+import threading
+import time
+from functools import lru_cache
+import numpy as np
+
+from grabber import FrameGrabber
+
+# objective banner as fractions of the frame: top, bottom, left, right
+ROI_FRACTIONS = (0.032, 0.093, 0.013, 0.313)
+
+CALIBRATION_PATH = "/tmp/twitch_maps_calibration.json"
+
+# renditions below this height are never tried, the banner text is unreadable there
+MIN_HEIGHT = 360
+
+# frames sampled per rendition and the time allowed to get them (stream startup included)
+SAMPLE_FRAMES = 3
+SAMPLE_TIMEOUT = 30
+
+# a rendition passes when this many of its frames detect the reference map and none detect another
+MIN_AGREEING = 2
+
+# entries older than this are recalibrated, streamers whose banner is hidden are retried after
+# CALIBRATION_RETRY, and one streamer is never recalibrated more often than MIN_RECALIBRATE_INTERVAL
+RECALIBRATE_AFTER = 7 * 24 * 3600
+CALIBRATION_RETRY = 300
+MIN_RECALIBRATE_INTERVAL = 3600
+
+# this many samples in a row whose ROI has text (by TEXT_THRESHOLD pixels) but detect as Unknown
+# Map point to a layout change
+LAYOUT_MISSES = 12
+TEXT_THRESHOLD = 200
+MIN_TEXT_FRACTION = 0.01
+
+UNKNOWN_MAP = "Unknown Map"
+QUALITY_RE = re.compile(r"^(\d+)p(\d+)?$")
+
+
+# pixel bounds of the objective banner for one frame size, computed once per size
+@lru_cache(maxsize=32)
+def roi_bounds(height, width):
+    top, bottom, left, right = ROI_FRACTIONS
+    return int(height * top), int(height * bottom), int(width * left), int(width * right)
+
+
+# rendition names from streamlink sorted cheapest first, e.g. ["360p", "480p", "720p60", "1080p60"]
+def list_renditions(stream_url):
+    try:
+        result = subprocess.run(["streamlink", "--json", stream_url], capture_output=True, text=True, timeout=30)
+        streams = json.loads(result.stdout).get("streams", {})
+    except (OSError, subprocess.TimeoutExpired, ValueError) as e:
+        print(f"Unable to list renditions for {stream_url}: {e}")
+        return []
+    renditions = []
+    for name in streams:
+        match = QUALITY_RE.match(name)
+        if match:
+            renditions.append((int(match.group(1)), int(match.group(2) or 30), name))
+    return [name for _, _, name in sorted(renditions)]
+
+
+def rendition_height(name):
+    match = QUALITY_RE.match(name)
+    return int(match.group(1)) if match else None
+
+
+# share of ROI pixels bright enough to be banner text
+def text_fraction(roi):
+    return np.count_nonzero(roi > TEXT_THRESHOLD) / max(roi.size, 1)
+
+
+class CalibrationCache:
+    # per-streamer entries persisted as JSON:
+    # {"quality", "width", "height", "roi", "reference_map", "calibrated_at", "measurements": {quality: usage}}
+    def __init__(self, path=CALIBRATION_PATH):
+        self.path = path
+        self.entries = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            try:
+                with open(path) as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable calibration file {path}: {e}")
+
+    def get(self, streamer):
+        with self._lock:
+            return self.entries.get(streamer)
+
+    def quality(self, streamer, default="best"):
+        entry = self.get(streamer)
+        return entry["quality"] if entry else default
+
+    # streamlink quality argument, falling back to best if the calibrated rendition disappears
+    def streamlink_quality(self, streamer):
+        quality = self.quality(streamer)
+        return quality if quality == "best" else f"{quality},best"
+
+    # measured (decode cores, Mbit/s) of the streamer's calibrated rendition, None if not calibrated
+    def stream_cost(self, streamer):
+        entry = self.get(streamer)
+        usage = entry["measurements"].get(entry["quality"]) if entry else None
+        if not usage:
+            return None
+        return usage["cpu_per_second"], usage["bytes_per_second"] * 8 / 1e6
+
+    # the streamer's objective ROI (top, bottom, left, right) for frames of this size, None unless it
+    # was calibrated at this resolution; entries may be edited by hand for streams with an unusual layout
+    def roi(self, streamer, height, width):
+        entry = self.get(streamer)
+        if not entry or not entry.get("roi") or (entry["width"], entry["height"]) != (width, height):
+            return None
+        return tuple(entry["roi"])
+
+    # copy of every entry, for reports
+    def snapshot(self):
+        with self._lock:
+            return dict(self.entries)
+
+    def store(self, streamer, entry):
+        with self._lock:
+            self.entries[streamer] = entry
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.entries, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+
+
+class Calibrator:
+    # detect(frame) returns the best map for a BGR frame; on_quality(streamer, quality) is called
+    # when a streamer's chosen rendition changes; grabber_options go to the sampling FrameGrabbers
+    def __init__(self, cache, detect, on_quality=None, stream_url=None, **grabber_options):
+        self.cache = cache
+        self.detect = detect
+        self.on_quality = on_quality
+        self.stream_url = stream_url
+        self.grabber_options = grabber_options
+        self.misses = {}
+        self.last_attempt = {}
+        self._pending = set()
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="calibrator", daemon=True)
+        self._thread.start()
+
+    def url_for(self, streamer):
+        return self.stream_url or f"https://www.twitch.tv/{streamer}"
+
+    # queues a calibration unless one is pending or the streamer was tried too recently
+    def request(self, streamer, reason, min_interval=MIN_RECALIBRATE_INTERVAL):
+        with self._lock:
+            if streamer in self._pending or time.time() - self.last_attempt.get(streamer, 0) < min_interval:
+                return False
+            self._pending.add(streamer)
+        print(f"Calibrating stream quality for {streamer} ({reason}).")
+        self._queue.put(streamer)
+        return True
+
+    # calibrates live streamers that have no entry or a stale one
+    def ensure(self, streamers):
+        now = time.time()
+        for streamer in streamers:
+            entry = self.cache.get(streamer)
+            if entry is None:
+                self.request(streamer, "not calibrated", min_interval=CALIBRATION_RETRY)
+            elif now - entry["calibrated_at"] > RECALIBRATE_AFTER:
+                self.request(streamer, "calibration expired")
+
+    # checks one processed frame against the streamer's entry for resolution and layout changes
+    def observe(self, streamer, frame_shape, roi, best_map):
+        entry = self.cache.get(streamer)
+        if entry is None:
+            return
+        height, width = frame_shape[:2]
+        if (width, height) != (entry["width"], entry["height"]):
+            self.request(streamer, f"resolution changed from {entry['width']}x{entry['height']} to {width}x{height}")
+            return
+        if best_map == UNKNOWN_MAP and text_fraction(roi) >= MIN_TEXT_FRACTION:
+            misses = self.misses.get(streamer, 0) + 1
+        else:
+            misses = 0
+        self.misses[streamer] = misses
+        if misses >= LAYOUT_MISSES:
+            self.misses[streamer] = 0
+            self.request(streamer, f"{misses} unreadable banners in a row")
+
+    def _run(self):
+        while True:
+            streamer = self._queue.get()
+            if streamer is None:
+                return
+            try:
+                self.calibrate(streamer)
+            except Exception as e:
+                print(f"Calibration for {streamer} failed: {e}")
+            finally:
+                with self._lock:
+                    self._pending.discard(streamer)
+                    self.last_attempt[streamer] = time.time()
+
+    # grabs SAMPLE_FRAMES distinct frames at one rendition, returns (frames, usage)
+    def sample(self, streamer, quality):
+        grabber = FrameGrabber(streamer, quality=quality, stream_url=self.url_for(streamer), **self.grabber_options)
+        grabber.start()
+        frames, last_time = [], None
+        deadline = time.time() + SAMPLE_TIMEOUT
+        try:
+            while len(frames) < SAMPLE_FRAMES and time.time() < deadline:
+                latest = grabber.latest_frame()
+                if latest is not None and latest[1] != last_time:
+                    frames.append(latest[0])
+                    last_time = latest[1]
+                time.sleep(0.2)
+        finally:
+            grabber.stop()
+        usage = grabber.resource_usage()
+        seconds = max(usage["seconds"], 1e-6)
+        return frames, {"bytes_per_second": usage["bytes"] / seconds, "cpu_per_second": usage["cpu_seconds"] / seconds}
+
+    # samples "best" for the reference map, then renditions from the cheapest up; returns the entry or None
+    def calibrate(self, streamer):
+        frames, best_usage = self.sample(streamer, "best")
+        if not frames:
+            print(f"Calibration for {streamer}: no frames from the stream.")
+            return None
+        detections = [self.detect(frame) for frame in frames]
+        known = [m for m in detections if m != UNKNOWN_MAP]
+        if len(known) < MIN_AGREEING or len(set(known)) > 1:
+            print(f"Calibration for {streamer}: no stable objective banner at best ({detections}), retrying later.")
+            return None
+        reference = known[0]
+        height, width = frames[0].shape[:2]
+        measurements = {"best": dict(best_usage, width=width, height=height)}
+        chosen = "best"
+        for quality in list_renditions(self.url_for(streamer)):
+            quality_height = rendition_height(quality)
+            if quality_height is None or quality_height < MIN_HEIGHT or quality_height >= height:
+                continue
+            candidate_frames, usage = self.sample(streamer, quality)
+            results = [self.detect(frame) for frame in candidate_frames]
+            if candidate_frames:
+                h, w = candidate_frames[0].shape[:2]
+                measurements[quality] = dict(usage, width=w, height=h, detections=results)
+            agreeing = sum(1 for m in results if m == reference)
+            wrong = sum(1 for m in results if m not in (reference, UNKNOWN_MAP))
+            print(f"Calibration for {streamer}: {quality} read {agreeing}/{len(results)} banners as {reference}.")
+            if agreeing >= MIN_AGREEING and not wrong:
+                chosen, height, width = quality, h, w
+                break
+        entry = {
+            "quality": chosen,
+            "width": width,
+            "height": height,
+            "roi": list(roi_bounds(height, width)),
+            "reference_map": reference,
+            "calibrated_at": time.time(),
+            "measurements": measurements,
+        }
+        previous = self.cache.quality(streamer, default=None)
+        self.cache.store(streamer, entry)
+        self.misses[streamer] = 0
+        print(f"Calibration for {streamer}: using {chosen} ({width}x{height}).")
+        if chosen != previous and self.on_quality is not None:
+            self.on_quality(streamer, chosen)
+        return entry
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join(timeout=1)
+
+
+# bytes/s and decode CPU saved per streamer: the chosen rendition's calibration sample against
+# best, plus the live grabbers' measured rates when available
+def print_savings(cache, grabbers=None):
+    entries = cache.snapshot()
+    print(f"\nCalibration: {len(entries)} streamers")
+    for streamer in sorted(entries, key=str.lower):
+        entry = entries[streamer]
+        best = entry["measurements"].get("best", {})
+        chosen = entry["measurements"].get(entry["quality"], best)
+        line = f" - {streamer}: {entry['quality']} ({entry['width']}x{entry['height']})"
+        if best.get("bytes_per_second") and chosen is not best:
+            saved_bytes = 1 - chosen["bytes_per_second"] / best["bytes_per_second"]
+            saved_cpu = 1 - chosen["cpu_per_second"] / best["cpu_per_second"] if best.get("cpu_per_second") else 0.0
+            line += (f", {chosen['bytes_per_second'] * 8 / 1e6:.2f} vs {best['bytes_per_second'] * 8 / 1e6:.2f} Mbit/s "
+                     f"({saved_bytes:.0%} saved), decode CPU {chosen['cpu_per_second']:.0%} vs {best['cpu_per_second']:.0%} "
+                     f"({saved_cpu:.0%} saved)")
+        grabber = grabbers.get(streamer) if grabbers is not None else None
+        if grabber is not None:
+            usage = grabber.resource_usage()
+            if usage["seconds"] > 0:
+                line += (f"; live {usage['bytes'] / usage['seconds'] * 8 / 1e6:.2f} Mbit/s, "
+                         f"decode CPU {usage['cpu_seconds'] / usage['seconds']:.0%}")
+        print(line)
+
+
+if __name__ == "__main__":
+    import argparse
+    # imported here: detection imports roi_bounds from this module
+    import detection
+    parser = argparse.ArgumentParser(description="Calibrate stream quality for the given streamers now.")
+    parser.add_argument("streamers", nargs="+")
+    parser.add_argument("--path", default=os.environ.get("CALIBRATION_PATH", CALIBRATION_PATH),
+                        help="calibration file, main.py's CALIBRATION_PATH")
+    parser.add_argument("--backend", default="tesserocr", help="OCR backend, main.py's OCR_BACKEND")
+    args = parser.parse_args()
+    ocr = detection.objective_ocr_pool(args.backend, 0)
+    cache = CalibrationCache(args.path)
+    calibrator = Calibrator(cache, lambda frame: detection.detect_frame(ocr, frame))
+    try:
+        for streamer in args.streamers:
+            calibrator.calibrate(streamer)
+        print_savings(cache)
+    finally:
+        calibrator.close()
+        ocr.close()
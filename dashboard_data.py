@@ -0,0 +1,162 @@
+# dashboard queries shared by every session
+#
+# counts, filter options and date ranges come from the hourly rollups (see rollups.py), so they cost
+# the same however large twitch_maps grows. Raw rows are only read for the newest detection per
+# (streamer, map), tracked incrementally from the id high-water mark, and for the bounded table
+# view, which the (streamer, timestamp) / (map, timestamp) / (timestamp) indexes serve; the first
+# newest-per-pair lookup is answered from the (streamer, map, id) index.
+import threading
+import time
+from collections import Counter
+import pandas as pd
+from rollups import DETECTIONS_TABLE, ROLLUP_TABLE
+
+UNKNOWN_MAP = "Unknown Map"
+
+# rows shown in the table view
+TABLE_LIMIT = 1000
+
+# rows fetched per query while catching up on new detections
+FETCH_CHUNK = 10000
+
+# ids below the watermark that are re-read each refresh, so rows from a transaction that committed
+# after a later one (several writers) are still picked up
+REREAD_WINDOW = 1000
+
+# sessions refreshing within this many seconds of each other share one query
+MIN_REFRESH_INTERVAL = 5
+
+COLUMNS = ["id", "streamer", "timestamp", "map", "storage_path"]
+
+
+# "AND streamer = %s AND map = %s" for the sidebar selection, "All" leaves a column unfiltered
+def selection_filter(streamer, map_name):
+    clauses, params = [], []
+    if streamer != "All":
+        clauses.append("streamer = %s")
+        params.append(streamer)
+    if map_name != "All":
+        clauses.append("map = %s")
+        params.append(map_name)
+    return "".join(f" AND {clause}" for clause in clauses), params
+
+
+class DashboardData:
+    # connect() returns a pymysql connection with DictCursor; it's shared, so every query holds the lock
+    def __init__(self, connect, detections=DETECTIONS_TABLE, rollup=ROLLUP_TABLE):
+        self.connect = connect
+        self.detections = detections
+        self.rollup = rollup
+        self.watermark = 0
+        self.loaded = False
+        self.seen_ids = set()
+        self.latest_by_pair = {}
+        self.refreshed_at = 0.0
+        self.lock = threading.Lock()
+
+    def _query(self, sql, params=()):
+        connection = self.connect()
+        connection.ping(reconnect=True)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    # streamers, maps and the (first, last) hour that have any detections
+    def options(self):
+        with self.lock:
+            streamers = [row["streamer"] for row in self._query(f"SELECT DISTINCT streamer FROM {self.rollup} ORDER BY streamer")]
+            maps = [row["map"] for row in self._query(f"SELECT DISTINCT map FROM {self.rollup} ORDER BY map")]
+            bounds = self._query(f"SELECT MIN(hour) AS first_hour, MAX(hour) AS last_hour FROM {self.rollup}")[0]
+        return streamers, maps, (bounds["first_hour"], bounds["last_hour"])
+
+    # metrics and chart data for [start, end) and the sidebar selection
+    def summary(self, start, end, streamer="All", map_name="All"):
+        where, params = selection_filter(streamer, map_name)
+        with self.lock:
+            groups = self._query(
+                f"SELECT streamer, map, SUM(detections) AS detections FROM {self.rollup} "
+                f"WHERE hour >= %s AND hour < %s{where} GROUP BY streamer, map",
+                [start, end] + params,
+            )
+        streamer_counts = Counter()
+        map_counts = Counter()
+        for g in groups:
+            streamer_counts[g["streamer"]] += int(g["detections"])
+            if g["map"] != UNKNOWN_MAP:
+                map_counts[g["map"]] += int(g["detections"])
+        return {
+            "total": sum(streamer_counts.values()),
+            "unique_maps": len({g["map"] for g in groups}),
+            "unique_streamers": len(streamer_counts),
+            "top_streamers": pd.Series(dict(streamer_counts.most_common(5)), dtype="int64"),
+            "top_maps": pd.Series(dict(map_counts), dtype="int64").sort_values(ascending=True),
+        }
+
+    # newest TABLE_LIMIT raw rows in [start, end) for the selection
+    def table(self, start, end, streamer="All", map_name="All", limit=TABLE_LIMIT):
+        where, params = selection_filter(streamer, map_name)
+        with self.lock:
+            rows = self._query(
+                f"SELECT * FROM {self.detections} WHERE timestamp >= %s AND timestamp < %s{where} "
+                f"ORDER BY timestamp DESC LIMIT %s",
+                [start, end] + params + [limit],
+            )
+        return pd.DataFrame(rows, columns=COLUMNS) if rows else pd.DataFrame(columns=COLUMNS)
+
+    # newest detection for the selection, preferring a known map; (row, is_known)
+    def latest(self, streamer="All", map_name="All"):
+        with self.lock:
+            self._refresh_latest()
+            rows = [
+                row for (s, m), row in self.latest_by_pair.items()
+                if (streamer == "All" or s == streamer) and (map_name == "All" or m == map_name)
+            ]
+        known = [row for row in rows if row["map"] != UNKNOWN_MAP]
+        if known:
+            return max(known, key=lambda row: row["id"]), True
+        if rows:
+            return max(rows, key=lambda row: row["id"]), False
+        return None, False
+
+    # pulls rows above the watermark into latest_by_pair, at most once per MIN_REFRESH_INTERVAL
+    def _refresh_latest(self):
+        if time.time() - self.refreshed_at < MIN_REFRESH_INTERVAL:
+            return
+        if not self.loaded:
+            self._initial_load()
+        else:
+            self._fetch_new()
+        self.refreshed_at = time.time()
+
+    def _initial_load(self):
+        last_ids = [row["last_id"] for row in self._query(f"SELECT MAX(id) AS last_id FROM {self.detections} GROUP BY streamer, map")]
+        self.latest_by_pair = {}
+        if last_ids:
+            placeholders = ", ".join(["%s"] * len(last_ids))
+            for row in self._query(f"SELECT * FROM {self.detections} WHERE id IN ({placeholders})", last_ids):
+                self.latest_by_pair[(row["streamer"], row["map"])] = row
+        # rows inserted after the GROUP BY are left for the first incremental fetch
+        self.watermark = max(last_ids or [0])
+        self.seen_ids = {row["id"] for row in self._query(
+            f"SELECT id FROM {self.detections} WHERE id > %s AND id <= %s", (self.watermark - REREAD_WINDOW, self.watermark))}
+        # an empty table is loaded too; its first rows arrive through _fetch_new
+        self.loaded = True
+
+    def _fetch_new(self):
+        start_id = max(self.watermark - REREAD_WINDOW, 0)
+        while True:
+            fetched = self._query(f"SELECT * FROM {self.detections} WHERE id > %s ORDER BY id LIMIT %s", (start_id, FETCH_CHUNK))
+            if not fetched:
+                return
+            for row in fetched:
+                if row["id"] in self.seen_ids:
+                    continue
+                self.seen_ids.add(row["id"])
+                pair = (row["streamer"], row["map"])
+                if pair not in self.latest_by_pair or row["id"] > self.latest_by_pair[pair]["id"]:
+                    self.latest_by_pair[pair] = row
+            start_id = fetched[-1]["id"]
+            self.watermark = max(self.watermark, start_id)
+            self.seen_ids = {i for i in self.seen_ids if i > self.watermark - REREAD_WINDOW}
+            if len(fetched) < FETCH_CHUNK:
+                return
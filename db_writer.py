@@ -0,0 +1,273 @@
+# pooled, batched detection writer that never blocks the capture threads
+#
+# rows go into a bounded queue and a background thread flushes them with executemany once
+# BATCH_SIZE rows are waiting or FLUSH_INTERVAL seconds have passed. Flushes that fail because
+# MySQL is unreachable are retried with backoff and then appended to a local JSON-lines spill file,
+# which is replayed into MySQL after the next successful flush. A batch MySQL rejects (bad data,
+# duplicate keys, schema errors) is written row by row instead, and the rows it rejects for good
+# are moved to a separate rejected-rows file rather than retried.
+#
+# after_insert(cursor, rows) runs inside each batch's transaction (rollups.apply_detections keeps the
+# hourly dashboard counts in step with the raw rows this way).
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+import mysql.connector
+from mysql.connector import pooling
+
+BATCH_SIZE = 100
+FLUSH_INTERVAL = 2.0
+MAX_QUEUED_ROWS = 10000
+POOL_SIZE = 2
+
+# retry delays double from RETRY_DELAY for MAX_RETRIES attempts before rows are spilled
+MAX_RETRIES = 3
+RETRY_DELAY = 0.5
+
+SPILL_PATH = "/tmp/twitch_maps_spill.jsonl"
+
+# errors that mean MySQL is unreachable rather than that it refused the rows
+TRANSIENT_ERRORS = (mysql.connector.errors.OperationalError, mysql.connector.errors.InterfaceError,
+                    mysql.connector.errors.PoolError)
+
+# seconds close() waits for the queue to take the stop marker and for the writer to finish
+CLOSE_TIMEOUT = 30
+
+INSERT_QUERY = "INSERT INTO {table} (streamer, timestamp, map, storage_path) VALUES (%s, %s, %s, %s)"
+
+
+# rejected rows go next to the spill file, e.g. /tmp/twitch_maps_spill_rejected.jsonl
+def rejected_path_for(spill_path):
+    return os.path.splitext(spill_path)[0] + "_rejected.jsonl"
+
+
+# p-th percentile of an already sorted list
+def percentile(values, p):
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+class DetectionWriter:
+    # insert_query is formatted with the table name, submit() takes one value per placeholder;
+    # on_stage(stage, seconds, streamer, error) is told how long each flush took ("flush_<table>")
+    def __init__(self, db_config, table="twitch_maps", spill_path=SPILL_PATH, batch_size=BATCH_SIZE,
+                 flush_interval=FLUSH_INTERVAL, max_queued=MAX_QUEUED_ROWS, pool_size=POOL_SIZE, after_insert=None,
+                 insert_query=INSERT_QUERY, on_stage=None, rejected_path=None):
+        self.db_config = db_config
+        self.table = table
+        self.after_insert = after_insert
+        self.on_stage = on_stage
+        self.query = insert_query.format(table=table)
+        self.spill_path = spill_path
+        self.rejected_path = rejected_path or rejected_path_for(spill_path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.pool_size = pool_size
+        self.rows_written = 0
+        self.rows_spilled = 0
+        self.rows_replayed = 0
+        self.rows_dropped = 0
+        self.flush_latencies = deque(maxlen=1000)
+        self.started = time.time()
+        self._pool = None
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._spill_lock = threading.Lock()
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self._thread.start()
+
+    # queues one row (streamer, timestamp, map, storage_path by default), spilling straight to disk if the queue is full
+    def submit(self, *row):
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self._spill([row])
+
+    def _run(self):
+        while True:
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    row = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if row is None:
+                    self._closed.set()
+                    break
+                batch.append(row)
+            if batch:
+                # a bad row or a full disk must not take the writer thread down with it
+                try:
+                    self._flush(batch)
+                except Exception as e:
+                    print(f"Unexpected error writing {len(batch)} rows to {self.table}: {e!r}")
+                    self._spill(batch)
+            if self._closed.is_set():
+                return
+
+    # the pool is created lazily so the tracker starts even while MySQL is down
+    def _get_connection(self):
+        if self._pool is None:
+            self._pool = pooling.MySQLConnectionPool(pool_name=f"{self.table}_writer", pool_size=self.pool_size, **self.db_config)
+        return self._pool.get_connection()
+
+    # one executemany (plus the after_insert hook) in a single transaction
+    def _insert(self, rows):
+        conn = self._get_connection()
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.executemany(self.query, rows)
+                if self.after_insert is not None:
+                    self.after_insert(cursor, rows)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+        finally:
+            conn.close()
+
+    def _flush(self, rows):
+        start = time.perf_counter()
+        delay = RETRY_DELAY
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                self._insert(rows)
+                break
+            except TRANSIENT_ERRORS as err:
+                print(f"Database error writing {len(rows)} rows (attempt {attempt + 1}/{MAX_RETRIES + 1}): {err}")
+                if attempt == MAX_RETRIES:
+                    self._spill(rows)
+                    if self.on_stage is not None:
+                        self.on_stage(f"flush_{self.table}", time.perf_counter() - start, "", True)
+                    return
+                time.sleep(delay)
+                delay *= 2
+            except mysql.connector.Error as err:
+                print(f"{self.table} rejected a batch of {len(rows)} rows ({err}), writing them one by one")
+                written, unwritten = self._isolate(rows)
+                self.rows_written += written
+                if unwritten:
+                    self._spill(unwritten)
+                if self.on_stage is not None:
+                    self.on_stage(f"flush_{self.table}", time.perf_counter() - start, "", True)
+                return
+        self.flush_latencies.append(time.perf_counter() - start)
+        if self.on_stage is not None:
+            self.on_stage(f"flush_{self.table}", self.flush_latencies[-1], "", False)
+        self.rows_written += len(rows)
+        print(f"Inserted {len(rows)} rows into {self.table} in {(time.perf_counter() - start) * 1000:.1f} ms")
+        self._replay_spill()
+
+    # writes a batch MySQL rejected one row at a time, moving the rows it rejects for good to the
+    # rejected-rows file; returns the number of rows written and the rows left unwritten when MySQL
+    # became unreachable part way
+    def _isolate(self, rows):
+        written = 0
+        for i, row in enumerate(rows):
+            try:
+                self._insert([row])
+            except TRANSIENT_ERRORS as err:
+                print(f"Database error writing rows one by one: {err}")
+                return written, rows[i:]
+            except Exception as e:
+                self._reject([row], e)
+                continue
+            written += 1
+        return written, []
+
+    # rows MySQL can never take; they count as dropped whether or not the file write succeeds
+    def _reject(self, rows, error):
+        self.rows_dropped += len(rows)
+        print(f"Rejected {len(rows)} rows for {self.table} ({error!r}), moving them to {self.rejected_path}")
+        try:
+            with open(self.rejected_path, "a") as f:
+                for row in rows:
+                    f.write(json.dumps(row, default=str) + "\n")
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Unable to write rejected rows to {self.rejected_path}: {e}")
+
+    def _spill(self, rows):
+        try:
+            with self._spill_lock:
+                with open(self.spill_path, "a") as f:
+                    for row in rows:
+                        f.write(json.dumps(row, default=str) + "\n")
+                self.rows_spilled += len(rows)
+        except (OSError, TypeError, ValueError) as e:
+            self.rows_dropped += len(rows)
+            print(f"Unable to spill {len(rows)} rows to {self.spill_path}, dropping them: {e}")
+            return
+        print(f"MySQL unavailable, spilled {len(rows)} rows to {self.spill_path}")
+
+    # moves the spill file aside and inserts it in batches, re-spilling the rest once MySQL is
+    # unreachable again and rejecting rows it refuses (a .replaying file left behind by a crash is
+    # picked up first)
+    def _replay_spill(self):
+        replay_path = self.spill_path + ".replaying"
+        with self._spill_lock:
+            if not os.path.exists(replay_path):
+                if not os.path.exists(self.spill_path):
+                    return
+                os.replace(self.spill_path, replay_path)
+        with open(replay_path) as f:
+            rows = [tuple(json.loads(line)) for line in f if line.strip()]
+        print(f"MySQL is back, replaying {len(rows)} spilled rows...")
+        for start in range(0, len(rows), self.batch_size):
+            batch = rows[start:start + self.batch_size]
+            try:
+                self._insert(batch)
+            except TRANSIENT_ERRORS as err:
+                print(f"Database error replaying spilled rows: {err}")
+                self._spill(rows[start:])
+                break
+            except Exception as e:
+                # only the rows MySQL refuses are set aside, the rest of the spill keeps replaying
+                print(f"{self.table} rejected {len(batch)} spilled rows ({e!r}), replaying them one by one")
+                written, unwritten = self._isolate(batch)
+                self.rows_replayed += written
+                if unwritten:
+                    self._spill(unwritten + rows[start + self.batch_size:])
+                    break
+                continue
+            self.rows_replayed += len(batch)
+        os.remove(replay_path)
+
+    def print_report(self):
+        elapsed = time.time() - self.started
+        latencies = sorted(self.flush_latencies)
+        print(f"DB writer ({self.table}): {self.rows_written} rows ({self.rows_written / elapsed:.1f} rows/s), "
+              f"flush p50 {percentile(latencies, 50) * 1000:.1f} ms p95 {percentile(latencies, 95) * 1000:.1f} ms, "
+              f"{self._queue.qsize()} queued, {self.rows_spilled} spilled, {self.rows_replayed} replayed, {self.rows_dropped} dropped")
+
+    # flushes everything still queued and stops the writer thread; rows a dead writer left queued
+    # are spilled
+    def close(self, timeout=CLOSE_TIMEOUT):
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            print(f"DB writer ({self.table}) queue still full after {timeout}s, not waiting for it")
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            print(f"DB writer ({self.table}) did not finish within {timeout}s, {self._queue.qsize()} rows left queued")
+            return
+        leftover = []
+        while True:
+            try:
+                row = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if row is not None:
+                leftover.append(row)
+        if leftover:
+            self._spill(leftover)
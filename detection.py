@@ -0,0 +1,84 @@
+# OCR-to-map detection steps shared by main.py and the offline tools
+#
+# importing this module only compiles the objective matcher; OCR pools are created and passed in
+# by the caller, so tools/replay.py and the calibration CLI can run the same steps as main.py
+# without starting its scheduler, writers, grabbers and screenshot store.
+import re
+import cv2
+
+from calibration import roi_bounds
+from matcher import ObjectiveMatcher
+from objectives import MAP_OBJECTIVES, SUPER_HIGH_VALUE_WORDS, HIGH_VALUE_WORDS
+from ocr import OcrPool, objective_charset, objective_words
+
+UNKNOWN_MAP = "Unknown Map"
+
+# OCR / Fuzzy Matching
+CONFIDENCE_THRESHOLD = 60
+MIN_WORDS_REQUIRED = 3
+# words at least this confident count towards MIN_WORDS_REQUIRED
+HIGH_CONFIDENCE = 80
+
+# "compat" reproduces the validated substring scoring exactly, "token" only matches whole words
+MATCH_MODE = "compat"
+
+# objective matcher compiled once at import time
+MATCHER = ObjectiveMatcher(MAP_OBJECTIVES, SUPER_HIGH_VALUE_WORDS, HIGH_VALUE_WORDS, mode=MATCH_MODE)
+
+
+# OCR pool restricted to the characters and words of the objective texts
+def objective_ocr_pool(backend, workers):
+    return OcrPool(backend, workers, whitelist=objective_charset(MAP_OBJECTIVES), user_words=objective_words(MAP_OBJECTIVES))
+
+
+# crops the objective banner from a BGR frame, converting only the crop to grayscale; bounds are
+# (top, bottom, left, right), proportional to the frame size unless given
+def crop_objective_roi(image, bounds=None):
+    top, bottom, left, right = bounds or roi_bounds(*image.shape[:2])
+    return cv2.cvtColor(image[top:bottom, left:right], cv2.COLOR_BGR2GRAY)
+
+
+# runs OCR on the grayscale objective ROI and returns confident words
+def ocr_phrases(ocr, cropped_region):
+    extracted_phrases = []
+    for text, conf in ocr.recognize(cropped_region):
+        text = text.strip()
+        if text and conf >= CONFIDENCE_THRESHOLD:
+            extracted_phrases.append((text, conf))
+    return extracted_phrases
+
+
+# basic cleaning to normalize extracted text
+def clean_text(text):
+    text = text.lower()
+    text = text.replace(".", "")
+    text = text.replace("-", " ")
+    text = text.replace("'", "")
+    text = re.sub(r"\s+", " ", text).strip()
+    return text
+
+
+# scores and matches recognized words to map objectives
+def detect_map(phrases, matcher=MATCHER):
+    high_conf_words = [word for word, conf in phrases if conf >= HIGH_CONFIDENCE]
+    if len(high_conf_words) < MIN_WORDS_REQUIRED:
+        return [(UNKNOWN_MAP, 0)]
+    extracted_text = " ".join([p[0] for p in phrases])
+    cleaned_ocr = clean_text(extracted_text)
+    recognized_words = set(cleaned_ocr.split())
+    keyword_matches = matcher.match(recognized_words)
+    if keyword_matches:
+        return keyword_matches
+    return [(UNKNOWN_MAP, 0)]
+
+
+# top match of detect_map, or Unknown Map when nothing scored
+def best_map(maps_detected):
+    if not maps_detected or maps_detected[0][1] == 0:
+        return UNKNOWN_MAP
+    return maps_detected[0][0]
+
+
+# best map for a single frame, used to calibrate stream quality
+def detect_frame(ocr, frame, bounds=None):
+    return best_map(detect_map(ocr_phrases(ocr, crop_objective_roi(frame, bounds))))
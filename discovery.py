@@ -0,0 +1,194 @@
+# Marvel Rivals stream discovery and capture selection within a compute budget
+#
+# instead of polling a fixed list, every refresh pages the Helix game listing (/streams?game_id=,
+# most watched first) into a set of live candidates. Streams that go offline or switch games drop
+# out of the listing and are not polled again. Pinned streamers (STREAMERS in main.py) are looked
+# up by login when the listing is cut short before them.
+#
+# Each plan picks the candidates to capture within a CPU and bandwidth budget. Pinned streamers
+# come first, then streams still inside their MIN_DWELL window, then the rest by
+#   VIEWER_WEIGHT * log10(1 + viewers) + STALENESS_WEIGHT * min(time since last sampled, MAX_STALENESS) / MAX_STALENESS
+# so popular streams get most of the capacity while streams nobody sampled for a while take turns.
+# Per-stream cost comes from the streamer's calibration measurements when there are any.
+import math
+import time
+
+from helix import MARVEL_RIVALS_GAME_ID, is_playing_rivals
+
+# pages of 100 streams listed per refresh
+MAX_PAGES = 5
+
+# capture budget: cores for decoding and OCR, download Mbit/s, and concurrent streams
+CPU_BUDGET = 4.0
+BANDWIDTH_BUDGET_MBPS = 200.0
+MAX_STREAMS = 64
+
+# cost of a stream without calibration measurements: ffmpeg decoding 1 fps of a 1080p60 stream,
+# plus OCR of one sample every few seconds (added to measured costs too)
+DEFAULT_DECODE_CPU = 0.15
+DEFAULT_BANDWIDTH_MBPS = 6.0
+OCR_CPU = 0.05
+
+# priority weights; staleness stops growing after MAX_STALENESS seconds
+VIEWER_WEIGHT = 1.0
+STALENESS_WEIGHT = 2.0
+MAX_STALENESS = 1800
+
+# a selected stream is kept this long so its match state can settle before it is rotated out
+MIN_DWELL = 180
+
+# coverage is reported as streams sampled within this many seconds
+COVERAGE_WINDOW = 3600
+
+
+class Candidate:
+    def __init__(self, login, name):
+        self.login = login
+        # name used by the rest of the tracker: the pinned spelling, or the Helix login
+        self.name = name
+        self.viewers = 0
+        self.pinned = False
+        self.last_sampled = None
+        self.selected_at = None
+
+
+class StreamDiscovery:
+    # helix is a HelixClient; cost_of(streamer) returns measured (cores, Mbit/s) or None
+    def __init__(self, helix, game_id=MARVEL_RIVALS_GAME_ID, pinned=(), max_pages=MAX_PAGES, cpu_budget=CPU_BUDGET,
+                 bandwidth_budget=BANDWIDTH_BUDGET_MBPS, max_streams=MAX_STREAMS, cost_of=None,
+                 viewer_weight=VIEWER_WEIGHT, staleness_weight=STALENESS_WEIGHT, min_dwell=MIN_DWELL, clock=time.time):
+        self.helix = helix
+        self.game_id = game_id
+        self.pinned = {name.lower(): name for name in pinned}
+        self.max_pages = max_pages
+        self.cpu_budget = cpu_budget
+        self.bandwidth_budget = bandwidth_budget
+        self.max_streams = max_streams
+        self.cost_of = cost_of
+        self.viewer_weight = viewer_weight
+        self.staleness_weight = staleness_weight
+        self.min_dwell = min_dwell
+        self.clock = clock
+        self.candidates = {}
+        # last sample time of streams that dropped out, so one that comes back keeps its staleness
+        self.history = {}
+        self.selected = []
+        self.cpu_used = 0.0
+        self.bandwidth_used = 0.0
+        self.refreshes = 0
+        self.failed_refreshes = 0
+
+    # all live candidates, for the sharding roster
+    def streamers(self):
+        return sorted(candidate.name for candidate in self.candidates.values())
+
+    # re-lists live streams; on a failed listing the previous candidates are kept
+    def refresh(self):
+        streams = self.helix.get_game_streams(self.game_id, self.max_pages)
+        if streams is None:
+            self.failed_refreshes += 1
+            return False
+        self.refreshes += 1
+        now = self.clock()
+        live = {}
+        for stream in streams:
+            login = stream.get("user_login", "").lower()
+            # a stream that moved up while paging is listed twice
+            if login and stream.get("type", "live") == "live":
+                live.setdefault(login, int(stream.get("viewer_count") or 0))
+        missing = [name for login, name in self.pinned.items() if login not in live]
+        if missing:
+            statuses = self.helix.get_stream_statuses(missing)
+            for name in missing:
+                login = name.lower()
+                if is_playing_rivals(statuses[name]):
+                    live[login] = int(statuses[name]["viewer_count"] or 0)
+                elif statuses[name]["failed"] and login in self.candidates:
+                    # the lookup failed, so a pinned stream that was live stays a candidate
+                    live[login] = self.candidates[login].viewers
+        selected = set(self.selected)
+        for login in list(self.candidates):
+            if login not in live:
+                dropped = self.candidates.pop(login)
+                self.history[login] = now if dropped.name in selected else dropped.last_sampled
+        for login, viewers in live.items():
+            candidate = self.candidates.get(login)
+            if candidate is None:
+                candidate = self.candidates[login] = Candidate(login, self.pinned.get(login, login))
+                candidate.last_sampled = self.history.pop(login, None)
+                candidate.pinned = login in self.pinned
+            candidate.viewers = viewers
+        window = max(MAX_STALENESS, COVERAGE_WINDOW)
+        self.history = {login: sampled for login, sampled in self.history.items()
+                        if sampled is not None and now - sampled < window}
+        return True
+
+    # (cores, Mbit/s) capturing the streamer is expected to take
+    def cost(self, streamer):
+        measured = self.cost_of(streamer) if self.cost_of is not None else None
+        cpu, bandwidth = measured or (DEFAULT_DECODE_CPU, DEFAULT_BANDWIDTH_MBPS)
+        return cpu + OCR_CPU, bandwidth
+
+    def priority(self, candidate, now):
+        staleness = MAX_STALENESS if candidate.last_sampled is None else min(now - candidate.last_sampled, MAX_STALENESS)
+        return self.viewer_weight * math.log10(1 + candidate.viewers) + self.staleness_weight * staleness / MAX_STALENESS
+
+    # picks the streams to capture from the candidates (only those in allowed, when given)
+    def plan(self, allowed=None):
+        now = self.clock()
+        previous = set(self.selected)
+        allowed = set(allowed) if allowed is not None else None
+        pool = []
+        for candidate in self.candidates.values():
+            # streams selected last time were sampled up to now
+            if candidate.name in previous:
+                candidate.last_sampled = now
+            if allowed is None or candidate.name in allowed:
+                pool.append(candidate)
+            else:
+                candidate.selected_at = None
+
+        def order(candidate):
+            dwelling = candidate.selected_at is not None and now - candidate.selected_at < self.min_dwell
+            return not candidate.pinned, not dwelling, -self.priority(candidate, now)
+
+        selected = []
+        cpu = bandwidth = 0.0
+        for candidate in sorted(pool, key=order):
+            stream_cpu, stream_bandwidth = self.cost(candidate.name)
+            if (len(selected) >= self.max_streams or cpu + stream_cpu > self.cpu_budget
+                    or bandwidth + stream_bandwidth > self.bandwidth_budget):
+                if candidate.pinned:
+                    print(f"Capture budget exhausted, pinned streamer {candidate.name} is not sampled.")
+                # a cheaper stream further down may still fit
+                candidate.selected_at = None
+                continue
+            selected.append(candidate)
+            cpu += stream_cpu
+            bandwidth += stream_bandwidth
+            if candidate.selected_at is None:
+                candidate.selected_at = now
+        self.selected = [candidate.name for candidate in selected]
+        self.cpu_used = cpu
+        self.bandwidth_used = bandwidth
+        return self.selected
+
+    # selected streams worth calibrating: pinned ones and those kept past their dwell window on
+    # priority, not the ones only taking a short turn
+    def settled(self):
+        now = self.clock()
+        selected = set(self.selected)
+        return [candidate.name for candidate in self.candidates.values() if candidate.name in selected
+                and (candidate.pinned or now - candidate.selected_at >= self.min_dwell)]
+
+    # streams sampled within the last window seconds, live or not
+    def sampled_within(self, window=COVERAGE_WINDOW):
+        now = self.clock()
+        recent = [c.last_sampled for c in self.candidates.values()] + list(self.history.values())
+        return sum(1 for sampled in recent if sampled is not None and now - sampled < window)
+
+    def print_report(self):
+        pinned = sum(1 for candidate in self.candidates.values() if candidate.pinned)
+        print(f"\nDiscovery: {len(self.candidates)} live on Marvel Rivals ({pinned} pinned), sampling {len(self.selected)} "
+              f"({self.cpu_used:.1f}/{self.cpu_budget:.1f} cores, {self.bandwidth_used:.0f}/{self.bandwidth_budget:.0f} Mbit/s), "
+              f"{self.sampled_within()} sampled in the last hour, {self.refreshes} listings ({self.failed_refreshes} failed)")
@@ -0,0 +1,345 @@
+# long-lived streamlink | ffmpeg pipelines that keep the newest decoded frame per streamer
+import os
+import re
+import subprocess
+import threading
+import time
+import numpy as np
+
+# frames per second ffmpeg decodes and hands over, the detector only needs a few per interval
+GRABBER_FPS = 1
+
+# restart backoff after the pipeline drops
+RESTART_DELAY = 2
+MAX_RESTART_DELAY = 60
+
+# a pipeline that ran this long is considered healthy again and resets the backoff
+HEALTHY_RUNTIME = 60
+
+# a pipeline that is up but hasn't produced a frame for this long (e.g. a hung streamlink) is
+# killed and restarted
+STALL_TIMEOUT = 30
+
+# a pipeline whose ffmpeg hasn't reported its output size by then is restarted
+OUTPUT_SIZE_TIMEOUT = 60
+
+# ffmpeg prints the rawvideo output geometry on stderr, e.g. "bgr24(progressive), 1280x720 [SAR 1:1 DAR 16:9]"
+OUTPUT_SIZE_RE = re.compile(r"\s(\d{2,5})x(\d{2,5})\b")
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+# (bytes read, CPU seconds) of a live process from /proc, None where /proc isn't available
+def process_usage(pid):
+    try:
+        with open(f"/proc/{pid}/io") as f:
+            io = dict(line.split(": ") for line in f.read().splitlines())
+        with open(f"/proc/{pid}/stat") as f:
+            # fields after the parenthesised command name; utime and stime are the 12th and 13th
+            fields = f.read().rsplit(")", 1)[1].split()
+    except (OSError, ValueError):
+        return None
+    return int(io["rchar"]), (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+
+
+class FrameGrabber:
+    # input_args replaces the streamlink pipe with a direct ffmpeg input, e.g. a lavfi test source;
+    # on_stage(stage, seconds, streamer, error) is told the startup time ("stream_start", spawn to
+    # first frame) and runtime of every pipeline that drops ("stream_drop"); stall_timeout=None
+    # never restarts a pipeline that is still running
+    def __init__(self, streamer, quality="best", fps=GRABBER_FPS, stream_url=None, input_args=None, on_stage=None,
+                 stall_timeout=STALL_TIMEOUT):
+        self.streamer = streamer
+        self.quality = quality
+        self.fps = fps
+        self.stream_url = stream_url or f"https://www.twitch.tv/{streamer}"
+        self.input_args = input_args
+        self.on_stage = on_stage
+        self.stall_timeout = stall_timeout
+        self.frame = None
+        self.frame_time = 0.0
+        self.frame_size = None
+        self.frames_read = 0
+        self.restarts = 0
+        self.stalls = 0
+        # ffmpeg input bytes and decode CPU of pipelines that already exited
+        self.bytes_total = 0
+        self.cpu_total = 0.0
+        self.runtime_total = 0.0
+        self._streamlink = None
+        self._ffmpeg = None
+        self._spawned_at = None
+        self._process_started = None
+        self._lock = threading.Lock()
+        # serializes spawning and terminating the pipeline against stop()
+        self._process_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._supervise, name=f"grabber-{self.streamer}", daemon=True)
+        self._thread.start()
+
+    # the supervisor thread accounts for and reaps the pipeline; it is killed if that takes too long
+    def stop(self, timeout=5):
+        self._stopped.set()
+        self._interrupt()
+        if self._thread is None:
+            return
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            self._interrupt(kill=True)
+            self._thread.join(timeout)
+
+    @property
+    def running(self):
+        return self._ffmpeg is not None and self._ffmpeg.poll() is None
+
+    # newest frame as a BGR ndarray and its capture time, None when missing or older than max_age
+    def latest_frame(self, max_age=None):
+        with self._lock:
+            frame, frame_time = self.frame, self.frame_time
+        if frame is None:
+            return None
+        if max_age is not None and time.time() - frame_time > max_age:
+            return None
+        return frame, frame_time
+
+    # ffmpeg's input bytes (the stream as downloaded) and CPU seconds (decoding) so far, plus runtime
+    def resource_usage(self):
+        bytes_read, cpu, runtime = self.bytes_total, self.cpu_total, self.runtime_total
+        usage = self._current_usage()
+        if usage is not None:
+            bytes_read, cpu, runtime = bytes_read + usage[0], cpu + usage[1], runtime + usage[2]
+        return {"bytes": bytes_read, "cpu_seconds": cpu, "seconds": runtime}
+
+    def _current_usage(self):
+        ffmpeg, started = self._ffmpeg, self._process_started
+        if ffmpeg is None or started is None:
+            return None
+        usage = process_usage(ffmpeg.pid)
+        if usage is None:
+            return None
+        return usage[0], usage[1], time.time() - started
+
+    def _ffmpeg_command(self):
+        source = self.input_args or ["-i", "pipe:0"]
+        return ["ffmpeg", "-hide_banner", "-nostdin", *source, "-an",
+                "-vf", f"fps={self.fps}", "-f", "rawvideo", "-pix_fmt", "bgr24", "pipe:1"]
+
+    def _spawn(self):
+        if self.input_args:
+            self._streamlink = None
+            self._ffmpeg = subprocess.Popen(self._ffmpeg_command(), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            return
+        self._streamlink = subprocess.Popen(
+            ["streamlink", "--twitch-disable-ads", self.stream_url, self.quality, "--stdout"],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        )
+        self._ffmpeg = subprocess.Popen(self._ffmpeg_command(), stdin=self._streamlink.stdout,
+                                        stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        # ffmpeg owns the read end now, so streamlink sees EPIPE when ffmpeg exits
+        self._streamlink.stdout.close()
+
+    # folds the exiting pipeline's usage into the totals (read before it is reaped)
+    def _account(self):
+        usage = self._current_usage()
+        self._process_started = None
+        if usage is not None:
+            self.bytes_total += usage[0]
+            self.cpu_total += usage[1]
+            self.runtime_total += usage[2]
+
+    # spawns a pipeline unless stop() got there first, returns False once stopped
+    def _start_pipeline(self):
+        with self._process_lock:
+            if self._stopped.is_set():
+                return False
+            self._spawn()
+            self._process_started = time.time()
+            return True
+
+    # signals the running pipeline to exit without reaping it, so _supervise can still account for it
+    def _interrupt(self, kill=False):
+        with self._process_lock:
+            for proc in (self._ffmpeg, self._streamlink):
+                if proc is None or proc.returncode is not None:
+                    continue
+                if kill:
+                    proc.kill()
+                else:
+                    proc.terminate()
+
+    def _terminate(self):
+        with self._process_lock:
+            for proc in (self._ffmpeg, self._streamlink):
+                if proc is None or proc.poll() is not None:
+                    continue
+                proc.terminate()
+                try:
+                    proc.wait(timeout=5)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+                    proc.wait()
+
+    # restarts the pipeline with backoff until stop() is called
+    def _supervise(self):
+        delay = RESTART_DELAY
+        while not self._stopped.is_set():
+            started = time.time()
+            self._spawned_at = time.perf_counter()
+            frames_before = self.frames_read
+            try:
+                if not self._start_pipeline():
+                    break
+                if self.stall_timeout is not None:
+                    threading.Thread(target=self._watch_stall, args=(self._ffmpeg, self._process_started),
+                                     daemon=True).start()
+                self._read_frames()
+            except OSError as e:
+                print(f"Error starting frame grabber for {self.streamer}: {e}")
+            finally:
+                self._account()
+                self._terminate()
+            if self._stopped.is_set():
+                break
+            if self.on_stage is not None:
+                if self.frames_read == frames_before:
+                    self.on_stage("stream_start", time.perf_counter() - self._spawned_at, self.streamer, True)
+                else:
+                    self.on_stage("stream_drop", time.time() - started, self.streamer, True)
+            if time.time() - started >= HEALTHY_RUNTIME:
+                delay = RESTART_DELAY
+            self.restarts += 1
+            print(f"Frame grabber for {self.streamer} dropped, restarting in {delay}s...")
+            if self._stopped.wait(delay):
+                break
+            delay = min(delay * 2, MAX_RESTART_DELAY)
+
+    # kills the pipeline when it stays up without producing frames, so _read_frames sees EOF and
+    # _supervise restarts it with the usual backoff
+    def _watch_stall(self, ffmpeg, started):
+        while not self._stopped.wait(min(self.stall_timeout / 4, 5)):
+            if ffmpeg.poll() is not None or ffmpeg is not self._ffmpeg:
+                return
+            idle = time.time() - max(self.frame_time, started)
+            if idle > self.stall_timeout:
+                self.stalls += 1
+                print(f"Frame grabber for {self.streamer} produced no frame for {idle:.0f}s, restarting...")
+                self._interrupt()
+                # a hung ffmpeg that ignores SIGTERM would keep _read_frames blocked
+                if not self._stopped.wait(5) and ffmpeg is self._ffmpeg and ffmpeg.poll() is None:
+                    self._interrupt(kill=True)
+                return
+
+    # parses the output size from ffmpeg's stderr, then keeps draining it so ffmpeg never blocks
+    def _watch_stderr(self, stderr, size_ready):
+        in_output = False
+        for raw in iter(stderr.readline, b""):
+            if size_ready.is_set():
+                continue
+            line = raw.decode("utf-8", "replace")
+            if line.startswith("Output #0"):
+                in_output = True
+            match = OUTPUT_SIZE_RE.search(line) if in_output and "Video:" in line else None
+            if match:
+                self.frame_size = (int(match.group(1)), int(match.group(2)))
+                size_ready.set()
+        size_ready.set()
+
+    def _read_frames(self):
+        self.frame_size = None
+        size_ready = threading.Event()
+        stderr_thread = threading.Thread(target=self._watch_stderr, args=(self._ffmpeg.stderr, size_ready), daemon=True)
+        stderr_thread.start()
+        if not size_ready.wait(OUTPUT_SIZE_TIMEOUT):
+            print(f"Frame grabber for {self.streamer} got no output size from ffmpeg in {OUTPUT_SIZE_TIMEOUT}s, restarting...")
+            return
+        if self.frame_size is None:
+            return
+        width, height = self.frame_size
+        frame_bytes = width * height * 3
+        stdout = self._ffmpeg.stdout
+        while not self._stopped.is_set():
+            # a fresh buffer per frame so callers can keep the previous ndarray without copying
+            buffer = bytearray(frame_bytes)
+            view = memoryview(buffer)
+            filled = 0
+            while filled < frame_bytes:
+                n = stdout.readinto(view[filled:])
+                if not n:
+                    return
+                filled += n
+            frame = np.frombuffer(buffer, dtype=np.uint8).reshape(height, width, 3)
+            with self._lock:
+                self.frame = frame
+                self.frame_time = time.time()
+            if self._spawned_at is not None:
+                if self.on_stage is not None:
+                    self.on_stage("stream_start", time.perf_counter() - self._spawned_at, self.streamer, False)
+                self._spawned_at = None
+            self.frames_read += 1
+
+
+class GrabberPool:
+    # keeps exactly one grabber per streamer that check_online reports live on Marvel Rivals;
+    # quality_for(streamer) picks each streamer's rendition (e.g. from calibration)
+    def __init__(self, quality_for=None, **grabber_options):
+        self.quality_for = quality_for
+        self.grabber_options = grabber_options
+        self.grabbers = {}
+        # sync runs on the main loop, restart on the calibration thread
+        self._lock = threading.Lock()
+
+    def _start(self, streamer):
+        options = dict(self.grabber_options)
+        if self.quality_for is not None:
+            options["quality"] = self.quality_for(streamer)
+        grabber = FrameGrabber(streamer, **options)
+        grabber.start()
+        self.grabbers[streamer] = grabber
+
+    def sync(self, streamers):
+        active = set(streamers)
+        stopping = []
+        with self._lock:
+            for streamer in list(self.grabbers):
+                if streamer not in active:
+                    print(f"Stopping frame grabber for {streamer}.")
+                    stopping.append(self.grabbers.pop(streamer))
+            for streamer in streamers:
+                if streamer not in self.grabbers:
+                    print(f"Starting frame grabber for {streamer}.")
+                    self._start(streamer)
+        stop_grabbers(stopping)
+
+    # restarts a running grabber so it picks up a new quality
+    def restart(self, streamer, quality=None):
+        with self._lock:
+            grabber = self.grabbers.get(streamer)
+            if grabber is None:
+                return
+            print(f"Restarting frame grabber for {streamer} at {quality or 'its configured quality'}.")
+            self._start(streamer)
+        grabber.stop()
+
+    def get(self, streamer):
+        return self.grabbers.get(streamer)
+
+    def stop_all(self):
+        with self._lock:
+            stopping = list(self.grabbers.values())
+            self.grabbers.clear()
+        stop_grabbers(stopping)
+
+
+# stops grabbers in parallel, so each pipeline's terminate timeout doesn't add up
+def stop_grabbers(grabbers):
+    if len(grabbers) == 1:
+        grabbers[0].stop()
+        return
+    threads = [threading.Thread(target=grabber.stop, daemon=True) for grabber in grabbers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
@@ -0,0 +1,167 @@
+# batched Twitch Helix client used by main.py
+import time
+import requests
+
+HELIX_URL = "https://api.twitch.tv/helix"
+
+# Helix accepts at most 100 user_login values per /streams call
+MAX_LOGINS_PER_REQUEST = 100
+
+# Helix game id of Marvel Rivals, for /streams?game_id=
+MARVEL_RIVALS_GAME_ID = "1264310518"
+
+# keep a few points in reserve so other callers on the same token don't hit 429
+RATELIMIT_RESERVE = 2
+# Ratelimit-Reset is whole epoch seconds, so wait a little past it
+RATELIMIT_RESET_SLACK = 1.0
+MAX_RATELIMIT_RETRIES = 3
+
+
+# empty status used for offline streamers and failed lookups; failed marks a streamer whose batch
+# could not be checked, so callers can keep what they knew instead of treating it as offline
+def offline_status(failed=False):
+    return {"live": False, "game_name": "", "started_at": None, "viewer_count": 0, "failed": failed}
+
+
+# Helix logins are case-insensitive; requests and responses are matched on this form
+def normalize_login(login):
+    return login.strip().lower()
+
+
+# parsed JSON body, or None for an error page that isn't JSON (e.g. a 5xx from a proxy)
+def read_json(response):
+    try:
+        return response.json()
+    except ValueError:
+        return None
+
+
+# splits a list into chunks of at most size items
+def chunked(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class HelixClient:
+    # one pooled session per client, reused for every request
+    def __init__(self, client_id, oauth_token, base_url=HELIX_URL, timeout=10):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update({
+            "Client-ID": client_id or "",
+            "Authorization": f"Bearer {oauth_token}",
+        })
+        self.ratelimit_remaining = None
+        self.ratelimit_reset = None
+        self.requests_sent = 0
+
+    # reads Ratelimit-* headers from the last response
+    def _update_ratelimit(self, response):
+        remaining = response.headers.get("Ratelimit-Remaining")
+        reset = response.headers.get("Ratelimit-Reset")
+        try:
+            self.ratelimit_remaining = int(remaining) if remaining is not None else None
+            self.ratelimit_reset = float(reset) if reset is not None else None
+        except ValueError:
+            self.ratelimit_remaining = None
+            self.ratelimit_reset = None
+
+    # sleeps until the bucket refills when we are about to run it dry
+    def _wait_for_ratelimit(self, force=False):
+        if self.ratelimit_reset is None:
+            return
+        if not force and (self.ratelimit_remaining is None or self.ratelimit_remaining > RATELIMIT_RESERVE):
+            return
+        delay = max(self.ratelimit_reset - time.time(), 0) + RATELIMIT_RESET_SLACK
+        print(f"Twitch rate limit nearly exhausted, waiting {delay:.1f}s for reset...")
+        time.sleep(delay)
+        self.ratelimit_remaining = None
+
+    # GET against Helix, backing off on 429 and 5xx instead of failing
+    def get(self, path, params):
+        response = None
+        for attempt in range(MAX_RATELIMIT_RETRIES + 1):
+            self._wait_for_ratelimit(force=attempt > 0)
+            response = self.session.get(f"{self.base_url}{path}", params=params, timeout=self.timeout)
+            self.requests_sent += 1
+            self._update_ratelimit(response)
+            if response.status_code != 429 and response.status_code < 500:
+                break
+            if attempt == MAX_RATELIMIT_RETRIES:
+                break
+            if response.status_code >= 500 or self.ratelimit_reset is None:
+                time.sleep(2 ** attempt)
+        return response
+
+    # returns {streamer: {"live", "game_name", "started_at", "viewer_count", "failed"}} for every name
+    # given, keyed as given; names that differ only in case share one lookup. Streamers in a batch
+    # that failed are offline with "failed" set.
+    def get_stream_statuses(self, streamers):
+        statuses = {streamer: offline_status() for streamer in streamers}
+        by_login = {}
+        for streamer in streamers:
+            by_login.setdefault(normalize_login(streamer), []).append(streamer)
+        for batch in chunked(list(by_login), MAX_LOGINS_PER_REQUEST):
+            try:
+                r = self.get("/streams", [("user_login", login) for login in batch] + [("first", MAX_LOGINS_PER_REQUEST)])
+            except requests.RequestException as e:
+                print(f"Network error checking live status for {len(batch)} streamers: {e}")
+                self._mark_failed(statuses, by_login, batch)
+                continue
+            payload = read_json(r) if r.status_code == 200 else None
+            if payload is None:
+                print(f"Twitch API request failed [{r.status_code}]: {r.text[:200]}")
+                self._mark_failed(statuses, by_login, batch)
+                continue
+            for stream_info in payload.get("data", []):
+                for streamer in by_login.get(normalize_login(stream_info.get("user_login", "")), []):
+                    statuses[streamer] = {
+                        "live": stream_info.get("type", "live") == "live",
+                        "game_name": stream_info.get("game_name", ""),
+                        "started_at": stream_info.get("started_at"),
+                        "viewer_count": stream_info.get("viewer_count", 0),
+                        "failed": False,
+                    }
+        return statuses
+
+    def _mark_failed(self, statuses, by_login, batch):
+        for login in batch:
+            for streamer in by_login[login]:
+                statuses[streamer] = offline_status(failed=True)
+
+    # pages through /streams?game_id= (Helix lists the most watched first), at most max_pages
+    # pages of 100; returns the stream objects, or None if any page fails so callers can keep
+    # their previous listing
+    def get_game_streams(self, game_id, max_pages=None):
+        streams = []
+        cursor = None
+        pages = 0
+        while max_pages is None or pages < max_pages:
+            params = [("game_id", game_id), ("first", MAX_LOGINS_PER_REQUEST)]
+            if cursor:
+                params.append(("after", cursor))
+            try:
+                r = self.get("/streams", params)
+            except requests.RequestException as e:
+                print(f"Network error listing streams for game {game_id}: {e}")
+                return None
+            payload = read_json(r) if r.status_code == 200 else None
+            if payload is None:
+                print(f"Twitch API request failed [{r.status_code}]: {r.text[:200]}")
+                return None
+            data = payload.get("data", [])
+            streams.extend(data)
+            pages += 1
+            cursor = payload.get("pagination", {}).get("cursor")
+            if not cursor or not data:
+                break
+        return streams
+
+    def close(self):
+        self.session.close()
+
+
+# True when a status map entry is live on Marvel Rivals
+def is_playing_rivals(status):
+    return status["live"] and "marvel rivals" in status["game_name"].lower()
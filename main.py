@@ -1,308 +1,503 @@
-# import standard and external libraries
-import os
-import time
-import subprocess
-import requests
-import json
-import cv2
-import pytesseract
-import mysql.connector
-import re
-from fuzzywuzzy import process
-
-# ------------------ ENV / CONFIG ------------------ #
-# Twitch API credentials
-# get Twitch API credentials from environment
-CLIENT_ID = os.environ.get("TWITCH_CLIENT_ID")
-OAUTH_TOKEN = os.environ.get("TWITCH_OAUTH_TOKEN")
-
-# Streamers you want to monitor (comma separated in an env var, or define here as a list)
-# list of streamers to monitor
-STREAMERS = ["dongm1n_", "doomed_ow", "calwya", "GURU", "Gale", "storytimebed", "space", "m4rchgg", "eatinpizzarn", "shroud", "Impuniti", "senorhoff", "Kephrii", "ange1inac", "farpwr", "MaleniaMR", "FullMetalLamp"]
-
-# Database connection info  
-# database connection settings from environment
-DB_CONFIG = {
-    "host":     os.environ.get("MYSQL_HOST"),
-    "user":     os.environ.get("MYSQL_USER"),
-    "password": os.environ.get("MYSQL_PASSWORD"),
-    "database": os.environ.get("MYSQL_DATABASE"),
-}
-
-# Capture interval in seconds
-# how often to check for streamers (in seconds)
-CHECK_INTERVAL = 5
-
-# OCR / Fuzzy Matching
-CONFIDENCE_THRESHOLD = 60
-MIN_WORDS_REQUIRED = 3
-
-# keywords used to boost map confidence
-SUPER_HIGH_VALUE_WORDS = {
-    "draculas", "ratatoskr", "castle", "ritual", "final", "montesi", "vampires", "darkhold",
-    "herbie", "tower", "chronovium", "vibrani", "by", "off", "prison", "field", "force",
-    "knull", "kn", "explosion", "scan", "pages", "scanning", "repair", "master", "weaver",
-    "des", "save", "lokis", "destro", "garden", "bifrost", "archive", "odins", "room",
-    "throne", "eldritch", "monument", "station", "frozen", "airfield", "monitoring", "factory",
-    "laboratory", "soldier", "super", "chrono", "experiment", "area", "vibranium", "ground",
-    "imperial", "dueling", "spaceport", "stellar", "cerebro", "taking", "cradle", "ultrons",
-    "invasion", "carousel", "infecting", "grove", "budokan", "jarnbjorn", "yggdrasill",
-    "device", "tapping", "strive", "team"
-}
-
-HIGH_VALUE_WORDS = {
-    "use", "eliminate", "formula", "sealed", "return", "place", "bast", "meditation",
-    "its", "chamber", "statue", "returning", "islands", "destroy", "essence", "underground",
-    "avengers", "lost", "life", "destiny", "web", "jarnbjorn", "yggdrasill", "tapping",
-    "device", "ultron", "krakoa", "rescue", "rescued", "being", "tower", "zero", "spider"
-}
-
-# Dictionary mapping objectives to maps
-# text-to-map matching dictionary
-MAP_OBJECTIVES = {
-    "Enter Draculas Castle and stop his final ritual Rescue the sealed Ratatoskr": "Central Park Attack",
-    "Enter Draculas Castle and stop his final ritual Stop Draculas final ritual": "Central Park Attack",
-    "Use the Montesi Formula to eliminate all the vampires Prevent Ratatoskr from being rescued": "Central Park Defence",
-    "Use the Montesi Formula to eliminate all the vampires Get the Montesi Formula off Ratatoskr": "Central Park Defence",
-
-    "Help the Statue of Bast Return to Its Place Rescue the Statue of Bast Sealed by the Vibrani Chronovium": "Hall of Djalia Attack",
-    "Help the Statue of Bast Return to Its Place Escort the Statue to the Meditation Chamber": "Hall of Djalia Attack",
-    "Prevent the Statue of Bast From Returning to Its Place Prevent the Statue of Bast From Being Rescued": "Hall of Djalia Defence",
-    "Prevent the Statue of Bast From Returning to Its Place Prevent the Statue From Reaching the Meditation Chamber": "Hall of Djalia Defence",
-
-    "Help Spider Zero Return to the Spider Islands Rescue Spider Zero from the Force Field Prison": "Shinshibuya Attack",
-    "Help Spider Zero Return to the Spider Islands Escort Spider Zero to Budokan": "Shinshibuya Attack",
-    "Stop Spider Zero from Returning to the Spider Islands Stop Spider Zero from Being Rescued": "Shinshibuya Defence",
-    "Stop Spider Zero from Returning to the Spider Islands Stop Spider Zero from reaching Budokan": "Shinshibuya Defence",
-
-    "Escort Knulls Essence to the Underground Prepare to Capture Knulls Essence": "Symbiotic Surface Attack",
-    "Escort Knulls Essence to the Underground Go Underground and Destroy Knull with Knulls Essence": "Symbiotic Surface Attack",
-    "Stop Knulls Essence from Going Underground Stop the Explosion of Knulls Essence to Prevent Kn": "Symbiotic Surface Defence",
-    "Stop Knulls Essence from Going Underground Defend Knulls Essence": "Symbiotic Surface Defence",
-
-    "Help HERBIE scan all the lost pages of the Darkhold Escort HERBIE to Avengers Tower": "Midtown Attack",
-    "Prevent HERBIE from scanning all the lost Prevent HERBIE from reaching the Avengers Tower": "Midtown Defence",
-
-    "Help Spider Zero Repair the Web of Life and Destiny Escort Spider Zero to the Web of Life and Destiny": "Spider Islands Attack",
-    "Help the Master Weaver Save the Web of Life and Des Stop Spider Zero from reaching the Web of Life and Destiny": "Spider Islands Defence",
-
-    "Destroy Lokis Yggdrasill Tapping Device Escort Jarnbjorn to Yggdrasill": "Yggdrasill Path Attack",
-    "Stop the Yggdrasill Tapping Device from Being Destro Prevent Jarnbjorn from Reaching Yggdrasill": "Yggdrasill Path Defence",
-
-    "Capture the Bifrost Garden Prepare to Head to the Bifrost Garden": "Royale Palace Bifrost Garden",
-    "Capture the Bifrost Garden Prepare to Capture the Bifrost Garden": "Royale Palace Bifrost Garden",
-    "Capture the Bifrost Garden Defend the Bifrost Garden": "Royale Palace Bifrost Garden",
-    "Capture the Bifrost Garden Reclaim the Bifrost Garden": "Royale Palace Bifrost Garden",
-    "Capture Odins Archive Prepare to Head to Odins Archive": "Royale Palace Odins Archive",
-    "Capture Odins Archive Prepare to Capture Odins Archive": "Royale Palace Odins Archive",
-    "Capture Odins Archive Defend Odins Archive": "Royale Palace Odins Archive",
-    "Capture Odins Archive Reclaim Odins Archive": "Royale Palace Odins Archive",
-    "Capture the Throne Room Prepare to Head to the Throne Room": "Royale Palace Throne Room",
-    "Capture the Throne Room Prepare to Capture the Throne Room": "Royale Palace Throne Room",
-    "Capture the Throne Room Defend the Throne Room": "Royale Palace Throne Room",
-    "Capture the Throne Room Reclaim the Throne Room": "Royale Palace Throne Room",
-
-    "Capture Eldritch Monument Prepare to Head to Eldritch Monument": "Hells Heaven Eldritch Monument",
-    "Capture Eldritch Monument Prepare to Capture Eldritch Monument": "Hells Heaven Eldritch Monument",
-    "Capture Eldritch Monument Defend Eldritch Monument": "Hells Heaven Eldritch Monument",
-    "Capture Eldritch Monument Reclaim Eldritch Monument": "Hells Heaven Eldritch Monument",
-    "Capture Frozen Airfield Prepare to Head to Frozen Monitoring Station": "Hells Heaven Frozen Airfield",
-    "Capture Frozen Airfield Prepare to Capture Frozen Monitoring Station": "Hells Heaven Frozen Airfield",
-    "Capture Frozen Airfield Defend Frozen Monitoring Station": "Hells Heaven Frozen Airfield",
-    "Capture Frozen Airfield Reclaim Frozen Monitoring Station": "Hells Heaven Frozen Airfield",
-    "Capture Super Soldier Factory Prepare to Head to Super Soldier Laboratory": "Hells Heaven Super Soldier Factory",
-    "Capture Super Soldier Factory Prepare to Capture Super Soldier Laboratory": "Hells Heaven Super Soldier Factory",
-    "Capture Super Soldier Factory Defend Super Soldier Laboratory": "Hells Heaven Super Soldier Factory",
-    "Capture Super Soldier Factory Reclaim Super Soldier Laboratory": "Hells Heaven Super Soldier Factory",
-
-    "Capture the Chrono Vibranium Experiment Area Prepare to Head to the Chrono Vibranium Experiment Area": "Brinin Tchalla Experiment Area",
-    "Capture the Chrono Vibranium Experiment Area Prepare to Capture the Chrono Vibranium Experiment Area": "Brinin Tchalla Experiment Area",
-    "Capture the Chrono Vibranium Experiment Area Defend the Chrono Vibranium Experiment Area": "Brinin Tchalla Experiment Area",
-    "Capture the Chrono Vibranium Experiment Area Reclaim the Chrono Vibranium Experiment Area": "Brinin Tchalla Experiment Area",
-    "Capture the Imperial Dueling Ground Prepare to Head to the Imperial Dueling Ground": "Brinin Tchalla Imperial Dueling Ground",
-    "Capture the Imperial Dueling Ground Prepare to Capture the Imperial Dueling Ground": "Brinin Tchalla Imperial Dueling Ground",
-    "Capture the Imperial Dueling Ground Defend the Imperial Dueling Ground": "Brinin Tchalla Imperial Dueling Ground",
-    "Capture the Imperial Dueling Ground Reclaim the Imperial Dueling Ground": "Brinin Tchalla Imperial Dueling Ground",
-    "Capture the Stellar Spaceport Prepare to Head to the Stellar Spaceport": "Brinin Tchalla Stellar Spaceport",
-    "Capture the Stellar Spaceport Prepare to Capture the Stellar Spaceport": "Brinin Tchalla Stellar Spaceport",
-    "Capture the Stellar Spaceport Defend the Stellar Spaceport": "Brinin Tchalla Stellar Spaceport",
-    "Capture the Stellar Spaceport Reclaim the Stellar Spaceport": "Brinin Tchalla Stellar Spaceport",
-
-    "Capture the Cradle Stop Ultron From Taking Cerebro Prepare to Head to the Cradle": "Krokoa Cradle",
-    "Capture the Cradle Stop Ultron From Taking Cerebro Prepare to Capture the Cradle": "Krokoa Cradle",
-    "Capture the Cradle Stop Ultron From Taking Cerebro Defend the Cradle": "Krokoa Cradle",
-    "Capture the Cradle Stop Ultron From Taking Cerebro Reclaim the Cradle": "Krokoa Cradle",
-    "Capture the Carousel Stop Ultrons Invasion of Krakoa Prepare to Head to the Carousel": "Krokoa Carousel",
-    "Capture the Carousel Stop Ultrons Invasion of Krakoa Prepare to Capture the Carousel": "Krokoa Carousel",
-    "Capture the Carousel Stop Ultrons Invasion of Krakoa Defend the Carousel": "Krokoa Carousel",
-    "Capture the Carousel Stop Ultrons Invasion of Krakoa Reclaim the Carousel": "Krokoa Carousel",
-    "Capture the Grove Stop Ultron From Infecting Krakoa Prepare to Head to The Grove": "Krokoa Grove",
-    "Capture the Grove Stop Ultron From Infecting Krakoa Prepare to Capture The Grove": "Krokoa Grove",
-    "Capture the Grove Stop Ultron From Infecting Krakoa Defend The Grove": "Krokoa Grove",
-    "Capture the Grove Stop Ultron From Infecting Krakoa Reclaim The Grove": "Krokoa Grove",
-
-    "Be the first team to reach 16 points Strive to eliminate more enemies": "Doom match",
-}
-
-# runs OCR on cropped image and returns confident words
-def extract_top_left_text(image_path):
-    image = cv2.imread(image_path)
-    if image is None:
-        print(f"Unable to read image at {image_path}")
-        return []
-
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-
-    # Proportional cropping
-    h, w = gray.shape
-    top = int(h * 0.032)
-    bottom = int(h * 0.093)
-    left = int(w * 0.013)
-    right = int(w * 0.313)
-    cropped_region = gray[top:bottom, left:right]
-
-    ocr_data = pytesseract.image_to_data(cropped_region, config="--psm 6", output_type=pytesseract.Output.DICT)
-    extracted_phrases = []
-    for i in range(len(ocr_data["text"])):
-        text = ocr_data["text"][i].strip()
-        try:
-            conf = int(ocr_data["conf"][i])
-        except ValueError:
-            conf = 0
-        if text and conf >= CONFIDENCE_THRESHOLD:
-            extracted_phrases.append((text, conf))
-    return extracted_phrases
-
-# basic cleaning to normalize extracted text
-def clean_text(text):
-    text = text.lower()
-    text = text.replace(".", "")
-    text = text.replace("-", " ")
-    text = text.replace("'", "")
-    text = re.sub(r"\s+", " ", text).strip()
-    return text
-
-# scores and matches recognized words to map objectives
-def detect_map(phrases):
-    high_conf_words = [word for word, conf in phrases if conf >= 80]
-    if len(high_conf_words) < MIN_WORDS_REQUIRED:
-        return [("Unknown Map", 0)]
-    extracted_text = " ".join([p[0] for p in phrases])
-    cleaned_ocr = clean_text(extracted_text)
-    recognized_words = set(cleaned_ocr.split())
-    keyword_matches = []
-# text-to-map matching dictionary
-    for obj_text, map_name in MAP_OBJECTIVES.items():
-        words_matched = 0
-        super_high_value_count = 0
-        high_value_count = 0
-        for word in recognized_words:
-            if word in obj_text.lower():
-                words_matched += 1
-# keywords used to boost map confidence
-                if word in SUPER_HIGH_VALUE_WORDS:
-                    super_high_value_count += 1
-                elif word in HIGH_VALUE_WORDS:
-                    high_value_count += 1
-        if words_matched > 1:
-            score = 50 + (words_matched * 5) + (high_value_count * 15) + (super_high_value_count * 30)
-            keyword_matches.append((map_name, score))
-    if keyword_matches:
-        return sorted(keyword_matches, key=lambda x: x[1], reverse=True)
-    return [("Unknown Map", 0)]
-
-# saves result to MySQL database
-def save_to_database(streamer, timestamp, detected_map, storage_path):
-    try:
-# database connection settings from environment
-        conn = mysql.connector.connect(**DB_CONFIG)
-        cursor = conn.cursor()
-        query = """INSERT INTO twitch_maps (streamer, timestamp, map, storage_path) VALUES (%s, %s, %s, %s)"""
-        cursor.execute(query, (streamer, timestamp, detected_map, storage_path))
-        conn.commit()
-        print(f"Inserted into DB: {streamer}, {timestamp}, {detected_map}, {storage_path}")
-    except mysql.connector.Error as err:
-        print(f"Database error: {err}")
-    finally:
-        if 'cursor' in locals():
-            cursor.close()
-        if 'conn' in locals():
-            conn.close()
-
-# checks if a streamer is live and playing Marvel Rivals
-def check_online(streamer):
-    url = "https://api.twitch.tv/helix/streams"
-    headers = {
-# get Twitch API credentials from environment
-        "Client-ID": CLIENT_ID,
-        "Authorization": f"Bearer {OAUTH_TOKEN}"
-    }
-    try:
-        r = requests.get(url, headers=headers, params={"user_login": streamer})
-        if r.status_code != 200:
-            print(f"Twitch API request failed [{r.status_code}]: {r.text}")
-            return False
-        data = r.json().get("data", [])
-        if not data:
-            return False
-        stream_info = data[0]
-        game_name = stream_info.get("game_name", "").lower()
-        if "marvel rivals" in game_name:
-            print(f"{streamer} is playing Marvel Rivals.")
-            return True
-        else:
-            print(f"{streamer} is live but playing '{stream_info.get('game_name', 'Unknown')}' instead of Marvel Rivals.")
-            return False
-    except requests.RequestException as e:
-        print(f"Network error checking {streamer} live status: {e}")
-        return False
-
-# captures screenshot, processes OCR, and stores result
-def capture_screenshot(streamer):
-    timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
-    safe_timestamp = timestamp.replace(" ", "_").replace(":", "-")
-    output_file = f"/tmp/{streamer}_{safe_timestamp}.png"
-    stream_url = f"https://www.twitch.tv/{streamer}"
-    try:
-        subprocess.run(
-            f"streamlink --twitch-disable-ads {stream_url} best --stdout | ffmpeg -i pipe:0 -frames:v 1 {output_file}",
-            shell=True,
-            check=True
-        )
-        extracted_phrases = extract_top_left_text(output_file)
-        print("Extracted Text & Confidence Scores:")
-        if extracted_phrases:
-            for text, conf in extracted_phrases:
-                print(f" - '{text}' (Confidence: {conf}%)")
-        else:
-            print(" - No text found above confidence threshold.")
-        maps_detected = detect_map(extracted_phrases)
-        print("\nTop 3 Map Matches (Filtered & Weighted):")
-        if not maps_detected or maps_detected[0][1] == 0:
-            print("No maps detected with high confidence.")
-            best_map = "Unknown Map"
-        else:
-            for i, (map_name, score) in enumerate(maps_detected[:3], 1):
-                print(f"{i}. {map_name} ({score}%)")
-            best_map = maps_detected[0][0]
-        save_to_database(streamer, timestamp, best_map, output_file)
-        print(f"Screenshot saved: {output_file} | Best map: {best_map}\n")
-    except subprocess.CalledProcessError as e:
-        print(f"Error capturing screenshot from {streamer}: {e}")
-    except Exception as e:
-        print(f"Unexpected error: {e}")
-
-# main loop to check all streamers
-def run_loop():
-    while True:
-        for streamer in STREAMERS:
-            if check_online(streamer):
-                print(f"{streamer} is LIVE! Capturing screenshot...")
-                capture_screenshot(streamer)
-            else:
-                print(f"{streamer} is offline.")
-        print(f"\nWaiting {CHECK_INTERVAL} seconds for next check...\n")
-        time.sleep(CHECK_INTERVAL)
-
-if __name__ == "__main__":
+# import standard and external libraries
+import os
+import time
+import subprocess
+import cv2
+import numpy as np
+import mysql.connector
+from helix import HelixClient, HELIX_URL, is_playing_rivals
+from scheduler import CaptureScheduler
+from grabber import GrabberPool
+from storage import ScreenshotWriter
+from roi_cache import ROICache
+import detection
+from detection import crop_objective_roi, detect_map
+from db_writer import DetectionWriter
+from rollups import apply_detections, ensure_schema
+from metrics import MetricsRegistry
+from calibration import CalibrationCache, Calibrator, print_savings, roi_bounds
+from match_state import MatchStateTracker, INTERVAL_TABLE, INTERVAL_INSERT_QUERY, ensure_interval_table
+from sharding import ShardCoordinator, default_node_id, ensure_shard_tables
+from discovery import StreamDiscovery
+
+# ------------------ ENV / CONFIG ------------------ #
+# Twitch API credentials
+# get Twitch API credentials from environment
+CLIENT_ID = os.environ.get("TWITCH_CLIENT_ID")
+OAUTH_TOKEN = os.environ.get("TWITCH_OAUTH_TOKEN")
+# override to point at a local fake Helix server (tools/fake_helix.py)
+TWITCH_API_URL = os.environ.get("TWITCH_API_URL", HELIX_URL)
+
+# Streamers you want to monitor (comma separated in an env var, or define here as a list)
+# list of streamers to monitor
+STREAMERS = ["dongm1n_", "doomed_ow", "calwya", "GURU", "Gale", "storytimebed", "space", "m4rchgg", "eatinpizzarn", "shroud", "Impuniti", "senorhoff", "Kephrii", "ange1inac", "farpwr", "MaleniaMR", "FullMetalLamp"]
+
+# Database connection info  
+# database connection settings from environment
+DB_CONFIG = {
+    "host":     os.environ.get("MYSQL_HOST"),
+    "user":     os.environ.get("MYSQL_USER"),
+    "password": os.environ.get("MYSQL_PASSWORD"),
+    "database": os.environ.get("MYSQL_DATABASE"),
+}
+
+# Capture interval in seconds
+# how often to check for streamers (in seconds)
+CHECK_INTERVAL = 5
+
+# sampling backs off from CHECK_INTERVAL to this while a streamer's map is stable, and drops back
+# to CHECK_INTERVAL after Unknown Map or a map change
+MAX_CHECK_INTERVAL = 30
+
+# "changes" stores a twitch_maps row only when a streamer's smoothed map starts or changes,
+# "samples" keeps one row per screenshot; both write twitch_map_intervals rows
+WRITE_MODE = "changes"
+
+# how often to refresh live status from Helix (one batched request per 100 streamers)
+STATUS_CHECK_INTERVAL = 30
+
+# share STREAMERS with other main.py instances (TRACKER_SHARDING=1): each node takes leases in
+# MySQL on the streamers a consistent hash ring of the live nodes gives it, and only captures
+# streamers it holds an unexpired lease on; a dead node's streamers move to the others within
+# max(LEASE_TTL, NODE_TIMEOUT) + LEASE_RENEW_INTERVAL seconds
+SHARDING = os.environ.get("TRACKER_SHARDING") == "1"
+NODE_ID = os.environ.get("TRACKER_NODE_ID") or default_node_id()
+# relative share of the roster, e.g. 2 on a VM with twice the cores
+NODE_WEIGHT = int(os.environ.get("TRACKER_NODE_WEIGHT", "1"))
+LEASE_TTL = 30
+LEASE_RENEW_INTERVAL = 10
+NODE_TIMEOUT = 30
+# stop capturing this long before a lease expires
+LEASE_SAFETY_MARGIN = 5
+
+# track whoever is live on Marvel Rivals (DISCOVER_STREAMS=1) instead of only STREAMERS: every
+# status check pages the Helix game listing, most watched first, and samples as many streams as
+# the capture budget fits, rotating through the rest so each gets sampled now and then. STREAMERS
+# stay pinned and are always sampled while live.
+DISCOVER_STREAMS = os.environ.get("DISCOVER_STREAMS") == "1"
+DISCOVERY_MAX_PAGES = 5
+# cores for decoding and OCR, download Mbit/s and streams captured at once
+CAPTURE_CPU_BUDGET = float(os.environ.get("CAPTURE_CPU_BUDGET", os.cpu_count() or 4))
+CAPTURE_BANDWIDTH_MBPS = float(os.environ.get("CAPTURE_BANDWIDTH_MBPS", "200"))
+MAX_CAPTURED_STREAMS = 64
+
+# how many streamlink/ffmpeg captures and OCR jobs may run at once
+MAX_CONCURRENT_CAPTURES = 16
+MAX_CONCURRENT_OCR = os.cpu_count() or 2
+
+# keep one streamlink/ffmpeg pipeline open per live streamer instead of spawning one per screenshot
+USE_FRAME_GRABBERS = True
+
+# frames older than this are treated as missing (stream stalled or still starting)
+FRAME_MAX_AGE = 10
+# a grabber without a new frame for this long is restarted even though its processes are still up
+GRABBER_STALL_TIMEOUT = 3 * FRAME_MAX_AGE
+
+# pick each streamer's cheapest rendition that still reads the objective banner instead of "best",
+# cached with its ROI geometry in CALIBRATION_PATH
+CALIBRATE_QUALITY = True
+CALIBRATION_PATH = os.environ.get("CALIBRATION_PATH", "/tmp/twitch_maps_calibration.json")
+
+# write each sampled frame to disk for the dashboard (encoded off the capture path), named by
+# content so repeated frames are stored once, with a thumbnail for the dashboard
+SAVE_SCREENSHOTS = True
+SCREENSHOT_DIR = os.environ.get("SCREENSHOT_DIR", "/tmp/twitch_maps_screenshots")
+SCREENSHOT_FORMAT = "jpg"
+SCREENSHOT_QUALITY = 80
+
+# keep only the objective banner instead of the whole frame
+SCREENSHOT_ROI_ONLY = False
+
+# least recently used screenshots are deleted beyond this many bytes or after this many seconds unused
+SCREENSHOT_MAX_BYTES = 2 * 1024 ** 3
+SCREENSHOT_MAX_AGE = 7 * 24 * 3600
+
+# how often to print per-streamer scheduling lag (in seconds)
+LAG_REPORT_INTERVAL = 60
+
+# local Prometheus endpoint with per-stage timings and error counts (0 disables it),
+# optionally also appending every observation to a JSON-lines file
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "9108"))
+METRICS_JSON_PATH = os.environ.get("METRICS_JSON_PATH")
+
+# run every Nth frame job under cProfile (0 disables it); the combined profile is written to
+# PROFILE_PATH and its top entries printed with each lag report
+PROFILE_EVERY = int(os.environ.get("PROFILE_EVERY", "0"))
+PROFILE_PATH = "/tmp/twitch_maps.prof"
+
+# reuse OCR results while the objective banner's perceptual hash stays within this many bits,
+# re-running OCR at least every ROI_CACHE_MAX_AGE seconds
+ROI_CACHE_MAX_DISTANCE = 12
+ROI_CACHE_MAX_AGE = 60
+
+# OCR confidence thresholds and MATCH_MODE live in detection.py, shared with the offline tools
+
+# "tesserocr" keeps one warm Tesseract handle per worker process (--psm 6, objective character
+# whitelist and user words), "pytesseract" spawns tesseract per image; tesserocr falls back to pytesseract
+OCR_BACKEND = "tesserocr"
+OCR_WORKERS = MAX_CONCURRENT_OCR
+
+OCR = detection.objective_ocr_pool(OCR_BACKEND, OCR_WORKERS)
+
+# stage timing histograms, error counters and sampled profiles
+METRICS = MetricsRegistry(json_path=METRICS_JSON_PATH, profile_every=PROFILE_EVERY)
+
+# runs OCR on cropped image and returns confident words, image is a path or a BGR ndarray
+def extract_top_left_text(image):
+    if isinstance(image, str):
+        image_path = image
+        image = cv2.imread(image_path)
+        if image is None:
+            print(f"Unable to read image at {image_path}")
+            return []
+
+    return ocr_roi(crop_objective_roi(image))
+
+# runs OCR on the grayscale objective ROI and returns confident words
+def ocr_roi(cropped_region):
+    return detection.ocr_phrases(OCR, cropped_region)
+
+# best map for a single frame, used to calibrate stream quality
+def detect_frame(frame):
+    return detection.detect_frame(OCR, frame)
+
+# batched background writer for detections, keeping the hourly rollups in the same transaction
+DB_WRITER = DetectionWriter(DB_CONFIG, after_insert=apply_detections, on_stage=METRICS.observe)
+
+# (streamer, map, start, end, samples) rows for every finished match state
+INTERVAL_WRITER = DetectionWriter(DB_CONFIG, table=INTERVAL_TABLE, insert_query=INTERVAL_INSERT_QUERY,
+                                  spill_path="/tmp/twitch_map_intervals_spill.jsonl", on_stage=METRICS.observe)
+
+# makes sure the rollup, interval and index tables exist before the writers need them
+def prepare_database():
+    try:
+        conn = mysql.connector.connect(**DB_CONFIG)
+        try:
+            ensure_schema(conn)
+            ensure_interval_table(conn)
+            if SHARDING:
+                ensure_shard_tables(conn)
+        finally:
+            conn.close()
+    except mysql.connector.Error as err:
+        print(f"Database error preparing rollups: {err}")
+
+# queues result for the MySQL writer, never blocks the capture/OCR workers
+def save_to_database(streamer, timestamp, detected_map, storage_path):
+    with METRICS.timed("db_submit", streamer):
+        DB_WRITER.submit(streamer, timestamp, detected_map, storage_path)
+
+# shared pooled Helix client for all live-status checks
+HELIX = HelixClient(CLIENT_ID, OAUTH_TOKEN, base_url=TWITCH_API_URL)
+
+# checks every streamer in batched Helix calls, returns the ones live on Marvel Rivals; streamers
+# whose lookup failed keep their state from previous, so a Helix blip doesn't stop their captures
+def check_online_all(streamers, previous=()):
+    with METRICS.timed("helix"):
+        statuses = HELIX.get_stream_statuses(streamers)
+    previous = set(previous)
+    online = []
+    failed = 0
+    for streamer in streamers:
+        status = statuses[streamer]
+        if status["failed"]:
+            failed += 1
+            if streamer in previous:
+                online.append(streamer)
+        elif is_playing_rivals(status):
+            print(f"{streamer} is playing Marvel Rivals.")
+            online.append(streamer)
+        elif status["live"]:
+            print(f"{streamer} is live but playing '{status['game_name'] or 'Unknown'}' instead of Marvel Rivals.")
+    if failed:
+        METRICS.error("helix")
+        print(f"Live status check failed for {failed}/{len(streamers)} streamers, keeping their previous state.")
+    return online
+
+# checks if a streamer is live and playing Marvel Rivals
+def check_online(streamer):
+    return streamer in check_online_all([streamer])
+
+# calibrated rendition and ROI geometry per streamer
+CALIBRATION = CalibrationCache(CALIBRATION_PATH)
+
+# live Marvel Rivals streams and the ones sampled within the capture budget when DISCOVER_STREAMS is on;
+# streams are costed from their calibration measurements
+DISCOVERY = StreamDiscovery(HELIX, pinned=STREAMERS, max_pages=DISCOVERY_MAX_PAGES, cpu_budget=CAPTURE_CPU_BUDGET,
+                            bandwidth_budget=CAPTURE_BANDWIDTH_MBPS, max_streams=MAX_CAPTURED_STREAMS,
+                            cost_of=CALIBRATION.stream_cost)
+
+# persistent frame grabbers, kept in sync with the live roster by run_loop
+GRABBERS = GrabberPool(quality_for=CALIBRATION.streamlink_quality if CALIBRATE_QUALITY else None, on_stage=METRICS.observe,
+                       stall_timeout=GRABBER_STALL_TIMEOUT)
+
+# samples renditions on a background thread and restarts a grabber when its streamer's quality changes
+CALIBRATOR = Calibrator(CALIBRATION, detect_frame, on_quality=GRABBERS.restart)
+
+# OCR/detection results reused while a streamer's objective banner stays the same
+ROI_CACHE = ROICache(max_distance=ROI_CACHE_MAX_DISTANCE, max_age=ROI_CACHE_MAX_AGE)
+
+# background screenshot store, frames are only encoded when SAVE_SCREENSHOTS is on and the sample
+# is stored as a twitch_maps row
+SCREENSHOTS = ScreenshotWriter(SCREENSHOT_DIR, SCREENSHOT_FORMAT, SCREENSHOT_QUALITY,
+                               max_bytes=SCREENSHOT_MAX_BYTES, max_age=SCREENSHOT_MAX_AGE)
+
+# the part of a frame SCREENSHOTS keeps: all of it, or the objective banner in color
+def screenshot_region(frame, bounds):
+    if not SCREENSHOT_ROI_ONLY:
+        return frame
+    top, bottom, left, right = bounds
+    return frame[top:bottom, left:right]
+
+# objective banner bounds in a streamer's frame: its calibrated ROI while frames arrive at the
+# calibrated resolution, otherwise the proportional default
+def objective_bounds(streamer, frame):
+    height, width = frame.shape[:2]
+    bounds = CALIBRATION.roi(streamer, height, width) if CALIBRATE_QUALITY else None
+    return bounds or roi_bounds(height, width)
+
+# returns (timestamp, frame) or None, counting a missing frame as a capture error
+def grab_frame(streamer):
+    if SHARDING and not SHARD.holds(streamer):
+        return None
+    with METRICS.timed("capture", streamer):
+        capture = grab_frame_oneshot(streamer) if not USE_FRAME_GRABBERS else grab_latest_frame(streamer)
+    if capture is None:
+        METRICS.error("capture", streamer)
+    return capture
+
+# takes the newest frame from the streamer's grabber, returns (timestamp, frame) or None
+def grab_latest_frame(streamer):
+    grabber = GRABBERS.get(streamer)
+    latest = grabber.latest_frame(max_age=FRAME_MAX_AGE) if grabber else None
+    if latest is None:
+        print(f"No recent frame from {streamer} yet.")
+        return None
+    return time.strftime("%Y-%m-%d %H:%M:%S"), latest[0]
+
+# grabs one frame with a fresh streamlink/ffmpeg pipeline, returns (timestamp, frame) or None
+def grab_frame_oneshot(streamer):
+    timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
+    stream_url = f"https://www.twitch.tv/{streamer}"
+    quality = CALIBRATION.streamlink_quality(streamer) if CALIBRATE_QUALITY else "best"
+    try:
+        result = subprocess.run(
+            f"streamlink --twitch-disable-ads {stream_url} {quality} --stdout | ffmpeg -i pipe:0 -frames:v 1 -f image2pipe -c:v bmp pipe:1",
+            shell=True,
+            check=True,
+            stdout=subprocess.PIPE
+        )
+    except subprocess.CalledProcessError as e:
+        print(f"Error capturing screenshot from {streamer}: {e}")
+        return None
+    frame = cv2.imdecode(np.frombuffer(result.stdout, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if frame is None:
+        print(f"Unable to decode screenshot from {streamer}")
+        return None
+    return timestamp, frame
+
+# processes OCR on a grabbed frame and stores result
+def process_frame(streamer, capture):
+    timestamp, frame = capture
+    bounds = objective_bounds(streamer, frame)
+    roi = crop_objective_roi(frame, bounds)
+    roi_hash, cached = ROI_CACHE.lookup(streamer, roi)
+    if cached is not None:
+        METRICS.event("roi_cache_hit", streamer)
+        extracted_phrases, maps_detected = cached.phrases, cached.maps_detected
+    else:
+        ocr_start = time.perf_counter()
+        with METRICS.timed("ocr", streamer):
+            extracted_phrases = ocr_roi(roi)
+        with METRICS.timed("detect", streamer):
+            maps_detected = detect_map(extracted_phrases)
+        ROI_CACHE.store(streamer, roi_hash, extracted_phrases, maps_detected, time.perf_counter() - ocr_start)
+    # build the report first so concurrent workers don't interleave lines
+    lines = [f"[{streamer}] Extracted Text & Confidence Scores{' (unchanged ROI, cached)' if cached else ''}:"]
+    if extracted_phrases:
+        for text, conf in extracted_phrases:
+            lines.append(f" - '{text}' (Confidence: {conf}%)")
+    else:
+        lines.append(" - No text found above confidence threshold.")
+    lines.append(f"[{streamer}] Top 3 Map Matches (Filtered & Weighted):")
+    if not maps_detected or maps_detected[0][1] == 0:
+        lines.append("No maps detected with high confidence.")
+        best_map = "Unknown Map"
+    else:
+        for i, (map_name, score) in enumerate(maps_detected[:3], 1):
+            lines.append(f"{i}. {map_name} ({score}%)")
+        best_map = maps_detected[0][0]
+    print("\n".join(lines))
+    # the screenshot is only hashed and encoded for a sample that becomes a twitch_maps row
+    screenshot = screenshot_region(frame, bounds)
+    output_file = None
+    if WRITE_MODE == "samples":
+        output_file = save_screenshot(streamer, timestamp, screenshot)
+        save_to_database(streamer, timestamp, best_map, output_file)
+    stored = record_match_state(*MATCH_STATE.observe(streamer, best_map, timestamp), screenshot=screenshot)
+    output_file = output_file or stored
+    if CALIBRATE_QUALITY:
+        CALIBRATOR.observe(streamer, frame.shape, roi, best_map)
+    print(f"[{streamer}] Screenshot queued: {output_file} | Best map: {best_map}\n")
+
+# queues a detection row's screenshot, returns its path or None when screenshots are off or dropped
+def save_screenshot(streamer, timestamp, screenshot):
+    if not SAVE_SCREENSHOTS or screenshot is None:
+        return None
+    return SCREENSHOTS.save(streamer, timestamp, screenshot)
+
+# writes finished intervals and, in "changes" mode, one detection row per match start or map change
+# with the screenshot of the sample that triggered it; returns the last screenshot path queued
+def record_match_state(events, intervals, screenshot=None):
+    stored = None
+    for event in events:
+        print(event)
+        if WRITE_MODE == "changes" and event.kind != "end":
+            stored = save_screenshot(event.streamer, event.timestamp, screenshot)
+            save_to_database(event.streamer, event.timestamp, event.map, stored)
+    for row in intervals:
+        INTERVAL_WRITER.submit(*row)
+    return stored
+
+# frame job run by the scheduler, every PROFILE_EVERY-th one under cProfile
+def run_frame_job(streamer, capture):
+    # the lease may have lapsed while the frame waited for OCR
+    if SHARDING and not SHARD.holds(streamer):
+        return
+    with METRICS.profiled():
+        process_frame(streamer, capture)
+
+# captures screenshot, processes OCR, and stores result
+def capture_screenshot(streamer):
+    try:
+        capture = grab_frame(streamer)
+        if capture is not None:
+            process_frame(streamer, capture)
+    except Exception as e:
+        print(f"Unexpected error: {e}")
+
+# deadline scheduler for captures and OCR, each streamer's cadence set by MATCH_STATE
+SCHEDULER = CaptureScheduler(grab_frame, run_frame_job, CHECK_INTERVAL,
+                             max_captures=MAX_CONCURRENT_CAPTURES, max_ocr=MAX_CONCURRENT_OCR)
+
+# smoothed per-streamer map state, emitting start/change/end events and adaptive sampling intervals
+MATCH_STATE = MatchStateTracker(on_interval=SCHEDULER.set_interval, min_interval=CHECK_INTERVAL,
+                                max_interval=MAX_CHECK_INTERVAL)
+
+# leases on this node's share of the roster when SHARDING is on
+SHARD = ShardCoordinator(lambda: mysql.connector.connect(**DB_CONFIG, connection_timeout=5), NODE_ID, NODE_WEIGHT,
+                         lease_ttl=LEASE_TTL, node_timeout=NODE_TIMEOUT, safety_margin=LEASE_SAFETY_MARGIN)
+
+# every streamer the tracker knows of: STREAMERS, or all discovered live streams
+def roster():
+    return DISCOVERY.streamers() if DISCOVER_STREAMS else STREAMERS
+
+# streamers this node checks and captures: the whole roster, or the ones it holds leases on
+def tracked_streamers():
+    if not SHARDING:
+        return roster()
+    owned = SHARD.owned()
+    return [streamer for streamer in roster() if streamer in owned]
+
+# points grabbers and scheduler at the streamers being captured now; match state, ROI cache and
+# metrics are kept for every live candidate, so a discovered stream rotated out of the budget
+# resumes its match when it is sampled again instead of ending it
+def apply_online(online, live=None):
+    live = online if live is None else live
+    if USE_FRAME_GRABBERS:
+        GRABBERS.sync(online)
+    SCHEDULER.set_streamers(online)
+    ROI_CACHE.retain(live)
+    METRICS.retain(live)
+    record_match_state(*MATCH_STATE.retain(live, time.strftime("%Y-%m-%d %H:%M:%S")))
+    if CALIBRATE_QUALITY:
+        CALIBRATOR.ensure(DISCOVERY.settled() if DISCOVER_STREAMS else online)
+
+# main loop: refreshes live status and lets the scheduler keep each streamer on its own cadence
+def run_loop():
+    prepare_database()
+    if METRICS_PORT:
+        try:
+            METRICS.serve(METRICS_PORT)
+        except OSError as e:
+            print(f"Unable to start metrics endpoint on port {METRICS_PORT}: {e}")
+    online = []
+    next_status_check = 0
+    next_lease_renewal = 0 if SHARDING else float("inf")
+    next_lag_report = time.monotonic() + LAG_REPORT_INTERVAL
+    try:
+        while True:
+            now = time.monotonic()
+            if now >= next_lease_renewal:
+                gained, lost = SHARD.renew(roster())
+                if gained:
+                    print(f"Node {NODE_ID} took over {len(gained)} streamers: {', '.join(sorted(gained))}")
+                if lost:
+                    print(f"Node {NODE_ID} handed off {len(lost)} streamers: {', '.join(sorted(lost))}")
+                if DISCOVER_STREAMS and (gained or lost):
+                    # discovered streams are known to be live, so only the budget needs replanning
+                    tracked = tracked_streamers()
+                    online = DISCOVERY.plan(tracked)
+                    apply_online(online, tracked)
+                elif gained:
+                    # check the new streamers' live status right away
+                    next_status_check = now
+                elif lost:
+                    online = [streamer for streamer in online if streamer not in lost]
+                    apply_online(online)
+                next_lease_renewal = now + LEASE_RENEW_INTERVAL
+            if now >= next_status_check:
+                if DISCOVER_STREAMS:
+                    with METRICS.timed("helix"):
+                        DISCOVERY.refresh()
+                    tracked = tracked_streamers()
+                    online = DISCOVERY.plan(tracked)
+                    print(f"Sampling {len(online)}/{len(tracked)} live Marvel Rivals streams"
+                          f"{f' (node {NODE_ID}, {len(tracked)}/{len(roster())} leased)' if SHARDING else ''}.")
+                    apply_online(online, tracked)
+                else:
+                    tracked = tracked_streamers()
+                    online = check_online_all(tracked, online) if tracked else []
+                    print(f"{len(online)}/{len(tracked)} streamers live on Marvel Rivals"
+                          f"{f' (node {NODE_ID}, {len(tracked)}/{len(STREAMERS)} leased)' if SHARDING else ''}.")
+                    apply_online(online)
+                next_status_check = now + STATUS_CHECK_INTERVAL
+            if now >= next_lag_report:
+                SCHEDULER.print_lag_report()
+                if SHARDING:
+                    SHARD.print_report()
+                if DISCOVER_STREAMS:
+                    DISCOVERY.print_report()
+                ROI_CACHE.print_report()
+                MATCH_STATE.print_report()
+                DB_WRITER.print_report()
+                INTERVAL_WRITER.print_report()
+                if SAVE_SCREENSHOTS:
+                    SCREENSHOTS.print_report()
+                if CALIBRATE_QUALITY:
+                    print_savings(CALIBRATION, GRABBERS)
+                METRICS.flush()
+                if PROFILE_EVERY:
+                    METRICS.dump_profile(PROFILE_PATH)
+                next_lag_report = now + LAG_REPORT_INTERVAL
+            until_due = SCHEDULER.tick()
+            timeout = min(next_status_check, next_lease_renewal, next_lag_report) - time.monotonic()
+            if until_due is not None:
+                timeout = min(timeout, until_due)
+            SCHEDULER.wait(max(timeout, 0))
+    finally:
+        SCHEDULER.shutdown()
+        CALIBRATOR.close()
+        GRABBERS.stop_all()
+        if SHARDING:
+            # captures have stopped, so other nodes may take over at once
+            SHARD.close()
+        SCREENSHOTS.close()
+        OCR.close()
+        record_match_state(*MATCH_STATE.close_all(time.strftime("%Y-%m-%d %H:%M:%S")))
+        DB_WRITER.close()
+        INTERVAL_WRITER.close()
+        METRICS.close()
+
+if __name__ == "__main__":
     run_loop()
\ No newline at end of file
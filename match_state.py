@@ -0,0 +1,172 @@
+# per-streamer match state built from detect_map results
+#
+# each sample's best map goes into a sliding window; the state only moves to a map (or to
+# "no match" on Unknown Map) once it holds a majority of the window, so single misreads never
+# start, change or end a match. Every state change is returned as an event and each finished
+# state becomes an interval row (streamer, map, start, end, samples). The sampling interval
+# backs off while a map is stable and drops back to the minimum after Unknown Map or a change.
+import threading
+from collections import Counter, deque
+
+UNKNOWN_MAP = "Unknown Map"
+
+# samples in the voting window and votes a map needs to become the state
+WINDOW_SIZE = 3
+MIN_VOTES = 2
+
+# sampling interval bounds (seconds) and the factor applied per stable sample
+MIN_INTERVAL = 5
+MAX_INTERVAL = 30
+BACKOFF = 2
+
+INTERVAL_TABLE = "twitch_map_intervals"
+
+INTERVAL_SCHEMA = """CREATE TABLE IF NOT EXISTS {table} (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    streamer VARCHAR(255) NOT NULL,
+    map VARCHAR(255) NOT NULL,
+    start_time DATETIME NOT NULL,
+    end_time DATETIME NOT NULL,
+    samples INT NOT NULL,
+    KEY idx_{table}_streamer_start (streamer, start_time)
+)"""
+
+INTERVAL_INSERT_QUERY = "INSERT INTO {table} (streamer, map, start_time, end_time, samples) VALUES (%s, %s, %s, %s, %s)"
+
+
+def ensure_interval_table(conn, table=INTERVAL_TABLE):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(INTERVAL_SCHEMA.format(table=table))
+        conn.commit()
+    finally:
+        cursor.close()
+
+
+class MatchEvent:
+    # kind is "start", "change" or "end"; previous is the map that ended, if any
+    def __init__(self, streamer, kind, detected_map, previous, timestamp):
+        self.streamer = streamer
+        self.kind = kind
+        self.map = detected_map
+        self.previous = previous
+        self.timestamp = timestamp
+
+    def __repr__(self):
+        if self.kind == "change":
+            return f"[{self.streamer}] map change {self.previous} -> {self.map} at {self.timestamp}"
+        if self.kind == "end":
+            return f"[{self.streamer}] match end on {self.previous} at {self.timestamp}"
+        return f"[{self.streamer}] match start on {self.map} at {self.timestamp}"
+
+
+class StreamerState:
+    def __init__(self, streamer, window_size=WINDOW_SIZE, min_votes=MIN_VOTES, min_interval=MIN_INTERVAL,
+                 max_interval=MAX_INTERVAL, backoff=BACKOFF):
+        self.streamer = streamer
+        self.min_votes = min_votes
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.window = deque(maxlen=window_size)
+        self.map = None
+        self.start = None
+        self.last_seen = None
+        self.samples = 0
+        self.interval = min_interval
+
+    # feeds one sample, returns (events, finished interval rows)
+    def observe(self, detected_map, timestamp):
+        self.window.append((detected_map, timestamp))
+        winner, votes = Counter(m for m, _ in self.window).most_common(1)[0]
+        candidate = None if winner == UNKNOWN_MAP else winner
+        events, intervals = [], []
+        if votes >= self.min_votes and candidate != self.map:
+            if self.map is not None:
+                intervals.append(self._interval())
+            kind = "end" if candidate is None else ("start" if self.map is None else "change")
+            events.append(MatchEvent(self.streamer, kind, candidate, self.map, timestamp))
+            self.map = candidate
+            # the new state began at its first vote still in the window
+            votes_at = [t for m, t in self.window if m == winner]
+            self.start, self.last_seen, self.samples = votes_at[0], votes_at[-1], len(votes_at)
+        elif self.map is not None and detected_map == self.map:
+            self.samples += 1
+            self.last_seen = timestamp
+        if self.map is not None and detected_map == self.map and not events:
+            self.interval = min(self.interval * self.backoff, self.max_interval)
+        else:
+            self.interval = self.min_interval
+        return events, intervals
+
+    # closes the current map (streamer went offline or the tracker stops)
+    def close(self, timestamp):
+        events, intervals = [], []
+        if self.map is not None:
+            intervals.append(self._interval())
+            events.append(MatchEvent(self.streamer, "end", None, self.map, timestamp))
+        self.map = None
+        self.window.clear()
+        self.interval = self.min_interval
+        return events, intervals
+
+    def _interval(self):
+        return (self.streamer, self.map, self.start, self.last_seen, self.samples)
+
+
+class MatchStateTracker:
+    # on_interval(streamer, seconds) is told each streamer's next sampling interval
+    def __init__(self, on_interval=None, **state_options):
+        self.on_interval = on_interval
+        self.state_options = state_options
+        self.states = {}
+        self.samples = 0
+        self.events = 0
+        self._lock = threading.Lock()
+
+    # returns (events, finished interval rows) for one detect_map result
+    def observe(self, streamer, detected_map, timestamp):
+        with self._lock:
+            state = self.states.get(streamer)
+            if state is None:
+                state = self.states[streamer] = StreamerState(streamer, **self.state_options)
+            events, intervals = state.observe(detected_map, timestamp)
+            self.samples += 1
+            self.events += len(events)
+            interval = state.interval
+        if self.on_interval is not None:
+            self.on_interval(streamer, interval)
+        return events, intervals
+
+    # ends the matches of streamers that are no longer live
+    def retain(self, streamers, timestamp):
+        active = set(streamers)
+        with self._lock:
+            ended = [s for s in self.states if s not in active]
+        return self._close(ended, timestamp)
+
+    def close_all(self, timestamp):
+        with self._lock:
+            ended = list(self.states)
+        return self._close(ended, timestamp)
+
+    def _close(self, streamers, timestamp):
+        events, intervals = [], []
+        with self._lock:
+            for streamer in streamers:
+                state = self.states.pop(streamer, None)
+                if state is None:
+                    continue
+                e, i = state.close(timestamp)
+                events.extend(e)
+                intervals.extend(i)
+            self.events += len(events)
+        return events, intervals
+
+    def print_report(self):
+        with self._lock:
+            in_match = {s: state.map for s, state in self.states.items() if state.map is not None}
+            intervals = {s: state.interval for s, state in self.states.items()}
+        print(f"Match state: {self.samples} samples, {self.events} events, {len(in_match)} streamers in a match")
+        for streamer in sorted(in_match, key=str.lower):
+            print(f" - {streamer}: {in_match[streamer]}, sampling every {intervals[streamer]}s")
@@ -0,0 +1,81 @@
+# objective matcher compiled once from MAP_OBJECTIVES, scores recognized words with NumPy
+#
+# modes:
+#   "compat" - a word matches an objective when it is a substring of the lowercased objective text,
+#              reproducing the original detect_map scores exactly (so "by" also hits "ruby")
+#   "token"  - a word only matches whole objective words
+import numpy as np
+
+MATCH_MODES = ("compat", "token")
+
+BASE_SCORE = 50
+WORD_SCORE = 5
+HIGH_VALUE_SCORE = 15
+SUPER_HIGH_VALUE_SCORE = 30
+
+# distinct non-vocabulary words remembered in compat mode before the cache is reset
+MAX_CACHED_WORDS = 50000
+
+
+class ObjectiveMatcher:
+    def __init__(self, objectives, super_high_value_words, high_value_words, mode="compat"):
+        if mode not in MATCH_MODES:
+            raise ValueError(f"Unknown match mode {mode!r}, expected one of {MATCH_MODES}")
+        self.mode = mode
+        self.super_high_value_words = frozenset(super_high_value_words)
+        self.high_value_words = frozenset(high_value_words)
+        self.map_names = list(objectives.values())
+        self.objective_texts = [text.lower() for text in objectives]
+
+        # inverted index: vocabulary maps token -> column, column j of token_matrix marks the objectives containing it
+        tokens = sorted({token for text in self.objective_texts for token in text.split()})
+        self.vocabulary = {token: j for j, token in enumerate(tokens)}
+        self.token_matrix = np.zeros((len(self.objective_texts), len(tokens)), dtype=np.int32)
+        for i, text in enumerate(self.objective_texts):
+            for token in set(text.split()):
+                self.token_matrix[i, self.vocabulary[token]] = 1
+        self.token_weights = np.array([self.word_weight(token) for token in tokens], dtype=np.int32)
+
+        # compat mode: vocabulary tokens can also occur inside longer objective words
+        self.substring_matrix = np.array(
+            [[token in text for token in tokens] for text in self.objective_texts], dtype=np.int32
+        ).reshape(len(self.objective_texts), len(tokens))
+        self._word_cache = {}
+
+    # points a single matched word adds to an objective's score
+    def word_weight(self, word):
+        if word in self.super_high_value_words:
+            return WORD_SCORE + SUPER_HIGH_VALUE_SCORE
+        if word in self.high_value_words:
+            return WORD_SCORE + HIGH_VALUE_SCORE
+        return WORD_SCORE
+
+    # substring hit vector and weight for a word outside the vocabulary, cached per word
+    def _unknown_word(self, word):
+        cached = self._word_cache.get(word)
+        if cached is None:
+            if len(self._word_cache) >= MAX_CACHED_WORDS:
+                self._word_cache.clear()
+            hits = np.fromiter((word in text for text in self.objective_texts), dtype=np.int32, count=len(self.objective_texts))
+            cached = (hits, self.word_weight(word))
+            self._word_cache[word] = cached
+        return cached
+
+    # returns per-objective (words_matched, score) arrays for a set of cleaned words
+    def score(self, recognized_words):
+        columns = [self.vocabulary[word] for word in recognized_words if word in self.vocabulary]
+        matrix = self.token_matrix if self.mode == "token" else self.substring_matrix
+        hits = matrix[:, columns]
+        weights = self.token_weights[columns]
+        if self.mode == "compat":
+            extra = [self._unknown_word(word) for word in recognized_words if word not in self.vocabulary]
+            if extra:
+                hits = np.column_stack([hits] + [h for h, _ in extra])
+                weights = np.concatenate([weights, np.array([w for _, w in extra], dtype=np.int32)])
+        return hits.sum(axis=1), BASE_SCORE + hits @ weights
+
+    # (map_name, score) for every objective matching more than one word, best first
+    def match(self, recognized_words):
+        words_matched, scores = self.score(recognized_words)
+        matches = [(self.map_names[i], int(scores[i])) for i in np.flatnonzero(words_matched > 1)]
+        return sorted(matches, key=lambda x: x[1], reverse=True)
@@ -0,0 +1,243 @@
+# stage timings, error counters and sampled cProfile for main.py
+#
+# every stage observation lands in one histogram labelled by stage and streamer; errors and other
+# events are plain counters. The registry renders the Prometheus text format on a local HTTP
+# endpoint (GET /metrics) and can also append each observation to a JSON-lines file. Recording is
+# a bisect and a few additions under a lock, cheap enough to leave on under full load.
+import cProfile
+import io
+import json
+import pstats
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# seconds; covers Helix calls, OCR, matching and MySQL flushes as well as stream startup
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+PREFIX = "twitch_tracker"
+
+
+# label values escaped for the exposition format
+def format_labels(names, values):
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class Histogram:
+    def __init__(self, name, help_text, labelnames, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self.series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self.series.get(labels)
+            if series is None:
+                # per-bucket counts (last one is +Inf), sum, count
+                series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    # drops series whose label at position index isn't in keep (series without a value stay)
+    def retain(self, index, keep):
+        with self._lock:
+            self.series = {labels: series for labels, series in self.series.items() if not labels[index] or labels[index] in keep}
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = [(labels, list(counts), total, count) for labels, (counts, total, count) in self.series.items()]
+        names = self.labelnames + ("le",)
+        for labels, counts, total, count in sorted(snapshot):
+            cumulative = 0
+            for bound, n in zip(self.buckets + ("+Inf",), counts):
+                cumulative += n
+                lines.append(f"{self.name}_bucket{format_labels(names, labels + (bound,))} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text, labelnames):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self.series = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self.series[labels] = self.series.get(labels, 0) + amount
+
+    def retain(self, index, keep):
+        with self._lock:
+            self.series = {labels: value for labels, value in self.series.items() if not labels[index] or labels[index] in keep}
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            snapshot = sorted(self.series.items())
+        for labels, value in snapshot:
+            lines.append(f"{self.name}{format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class MetricsRegistry:
+    # json_path appends one line per observation; profile_every > 0 runs every Nth profiled() block under cProfile
+    def __init__(self, json_path=None, profile_every=0, buckets=DEFAULT_BUCKETS):
+        self.stage_seconds = Histogram(f"{PREFIX}_stage_seconds", "Time spent in each pipeline stage.", ("stage", "streamer"), buckets)
+        self.stage_errors = Counter(f"{PREFIX}_stage_errors_total", "Pipeline stage failures.", ("stage", "streamer"))
+        self.events = Counter(f"{PREFIX}_events_total", "Pipeline events such as ROI cache hits.", ("event", "streamer"))
+        self.started = time.time()
+        self.json_file = open(json_path, "a") if json_path else None
+        self._json_lock = threading.Lock()
+        self.profile_every = profile_every
+        self.profile_stats = None
+        self.profiled_jobs = 0
+        self._profile_calls = 0
+        self._count_lock = threading.Lock()
+        self._profile_lock = threading.Lock()
+        self._server = None
+
+    def observe(self, stage, seconds, streamer="", error=False):
+        self.stage_seconds.observe(seconds, stage, streamer)
+        if error:
+            self.stage_errors.inc(stage, streamer)
+        if self.json_file is not None:
+            line = json.dumps({"ts": round(time.time(), 3), "stage": stage, "streamer": streamer,
+                               "seconds": round(seconds, 6), "error": error})
+            with self._json_lock:
+                if self.json_file is not None:
+                    self.json_file.write(line + "\n")
+
+    # forgets the per-streamer series of streamers no longer tracked, so /metrics doesn't grow with
+    # every login ever sampled; scrapers see a returning streamer's counters restart from zero
+    def retain(self, streamers):
+        keep = set(streamers)
+        for metric in (self.stage_seconds, self.stage_errors, self.events):
+            metric.retain(metric.labelnames.index("streamer"), keep)
+
+    # counts a failure a stage reports by return value rather than by raising
+    def error(self, stage, streamer=""):
+        self.stage_errors.inc(stage, streamer)
+
+    def event(self, name, streamer=""):
+        self.events.inc(name, streamer)
+
+    # times the block as one observation of stage, counting it as an error if it raises
+    @contextmanager
+    def timed(self, stage, streamer=""):
+        start = time.perf_counter()
+        failed = False
+        try:
+            yield
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            self.observe(stage, time.perf_counter() - start, streamer, failed)
+
+    # runs every profile_every-th block under cProfile; one block is profiled at a time because
+    # Python only allows one active profiler
+    @contextmanager
+    def profiled(self):
+        if self.profile_every <= 0:
+            yield
+            return
+        with self._count_lock:
+            self._profile_calls += 1
+            sample = self._profile_calls % self.profile_every == 0
+        if not sample or not self._profile_lock.acquire(blocking=False):
+            yield
+            return
+        profiler = cProfile.Profile()
+        try:
+            try:
+                profiler.enable()
+            except ValueError:
+                # another profiler is active in this process
+                yield
+                return
+            try:
+                yield
+            finally:
+                profiler.disable()
+                if self.profile_stats is None:
+                    self.profile_stats = pstats.Stats(profiler)
+                else:
+                    self.profile_stats.add(profiler)
+                self.profiled_jobs += 1
+        finally:
+            self._profile_lock.release()
+
+    # writes the accumulated profile to path (readable with pstats/snakeviz) and prints the top entries
+    def dump_profile(self, path, top=15):
+        with self._profile_lock:
+            if self.profile_stats is None:
+                return
+            self.profile_stats.dump_stats(path)
+            out = io.StringIO()
+            pstats.Stats(path, stream=out).sort_stats("cumulative").print_stats(top)
+        print(f"Profile of {self.profiled_jobs} sampled jobs written to {path}\n{out.getvalue()}")
+
+    def render(self):
+        lines = self.stage_seconds.render() + self.stage_errors.render() + self.events.render()
+        lines += [f"# HELP {PREFIX}_start_time_seconds Unix time the tracker started.",
+                  f"# TYPE {PREFIX}_start_time_seconds gauge",
+                  f"{PREFIX}_start_time_seconds {self.started}"]
+        return "\n".join(lines) + "\n"
+
+    def flush(self):
+        if self.json_file is not None:
+            with self._json_lock:
+                self.json_file.flush()
+
+    # serves GET /metrics on a daemon thread; bind to 127.0.0.1 unless a scraper runs elsewhere
+    def serve(self, port, host="127.0.0.1"):
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+        print(f"Metrics available at http://{host}:{self._server.server_address[1]}/metrics")
+        return self._server.server_address[1]
+
+    def close(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        if self.json_file is not None:
+            with self._json_lock:
+                self.json_file.close()
+                self.json_file = None
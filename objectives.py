@@ -0,0 +1,108 @@
+# map objective texts and keyword weights used by detect_map
+
+# keywords used to boost map confidence
+SUPER_HIGH_VALUE_WORDS = {
+    "draculas", "ratatoskr", "castle", "ritual", "final", "montesi", "vampires", "darkhold",
+    "herbie", "tower", "chronovium", "vibrani", "by", "off", "prison", "field", "force",
+    "knull", "kn", "explosion", "scan", "pages", "scanning", "repair", "master", "weaver",
+    "des", "save", "lokis", "destro", "garden", "bifrost", "archive", "odins", "room",
+    "throne", "eldritch", "monument", "station", "frozen", "airfield", "monitoring", "factory",
+    "laboratory", "soldier", "super", "chrono", "experiment", "area", "vibranium", "ground",
+    "imperial", "dueling", "spaceport", "stellar", "cerebro", "taking", "cradle", "ultrons",
+    "invasion", "carousel", "infecting", "grove", "budokan", "jarnbjorn", "yggdrasill",
+    "device", "tapping", "strive", "team"
+}
+
+HIGH_VALUE_WORDS = {
+    "use", "eliminate", "formula", "sealed", "return", "place", "bast", "meditation",
+    "its", "chamber", "statue", "returning", "islands", "destroy", "essence", "underground",
+    "avengers", "lost", "life", "destiny", "web", "jarnbjorn", "yggdrasill", "tapping",
+    "device", "ultron", "krakoa", "rescue", "rescued", "being", "tower", "zero", "spider"
+}
+
+# Dictionary mapping objectives to maps
+# text-to-map matching dictionary
+MAP_OBJECTIVES = {
+    "Enter Draculas Castle and stop his final ritual Rescue the sealed Ratatoskr": "Central Park Attack",
+    "Enter Draculas Castle and stop his final ritual Stop Draculas final ritual": "Central Park Attack",
+    "Use the Montesi Formula to eliminate all the vampires Prevent Ratatoskr from being rescued": "Central Park Defence",
+    "Use the Montesi Formula to eliminate all the vampires Get the Montesi Formula off Ratatoskr": "Central Park Defence",
+
+    "Help the Statue of Bast Return to Its Place Rescue the Statue of Bast Sealed by the Vibrani Chronovium": "Hall of Djalia Attack",
+    "Help the Statue of Bast Return to Its Place Escort the Statue to the Meditation Chamber": "Hall of Djalia Attack",
+    "Prevent the Statue of Bast From Returning to Its Place Prevent the Statue of Bast From Being Rescued": "Hall of Djalia Defence",
+    "Prevent the Statue of Bast From Returning to Its Place Prevent the Statue From Reaching the Meditation Chamber": "Hall of Djalia Defence",
+
+    "Help Spider Zero Return to the Spider Islands Rescue Spider Zero from the Force Field Prison": "Shinshibuya Attack",
+    "Help Spider Zero Return to the Spider Islands Escort Spider Zero to Budokan": "Shinshibuya Attack",
+    "Stop Spider Zero from Returning to the Spider Islands Stop Spider Zero from Being Rescued": "Shinshibuya Defence",
+    "Stop Spider Zero from Returning to the Spider Islands Stop Spider Zero from reaching Budokan": "Shinshibuya Defence",
+
+    "Escort Knulls Essence to the Underground Prepare to Capture Knulls Essence": "Symbiotic Surface Attack",
+    "Escort Knulls Essence to the Underground Go Underground and Destroy Knull with Knulls Essence": "Symbiotic Surface Attack",
+    "Stop Knulls Essence from Going Underground Stop the Explosion of Knulls Essence to Prevent Kn": "Symbiotic Surface Defence",
+    "Stop Knulls Essence from Going Underground Defend Knulls Essence": "Symbiotic Surface Defence",
+
+    "Help HERBIE scan all the lost pages of the Darkhold Escort HERBIE to Avengers Tower": "Midtown Attack",
+    "Prevent HERBIE from scanning all the lost Prevent HERBIE from reaching the Avengers Tower": "Midtown Defence",
+
+    "Help Spider Zero Repair the Web of Life and Destiny Escort Spider Zero to the Web of Life and Destiny": "Spider Islands Attack",
+    "Help the Master Weaver Save the Web of Life and Des Stop Spider Zero from reaching the Web of Life and Destiny": "Spider Islands Defence",
+
+    "Destroy Lokis Yggdrasill Tapping Device Escort Jarnbjorn to Yggdrasill": "Yggdrasill Path Attack",
+    "Stop the Yggdrasill Tapping Device from Being Destro Prevent Jarnbjorn from Reaching Yggdrasill": "Yggdrasill Path Defence",
+
+    "Capture the Bifrost Garden Prepare to Head to the Bifrost Garden": "Royale Palace Bifrost Garden",
+    "Capture the Bifrost Garden Prepare to Capture the Bifrost Garden": "Royale Palace Bifrost Garden",
+    "Capture the Bifrost Garden Defend the Bifrost Garden": "Royale Palace Bifrost Garden",
+    "Capture the Bifrost Garden Reclaim the Bifrost Garden": "Royale Palace Bifrost Garden",
+    "Capture Odins Archive Prepare to Head to Odins Archive": "Royale Palace Odins Archive",
+    "Capture Odins Archive Prepare to Capture Odins Archive": "Royale Palace Odins Archive",
+    "Capture Odins Archive Defend Odins Archive": "Royale Palace Odins Archive",
+    "Capture Odins Archive Reclaim Odins Archive": "Royale Palace Odins Archive",
+    "Capture the Throne Room Prepare to Head to the Throne Room": "Royale Palace Throne Room",
+    "Capture the Throne Room Prepare to Capture the Throne Room": "Royale Palace Throne Room",
+    "Capture the Throne Room Defend the Throne Room": "Royale Palace Throne Room",
+    "Capture the Throne Room Reclaim the Throne Room": "Royale Palace Throne Room",
+
+    "Capture Eldritch Monument Prepare to Head to Eldritch Monument": "Hells Heaven Eldritch Monument",
+    "Capture Eldritch Monument Prepare to Capture Eldritch Monument": "Hells Heaven Eldritch Monument",
+    "Capture Eldritch Monument Defend Eldritch Monument": "Hells Heaven Eldritch Monument",
+    "Capture Eldritch Monument Reclaim Eldritch Monument": "Hells Heaven Eldritch Monument",
+    "Capture Frozen Airfield Prepare to Head to Frozen Monitoring Station": "Hells Heaven Frozen Airfield",
+    "Capture Frozen Airfield Prepare to Capture Frozen Monitoring Station": "Hells Heaven Frozen Airfield",
+    "Capture Frozen Airfield Defend Frozen Monitoring Station": "Hells Heaven Frozen Airfield",
+    "Capture Frozen Airfield Reclaim Frozen Monitoring Station": "Hells Heaven Frozen Airfield",
+    "Capture Super Soldier Factory Prepare to Head to Super Soldier Laboratory": "Hells Heaven Super Soldier Factory",
+    "Capture Super Soldier Factory Prepare to Capture Super Soldier Laboratory": "Hells Heaven Super Soldier Factory",
+    "Capture Super Soldier Factory Defend Super Soldier Laboratory": "Hells Heaven Super Soldier Factory",
+    "Capture Super Soldier Factory Reclaim Super Soldier Laboratory": "Hells Heaven Super Soldier Factory",
+
+    "Capture the Chrono Vibranium Experiment Area Prepare to Head to the Chrono Vibranium Experiment Area": "Brinin Tchalla Experiment Area",
+    "Capture the Chrono Vibranium Experiment Area Prepare to Capture the Chrono Vibranium Experiment Area": "Brinin Tchalla Experiment Area",
+    "Capture the Chrono Vibranium Experiment Area Defend the Chrono Vibranium Experiment Area": "Brinin Tchalla Experiment Area",
+    "Capture the Chrono Vibranium Experiment Area Reclaim the Chrono Vibranium Experiment Area": "Brinin Tchalla Experiment Area",
+    "Capture the Imperial Dueling Ground Prepare to Head to the Imperial Dueling Ground": "Brinin Tchalla Imperial Dueling Ground",
+    "Capture the Imperial Dueling Ground Prepare to Capture the Imperial Dueling Ground": "Brinin Tchalla Imperial Dueling Ground",
+    "Capture the Imperial Dueling Ground Defend the Imperial Dueling Ground": "Brinin Tchalla Imperial Dueling Ground",
+    "Capture the Imperial Dueling Ground Reclaim the Imperial Dueling Ground": "Brinin Tchalla Imperial Dueling Ground",
+    "Capture the Stellar Spaceport Prepare to Head to the Stellar Spaceport": "Brinin Tchalla Stellar Spaceport",
+    "Capture the Stellar Spaceport Prepare to Capture the Stellar Spaceport": "Brinin Tchalla Stellar Spaceport",
+    "Capture the Stellar Spaceport Defend the Stellar Spaceport": "Brinin Tchalla Stellar Spaceport",
+    "Capture the Stellar Spaceport Reclaim the Stellar Spaceport": "Brinin Tchalla Stellar Spaceport",
+
+    "Capture the Cradle Stop Ultron From Taking Cerebro Prepare to Head to the Cradle": "Krokoa Cradle",
+    "Capture the Cradle Stop Ultron From Taking Cerebro Prepare to Capture the Cradle": "Krokoa Cradle",
+    "Capture the Cradle Stop Ultron From Taking Cerebro Defend the Cradle": "Krokoa Cradle",
+    "Capture the Cradle Stop Ultron From Taking Cerebro Reclaim the Cradle": "Krokoa Cradle",
+    "Capture the Carousel Stop Ultrons Invasion of Krakoa Prepare to Head to the Carousel": "Krokoa Carousel",
+    "Capture the Carousel Stop Ultrons Invasion of Krakoa Prepare to Capture the Carousel": "Krokoa Carousel",
+    "Capture the Carousel Stop Ultrons Invasion of Krakoa Defend the Carousel": "Krokoa Carousel",
+    "Capture the Carousel Stop Ultrons Invasion of Krakoa Reclaim the Carousel": "Krokoa Carousel",
+    "Capture the Grove Stop Ultron From Infecting Krakoa Prepare to Head to The Grove": "Krokoa Grove",
+    "Capture the Grove Stop Ultron From Infecting Krakoa Prepare to Capture The Grove": "Krokoa Grove",
+    "Capture the Grove Stop Ultron From Infecting Krakoa Defend The Grove": "Krokoa Grove",
+    "Capture the Grove Stop Ultron From Infecting Krakoa Reclaim The Grove": "Krokoa Grove",
+
+    "Be the first team to reach 16 points Strive to eliminate more enemies": "Doom match",
+}
@@ -0,0 +1,188 @@
+# OCR backends behind extract_top_left_text, with a process pool of warm engine handles
+#
+# every backend's recognize(gray) returns raw (text, conf) tuples for each word, conf truncated to
+# an int exactly like pytesseract.image_to_data does, so CONFIDENCE_THRESHOLD filtering is unchanged
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+
+# punctuation tesseract may legitimately read in objective banners (clean_text strips it later)
+EXTRA_WHITELIST_CHARS = "'.-"
+
+# pool crashes in a row (e.g. a worker that can't initialize its backend) before OcrPool falls back
+# to pytesseract workers, then to OCR in the calling thread
+MAX_POOL_FAILURES = 3
+
+
+# every character that appears in an objective text, in both cases
+def objective_charset(objectives):
+    chars = set(EXTRA_WHITELIST_CHARS)
+    for text in objectives:
+        for ch in text:
+            if ch.isalnum():
+                chars.update((ch.lower(), ch.upper()))
+    return "".join(sorted(chars))
+
+
+# distinct objective words, as written and uppercased like the in-game banner
+def objective_words(objectives):
+    words = set()
+    for text in objectives:
+        for word in text.split():
+            words.update((word, word.upper()))
+    return sorted(words)
+
+
+class PytesseractBackend:
+    # one tesseract subprocess per image, kept as the fallback and reference behaviour
+    name = "pytesseract"
+
+    def __init__(self, whitelist=None, user_words=None):
+        import pytesseract
+        self.pytesseract = pytesseract
+
+    def recognize(self, gray):
+        ocr_data = self.pytesseract.image_to_data(gray, config="--psm 6", output_type=self.pytesseract.Output.DICT)
+        words = []
+        for i in range(len(ocr_data["text"])):
+            try:
+                conf = int(ocr_data["conf"][i])
+            except ValueError:
+                conf = 0
+            words.append((ocr_data["text"][i], conf))
+        return words
+
+
+class TesserocrBackend:
+    # a warm in-process Tesseract API handle, configured once with --psm 6, a whitelist and user words
+    name = "tesserocr"
+
+    def __init__(self, whitelist=None, user_words=None):
+        import tesserocr
+        self.tesserocr = tesserocr
+        variables = {}
+        if whitelist:
+            variables["tessedit_char_whitelist"] = whitelist
+        self.user_words_file = None
+        if user_words:
+            fd, self.user_words_file = tempfile.mkstemp(prefix="objective-words-", suffix=".txt")
+            with os.fdopen(fd, "w") as f:
+                f.write("\n".join(user_words) + "\n")
+            variables["user_words_file"] = self.user_words_file
+        self.api = tesserocr.PyTessBaseAPI(psm=tesserocr.PSM.SINGLE_BLOCK, variables=variables)
+
+    def recognize(self, gray):
+        gray = np.ascontiguousarray(gray)
+        height, width = gray.shape
+        self.api.SetImageBytes(gray.tobytes(), width, height, 1, width)
+        self.api.Recognize()
+        level = self.tesserocr.RIL.WORD
+        words = []
+        for result in self.tesserocr.iterate_level(self.api.GetIterator(), level):
+            text = result.GetUTF8Text(level)
+            words.append((text or "", int(result.Confidence(level))))
+        return words
+
+    def close(self):
+        self.api.End()
+        if self.user_words_file:
+            os.unlink(self.user_words_file)
+
+
+BACKENDS = {backend.name: backend for backend in (TesserocrBackend, PytesseractBackend)}
+
+
+# builds the preferred backend, falling back to pytesseract when it can't be loaded
+def make_backend(name, whitelist=None, user_words=None):
+    try:
+        return BACKENDS[name](whitelist, user_words)
+    except (ImportError, RuntimeError) as e:
+        if name == PytesseractBackend.name:
+            raise
+        print(f"OCR backend {name!r} unavailable ({e}), falling back to pytesseract.")
+        return PytesseractBackend(whitelist, user_words)
+
+
+# each pool worker process holds one warm backend for its whole lifetime
+_worker_backend = None
+
+
+def _init_worker(name, whitelist, user_words):
+    global _worker_backend
+    _worker_backend = make_backend(name, whitelist, user_words)
+
+
+# errors are re-raised as RuntimeError because some (e.g. TesseractNotFoundError) can't be unpickled
+def _worker_recognize(gray):
+    try:
+        return _worker_backend.recognize(gray)
+    except Exception as e:
+        raise RuntimeError(f"{type(e).__name__}: {e}") from None
+
+
+class OcrPool:
+    # workers=0 runs a backend per calling thread instead of a process pool
+    def __init__(self, backend, workers, whitelist=None, user_words=None):
+        self.backend = backend
+        self.workers = workers
+        self.whitelist = whitelist
+        self.user_words = user_words
+        self.failures = 0
+        self._executor = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    # the pool is started on first use so importing main.py never spawns processes
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.backend, self.whitelist, self.user_words),
+                )
+            return self._executor
+
+    def recognize(self, gray):
+        if self.workers <= 0:
+            backend = getattr(self._local, "backend", None)
+            if backend is None:
+                backend = self._local.backend = make_backend(self.backend, self.whitelist, self.user_words)
+            return backend.recognize(gray)
+        executor = self._get_executor()
+        try:
+            words = executor.submit(_worker_recognize, np.ascontiguousarray(gray)).result()
+        except BrokenProcessPool as e:
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+                    self.failures += 1
+                    self._fall_back(e)
+            executor.shutdown(wait=False)
+            return []
+        self.failures = 0
+        return words
+
+    # restarts a crashed pool, after MAX_POOL_FAILURES crashes in a row with a simpler setup
+    def _fall_back(self, error):
+        if self.failures < MAX_POOL_FAILURES:
+            print(f"OCR worker pool crashed ({error}), restarting it.")
+            return
+        self.failures = 0
+        if self.backend != PytesseractBackend.name:
+            print(f"OCR worker pool keeps crashing with {self.backend!r} ({error}), falling back to pytesseract workers.")
+            self.backend = PytesseractBackend.name
+        else:
+            print(f"OCR worker pool keeps crashing ({error}), running OCR in the calling threads instead.")
+            self.workers = 0
+
+    def close(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
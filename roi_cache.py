@@ -0,0 +1,96 @@
+# per-streamer cache of OCR/detection results keyed on a perceptual hash of the objective ROI
+import threading
+import time
+import cv2
+import numpy as np
+
+# hash grid (columns x rows), the banner is a wide strip of text so use more columns than rows;
+# 32 columns left objectives of different maps within 8 bits of each other (tools/bench_roi_cache.py)
+HASH_WIDTH = 64
+HASH_HEIGHT = 8
+
+# objective text is thin near-white strokes: a white top-hat keeps pixels this much brighter than
+# their TOPHAT_SIZE neighbourhood, so bright but smooth game scenery behind the banner drops out
+TEXT_CONTRAST = 60
+TOPHAT_SIZE = 7
+TOPHAT_KERNEL = cv2.getStructuringElement(cv2.MORPH_RECT, (TOPHAT_SIZE, TOPHAT_SIZE))
+# strokes are widened a pixel so antialiasing and encoding noise move fewer of them across cells
+DILATE_KERNEL = np.ones((3, 3), np.uint8)
+
+# bits out of HASH_WIDTH * HASH_HEIGHT that may differ for a ROI to count as unchanged
+MAX_DISTANCE = 12
+
+# re-run OCR at least this often even when the banner looks unchanged (in seconds)
+MAX_AGE = 60
+
+
+# difference hash of the bright text strokes in a grayscale ROI
+def dhash(gray, width=HASH_WIDTH, height=HASH_HEIGHT, contrast=TEXT_CONTRAST):
+    strokes = cv2.morphologyEx(gray, cv2.MORPH_TOPHAT, TOPHAT_KERNEL)
+    mask = cv2.dilate(np.where(strokes >= contrast, 255, 0).astype(np.uint8), DILATE_KERNEL)
+    small = cv2.resize(mask, (width + 1, height), interpolation=cv2.INTER_AREA).astype(np.int16)
+    return int.from_bytes(np.packbits(small[:, 1:] > small[:, :-1]).tobytes(), "big")
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+class CacheEntry:
+    def __init__(self, roi_hash, phrases, maps_detected, created):
+        self.roi_hash = roi_hash
+        self.phrases = phrases
+        self.maps_detected = maps_detected
+        self.created = created
+        self.hits = 0
+
+
+class ROICache:
+    def __init__(self, max_distance=MAX_DISTANCE, max_age=MAX_AGE):
+        self.max_distance = max_distance
+        self.max_age = max_age
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self.ocr_seconds = 0.0
+        self._lock = threading.Lock()
+
+    # returns (roi_hash, entry) where entry is None unless a fresh, near-identical ROI was seen
+    def lookup(self, streamer, gray_roi):
+        roi_hash = dhash(gray_roi)
+        now = time.time()
+        with self._lock:
+            entry = self.entries.get(streamer)
+            if (entry is not None and now - entry.created <= self.max_age
+                    and hamming(entry.roi_hash, roi_hash) <= self.max_distance):
+                entry.hits += 1
+                self.hits += 1
+                return roi_hash, entry
+            self.misses += 1
+        return roi_hash, None
+
+    # remembers the OCR/detection result for a ROI and how long OCR took
+    def store(self, streamer, roi_hash, phrases, maps_detected, ocr_seconds):
+        with self._lock:
+            self.entries[streamer] = CacheEntry(roi_hash, phrases, maps_detected, time.time())
+            self.ocr_seconds += ocr_seconds
+
+    # drops entries for streamers that went offline and entries past max_age
+    def retain(self, streamers):
+        active = set(streamers)
+        now = time.time()
+        with self._lock:
+            for streamer in list(self.entries):
+                if streamer not in active or now - self.entries[streamer].created > self.max_age:
+                    del self.entries[streamer]
+
+    # estimated OCR time saved, from the mean OCR time of misses
+    @property
+    def seconds_saved(self):
+        return self.hits * self.ocr_seconds / self.misses if self.misses else 0.0
+
+    def print_report(self):
+        total = self.hits + self.misses
+        rate = self.hits / total * 100 if total else 0.0
+        print(f"ROI cache: {self.hits} hits / {self.misses} misses ({rate:.1f}% hit rate), "
+              f"~{self.seconds_saved:.1f}s OCR saved, {len(self.entries)} entries")
@@ -0,0 +1,110 @@
+# per-(streamer, map, hour) detection counts kept next to twitch_maps for the dashboard
+#
+#   python rollups.py            # create the rollup table and indexes, then backfill from twitch_maps
+#
+# DetectionWriter calls apply_detections in the same transaction as each batch insert, so the
+# rollups never drift from the raw rows once the backfill has run.
+import os
+from collections import Counter
+from datetime import datetime
+import mysql.connector
+
+DETECTIONS_TABLE = "twitch_maps"
+ROLLUP_TABLE = "twitch_map_hourly"
+
+ROLLUP_SCHEMA = """CREATE TABLE IF NOT EXISTS {rollup} (
+    streamer VARCHAR(255) NOT NULL,
+    map VARCHAR(255) NOT NULL,
+    hour DATETIME NOT NULL,
+    detections INT NOT NULL,
+    PRIMARY KEY (streamer, map, hour),
+    KEY idx_{rollup}_hour (hour)
+)"""
+
+# (index name suffix, columns) added to the raw detections table
+DETECTION_INDEXES = [
+    ("streamer_ts", "streamer, timestamp"),
+    ("map_ts", "map, timestamp"),
+    ("ts", "timestamp"),
+    # newest id per (streamer, map) for the dashboard's initial load, read from the index alone
+    ("streamer_map_id", "streamer, map, id"),
+]
+
+UPSERT_QUERY = """INSERT INTO {rollup} (streamer, map, hour, detections) VALUES (%s, %s, %s, %s)
+ON DUPLICATE KEY UPDATE detections = detections + VALUES(detections)"""
+
+
+# "YYYY-MM-DD HH:MM:SS" or datetime -> start of its hour
+def hour_of(timestamp):
+    if isinstance(timestamp, datetime):
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return datetime.strptime(str(timestamp)[:13], "%Y-%m-%d %H")
+
+
+# creates the rollup table and the composite indexes on the raw table if they are missing
+def ensure_schema(conn, detections=DETECTIONS_TABLE, rollup=ROLLUP_TABLE):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(ROLLUP_SCHEMA.format(rollup=rollup))
+        cursor.execute(
+            "SELECT DISTINCT index_name FROM information_schema.statistics WHERE table_schema = DATABASE() AND table_name = %s",
+            (detections,),
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+        for suffix, columns in DETECTION_INDEXES:
+            name = f"idx_{detections}_{suffix}"
+            if name not in existing:
+                print(f"Adding index {name} on {detections} ({columns})...")
+                cursor.execute(f"CREATE INDEX {name} ON {detections} ({columns})")
+        conn.commit()
+    finally:
+        cursor.close()
+
+
+# adds a batch of (streamer, timestamp, map, storage_path) rows to the hourly counts,
+# using the caller's cursor so it commits or rolls back with the raw insert
+def apply_detections(cursor, rows, rollup=ROLLUP_TABLE):
+    counts = Counter((streamer, detected_map, hour_of(timestamp)) for streamer, timestamp, detected_map, _ in rows)
+    cursor.executemany(UPSERT_QUERY.format(rollup=rollup),
+                       [(streamer, detected_map, hour, n) for (streamer, detected_map, hour), n in counts.items()])
+
+
+# rebuilds the rollups from every raw row; writers block on the table locks meanwhile and their
+# rows queue up in DetectionWriter, so nothing is counted twice or missed
+def backfill(conn, detections=DETECTIONS_TABLE, rollup=ROLLUP_TABLE):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"LOCK TABLES {detections} READ, {rollup} WRITE")
+        try:
+            cursor.execute(f"DELETE FROM {rollup}")
+            cursor.execute(
+                f"INSERT INTO {rollup} (streamer, map, hour, detections) "
+                f"SELECT streamer, map, DATE_FORMAT(timestamp, '%Y-%m-%d %H:00:00'), COUNT(*) FROM {detections} "
+                f"WHERE streamer IS NOT NULL AND map IS NOT NULL AND timestamp IS NOT NULL "
+                f"GROUP BY streamer, map, DATE_FORMAT(timestamp, '%Y-%m-%d %H:00:00')"
+            )
+            conn.commit()
+        finally:
+            cursor.execute("UNLOCK TABLES")
+        cursor.execute(f"SELECT COUNT(*), COALESCE(SUM(detections), 0) FROM {rollup}")
+        buckets, total = cursor.fetchone()
+        print(f"Backfilled {rollup}: {buckets} hourly buckets covering {total} detections.")
+    finally:
+        cursor.close()
+
+
+if __name__ == "__main__":
+    DB_CONFIG = {
+        "host":     os.environ.get("MYSQL_HOST"),
+        "user":     os.environ.get("MYSQL_USER"),
+        "password": os.environ.get("MYSQL_PASSWORD"),
+        "database": os.environ.get("MYSQL_DATABASE"),
+    }
+    conn = mysql.connector.connect(**DB_CONFIG)
+    try:
+        ensure_schema(conn)
+        backfill(conn)
+    except mysql.connector.Error as err:
+        print(f"Database error: {err}")
+    finally:
+        conn.close()
@@ -0,0 +1,176 @@
+# per-streamer deadline scheduler that runs captures and OCR on a bounded worker pool
+import heapq
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class LagStats:
+    # lag is how late a capture started relative to its deadline
+    def __init__(self):
+        self.samples = 0
+        self.last = 0.0
+        self.max = 0.0
+        self.total = 0.0
+        self.skipped = 0
+
+    def record(self, lag):
+        self.samples += 1
+        self.last = lag
+        self.total += lag
+        self.max = max(self.max, lag)
+
+    @property
+    def mean(self):
+        return self.total / self.samples if self.samples else 0.0
+
+
+class CaptureScheduler:
+    # capture(streamer) returns a payload or None, process(streamer, payload) runs OCR and storage;
+    # interval is the default cadence, set_interval overrides it per streamer
+    def __init__(self, capture, process, interval, max_captures=4, max_ocr=2):
+        self.capture = capture
+        self.process = process
+        self.interval = interval
+        self.intervals = {}
+        self.max_captures = max_captures
+        self.max_ocr = max_ocr
+        self.lag = {}
+        self._due = []
+        self._deadlines = {}
+        self._dispatched = {}
+        self._rescheduled = set()
+        self._in_flight = set()
+        self._captures_running = 0
+        self._ocr_waiting = 0
+        self._ocr_slots = threading.BoundedSemaphore(max_ocr)
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._pool = ThreadPoolExecutor(max_workers=max_captures + 2 * max_ocr, thread_name_prefix="capture")
+
+    # replaces the active roster, new streamers are due immediately
+    def set_streamers(self, streamers):
+        with self._lock:
+            now = time.monotonic()
+            active = set(streamers)
+            for streamer in list(self._deadlines):
+                if streamer not in active:
+                    del self._deadlines[streamer]
+                    self.intervals.pop(streamer, None)
+                    self._dispatched.pop(streamer, None)
+                    self.lag.pop(streamer, None)
+            for streamer in streamers:
+                if streamer not in self._deadlines:
+                    self._deadlines[streamer] = now
+                    self.lag.setdefault(streamer, LagStats())
+                    heapq.heappush(self._due, (now, streamer))
+
+    # dispatches every due streamer that has capacity, returns seconds until the next deadline
+    def tick(self):
+        self._wakeup.clear()
+        with self._lock:
+            now = time.monotonic()
+            while self._due:
+                due, streamer = self._due[0]
+                if self._deadlines.get(streamer) != due:
+                    heapq.heappop(self._due)
+                    continue
+                if due > now:
+                    return due - now
+                if streamer in self._in_flight:
+                    heapq.heappop(self._due)
+                    self.lag[streamer].skipped += 1
+                    self._push_next(streamer, due, now)
+                    continue
+                if self._captures_running >= self.max_captures or self._ocr_waiting >= self.max_ocr:
+                    return None
+                heapq.heappop(self._due)
+                self.lag[streamer].record(now - due)
+                self._in_flight.add(streamer)
+                self._dispatched[streamer] = due
+                self._captures_running += 1
+                self._push_next(streamer, due, now)
+                self._pool.submit(self._run, streamer)
+            return None
+
+    # schedules the next deadline on the original cadence, skipping slots we already missed
+    def _push_next(self, streamer, due, now):
+        interval = self.intervals.get(streamer, self.interval)
+        next_due = due + interval
+        while next_due <= now:
+            next_due += interval
+            self.lag[streamer].skipped += 1
+        self._deadlines[streamer] = next_due
+        heapq.heappush(self._due, (next_due, streamer))
+
+    # changes one streamer's cadence; the next deadline moves to the last dispatch plus the new
+    # interval once any capture in flight has finished
+    def set_interval(self, streamer, interval):
+        with self._lock:
+            if streamer not in self._deadlines or self.intervals.get(streamer, self.interval) == interval:
+                return
+            self.intervals[streamer] = interval
+            if streamer in self._in_flight:
+                self._rescheduled.add(streamer)
+                return
+            self._reschedule(streamer)
+        self._wakeup.set()
+
+    def _reschedule(self, streamer):
+        if streamer not in self._deadlines or streamer not in self._dispatched:
+            return
+        interval = self.intervals.get(streamer, self.interval)
+        next_due = max(self._dispatched[streamer] + interval, time.monotonic())
+        self._deadlines[streamer] = next_due
+        heapq.heappush(self._due, (next_due, streamer))
+
+    def _run(self, streamer):
+        payload = None
+        try:
+            payload = self.capture(streamer)
+        except Exception as e:
+            print(f"Unexpected capture error for {streamer}: {e}")
+        finally:
+            with self._lock:
+                self._captures_running -= 1
+                if payload is not None:
+                    self._ocr_waiting += 1
+            self._wakeup.set()
+        if payload is None:
+            self._finish(streamer)
+            return
+        try:
+            with self._ocr_slots:
+                with self._lock:
+                    self._ocr_waiting -= 1
+                self._wakeup.set()
+                self.process(streamer, payload)
+        except Exception as e:
+            print(f"Unexpected processing error for {streamer}: {e}")
+        finally:
+            self._finish(streamer)
+
+    def _finish(self, streamer):
+        with self._lock:
+            self._in_flight.discard(streamer)
+            if streamer in self._rescheduled:
+                self._rescheduled.discard(streamer)
+                self._reschedule(streamer)
+        self._wakeup.set()
+
+    # sleeps until a deadline passes or a worker frees capacity
+    def wait(self, timeout):
+        if timeout is None or timeout > 0:
+            self._wakeup.wait(timeout)
+
+    # prints last/mean/max start lag and skipped slots per active streamer
+    def print_lag_report(self):
+        with self._lock:
+            rows = [(s, self.lag[s], self.intervals.get(s, self.interval)) for s in sorted(self._deadlines, key=str.lower)]
+            in_flight = len(self._in_flight)
+        print(f"\nScheduler: {len(rows)} streamers, {in_flight} in flight")
+        for streamer, stats, interval in rows:
+            print(f" - {streamer}: every {interval}s, lag last {stats.last:.2f}s mean {stats.mean:.2f}s max {stats.max:.2f}s, skipped {stats.skipped}")
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True)
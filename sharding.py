@@ -0,0 +1,285 @@
+# shares the streamer roster between several main.py instances ("nodes") through two MySQL tables
+#
+# every node heartbeats into tracker_nodes and places the live nodes on a consistent hash ring, so
+# each streamer has one preferred node and a node joining or leaving only moves its own share.
+# Owning a streamer takes a row in streamer_leases: a node only takes a lease that is free, its
+# own, or expired, and releases the ones the ring moved elsewhere, so a streamer is never held by
+# two nodes. A node only captures while its lease is unexpired by its local clock minus
+# SAFETY_MARGIN. Expiry is judged by the database clock, so node clocks need not agree.
+#
+# A node that dies stops renewing; the others drop it from their ring after NODE_TIMEOUT and take
+# its streamers once its leases expire, so they move within max(LEASE_TTL, NODE_TIMEOUT) plus one
+# renewal interval. A node that shuts down cleanly releases its leases at once.
+#
+#   python sharding.py                                    # list nodes and their lease counts
+#   python -m tools.shard_sim --nodes 3 --streamers 60    # several local nodes against MySQL/MariaDB
+import hashlib
+import os
+import socket
+import time
+from bisect import bisect
+import mysql.connector
+
+NODES_TABLE = "tracker_nodes"
+LEASES_TABLE = "streamer_leases"
+
+NODES_SCHEMA = """CREATE TABLE IF NOT EXISTS {nodes} (
+    node_id VARCHAR(128) NOT NULL PRIMARY KEY,
+    weight INT NOT NULL DEFAULT 1,
+    started_at DATETIME(3) NOT NULL,
+    heartbeat_at DATETIME(3) NOT NULL
+)"""
+
+LEASES_SCHEMA = """CREATE TABLE IF NOT EXISTS {leases} (
+    streamer VARCHAR(255) NOT NULL PRIMARY KEY,
+    node_id VARCHAR(128) NOT NULL,
+    acquired_at DATETIME(3) NOT NULL,
+    expires_at DATETIME(3) NOT NULL,
+    KEY idx_{leases}_node (node_id)
+)"""
+
+# seconds a lease lasts after each renewal, and how often nodes renew (well below the TTL so a
+# slow or failed renewal doesn't drop streamers)
+LEASE_TTL = 30
+RENEW_INTERVAL = 10
+
+# a node whose heartbeat is older than this leaves everyone's ring
+NODE_TIMEOUT = 30
+
+# a node stops capturing this long before its lease expires, covering the renewal round trip,
+# clock rate differences and the capture already in flight
+SAFETY_MARGIN = 5
+
+# node rows not heartbeating for this long are deleted
+NODE_EXPIRY = 24 * 3600
+
+# ring points per unit of node weight
+VIRTUAL_NODES = 64
+
+
+def default_node_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def ring_position(key):
+    return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], "big")
+
+
+# creates the node and lease tables if they are missing
+def ensure_shard_tables(conn, nodes=NODES_TABLE, leases=LEASES_TABLE):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(NODES_SCHEMA.format(nodes=nodes))
+        cursor.execute(LEASES_SCHEMA.format(leases=leases))
+        conn.commit()
+    finally:
+        cursor.close()
+
+
+class HashRing:
+    # weights: {node_id: weight}; a node with weight 2 gets about twice the streamers
+    def __init__(self, weights, virtual_nodes=VIRTUAL_NODES):
+        points = []
+        for node, weight in weights.items():
+            for i in range(max(int(weight), 1) * virtual_nodes):
+                points.append((ring_position(f"{node}#{i}"), node))
+        points.sort()
+        self.positions = [position for position, _ in points]
+        self.nodes = [node for _, node in points]
+
+    def owner(self, key):
+        if not self.nodes:
+            return None
+        return self.nodes[bisect(self.positions, ring_position(key)) % len(self.nodes)]
+
+
+class ShardCoordinator:
+    # connect() returns a new DB-API connection (mysql.connector or pymysql)
+    def __init__(self, connect, node_id=None, weight=1, lease_ttl=LEASE_TTL, node_timeout=NODE_TIMEOUT,
+                 safety_margin=SAFETY_MARGIN, nodes_table=NODES_TABLE, leases_table=LEASES_TABLE):
+        self.connect = connect
+        self.node_id = node_id or default_node_id()
+        self.weight = weight
+        self.lease_ttl = lease_ttl
+        self.node_timeout = node_timeout
+        self.safety_margin = safety_margin
+        self.nodes_table = nodes_table
+        self.leases_table = leases_table
+        # streamer -> local monotonic time this node must stop capturing it
+        self.deadlines = {}
+        self.nodes = []
+        self.renewals = 0
+        self.failed_renewals = 0
+        self.acquired = 0
+        self.released = 0
+        self._reported = set()
+        self._conn = None
+
+    # True while this node may capture the streamer
+    def holds(self, streamer):
+        deadline = self.deadlines.get(streamer)
+        return deadline is not None and time.monotonic() < deadline
+
+    def owned(self):
+        now = time.monotonic()
+        return {streamer for streamer, deadline in self.deadlines.items() if now < deadline}
+
+    def _cursor(self):
+        if self._conn is None:
+            self._conn = self.connect()
+        return self._conn.cursor()
+
+    def _reset(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+        self._conn = None
+
+    # heartbeats, rebuilds the ring from live nodes, then releases, takes and renews leases so this
+    # node holds the roster streamers the ring gives it; returns (gained, lost) since the last call.
+    # On database errors the held leases of streamers this node should still capture are left to
+    # lapse at their local deadlines; the others stop at once.
+    def renew(self, roster):
+        started = time.monotonic()
+        wanted = None
+        try:
+            cursor = self._cursor()
+            try:
+                self._heartbeat(cursor)
+                self._conn.commit()
+                ring = HashRing(dict(self.nodes))
+                wanted = sorted({s for s in roster if ring.owner(s) == self.node_id})
+                release = self._update_leases(cursor, wanted)
+                # stop capturing before the release commits, or the new owner could start while this node still does
+                for streamer in release:
+                    self.deadlines.pop(streamer, None)
+                self._conn.commit()
+                cursor.execute(
+                    f"SELECT streamer, TIMESTAMPDIFF(MICROSECOND, UTC_TIMESTAMP(3), expires_at) FROM {self.leases_table} "
+                    f"WHERE node_id = %s AND expires_at > UTC_TIMESTAMP(3)",
+                    (self.node_id,),
+                )
+                held = cursor.fetchall()
+                self._conn.commit()
+            finally:
+                cursor.close()
+        except Exception as e:
+            self.failed_renewals += 1
+            print(f"Lease renewal for node {self.node_id} failed: {e}")
+            self._reset()
+            # the release may have committed before the failure; without a ring, streamers left in the roster are kept
+            keep = set(wanted) if wanted is not None else set(roster)
+            self.deadlines = {streamer: deadline for streamer, deadline in self.deadlines.items() if streamer in keep}
+        else:
+            self.renewals += 1
+            # remaining time was read after started, so started + remaining is never later than the real expiry
+            self.deadlines = {streamer: started + min(remaining / 1e6, self.lease_ttl) - self.safety_margin
+                              for streamer, remaining in held}
+        current = self.owned()
+        gained, lost = current - self._reported, self._reported - current
+        self._reported = current
+        self.acquired += len(gained)
+        self.released += len(lost)
+        return gained, lost
+
+    def _heartbeat(self, cursor):
+        cursor.execute(
+            f"INSERT INTO {self.nodes_table} (node_id, weight, started_at, heartbeat_at) "
+            f"VALUES (%s, %s, UTC_TIMESTAMP(3), UTC_TIMESTAMP(3)) "
+            f"ON DUPLICATE KEY UPDATE weight = VALUES(weight), heartbeat_at = VALUES(heartbeat_at)",
+            (self.node_id, self.weight),
+        )
+        cursor.execute(f"DELETE FROM {self.nodes_table} WHERE heartbeat_at < UTC_TIMESTAMP(3) - INTERVAL %s SECOND",
+                       (NODE_EXPIRY,))
+        cursor.execute(
+            f"SELECT node_id, weight FROM {self.nodes_table} "
+            f"WHERE heartbeat_at > UTC_TIMESTAMP(3) - INTERVAL %s MICROSECOND ORDER BY node_id",
+            (int(self.node_timeout * 1e6),),
+        )
+        self.nodes = [(node, weight) for node, weight in cursor.fetchall()]
+
+    # returns the streamers whose leases were released
+    def _update_leases(self, cursor, wanted):
+        ttl = int(self.lease_ttl * 1e6)
+        # leases the ring moved away, or for streamers no longer in the roster, go first so their
+        # new owner can take them on its next renewal
+        cursor.execute(f"SELECT streamer FROM {self.leases_table} WHERE node_id = %s", (self.node_id,))
+        keep = set(wanted)
+        release = [streamer for (streamer,) in cursor.fetchall() if streamer not in keep]
+        for chunk in chunks(release):
+            cursor.execute(
+                f"DELETE FROM {self.leases_table} WHERE node_id = %s AND streamer IN ({', '.join(['%s'] * len(chunk))})",
+                (self.node_id, *chunk),
+            )
+        for chunk in chunks(wanted):
+            # free streamers are inserted, leases this node holds or that expired are taken over;
+            # a lease another node holds is left alone until it expires or is released
+            cursor.executemany(
+                f"INSERT IGNORE INTO {self.leases_table} (streamer, node_id, acquired_at, expires_at) "
+                f"VALUES (%s, %s, UTC_TIMESTAMP(3), UTC_TIMESTAMP(3) + INTERVAL %s MICROSECOND)",
+                [(streamer, self.node_id, ttl) for streamer in chunk],
+            )
+            cursor.execute(
+                f"UPDATE {self.leases_table} SET acquired_at = IF(node_id = %s, acquired_at, UTC_TIMESTAMP(3)), "
+                f"node_id = %s, expires_at = UTC_TIMESTAMP(3) + INTERVAL %s MICROSECOND "
+                f"WHERE streamer IN ({', '.join(['%s'] * len(chunk))}) AND (node_id = %s OR expires_at <= UTC_TIMESTAMP(3))",
+                (self.node_id, self.node_id, ttl, *chunk, self.node_id),
+            )
+        return release
+
+    # stops capturing, then releases every lease and leaves the ring so others take over at once
+    def close(self):
+        self.deadlines = {}
+        try:
+            cursor = self._cursor()
+            try:
+                cursor.execute(f"DELETE FROM {self.leases_table} WHERE node_id = %s", (self.node_id,))
+                cursor.execute(f"DELETE FROM {self.nodes_table} WHERE node_id = %s", (self.node_id,))
+                self._conn.commit()
+            finally:
+                cursor.close()
+        except Exception as e:
+            print(f"Unable to release leases for node {self.node_id}: {e}")
+        finally:
+            self._reset()
+
+    def print_report(self):
+        owned = self.owned()
+        print(f"\nShard {self.node_id}: {len(owned)} streamers leased, {len(self.nodes)} live nodes "
+              f"({', '.join(node for node, _ in self.nodes)}), {self.renewals} renewals ({self.failed_renewals} failed), "
+              f"{self.acquired} acquired, {self.released} released")
+
+
+def chunks(items, size=500):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+if __name__ == "__main__":
+    DB_CONFIG = {
+        "host":     os.environ.get("MYSQL_HOST"),
+        "user":     os.environ.get("MYSQL_USER"),
+        "password": os.environ.get("MYSQL_PASSWORD"),
+        "database": os.environ.get("MYSQL_DATABASE"),
+    }
+    conn = mysql.connector.connect(**DB_CONFIG)
+    try:
+        ensure_shard_tables(conn)
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT node_id, weight, started_at, heartbeat_at FROM {NODES_TABLE} ORDER BY node_id")
+        nodes = cursor.fetchall()
+        cursor.execute(f"SELECT node_id, COUNT(*), MIN(expires_at) FROM {LEASES_TABLE} GROUP BY node_id ORDER BY node_id")
+        leases = {node: (count, expires) for node, count, expires in cursor.fetchall()}
+        cursor.close()
+    except mysql.connector.Error as err:
+        print(f"Database error: {err}")
+        raise SystemExit(1)
+    finally:
+        conn.close()
+    print(f"{len(nodes)} nodes:")
+    for node, weight, started, heartbeat in nodes:
+        count, _ = leases.pop(node, (0, None))
+        print(f" - {node} (weight {weight}): {count} leases, started {started}, last heartbeat {heartbeat}")
+    for node, (count, expires) in leases.items():
+        print(f" - {node} (no heartbeat): {count} leases, first expiring {expires}")
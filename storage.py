@@ -0,0 +1,225 @@
+# asynchronous, bounded screenshot store so encoding and disk writes stay off the capture/OCR path
+#
+# screenshots are named by a hash of their pixels, so a frame that was already stored (a stalled
+# stream, a paused game) is written once and every row points at the same file. Images are WebP
+# or JPEG, with a small thumbnail written next to them for the dashboard. The store keeps within
+# a byte budget and an age limit by deleting the least recently used screenshots first; a repeat
+# of a stored frame counts as a use.
+import hashlib
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+import cv2
+
+SCREENSHOT_DIR = "/tmp/twitch_maps_screenshots"
+THUMBNAIL_SUBDIR = "thumbs"
+
+# "jpg", "webp" or "png" (lossless, roughly 40x larger); webp is a little smaller than jpg but
+# costs an order of magnitude more CPU to encode on full frames
+SCREENSHOT_FORMAT = "jpg"
+SCREENSHOT_QUALITY = 80
+
+# thumbnails are scaled down to this width and encoded like the screenshot
+THUMBNAIL_WIDTH = 480
+
+# screenshots (thumbnails included) are evicted least recently used first beyond this many bytes,
+# and once unused for SCREENSHOT_MAX_AGE seconds
+SCREENSHOT_MAX_BYTES = 2 * 1024 ** 3
+SCREENSHOT_MAX_AGE = 7 * 24 * 3600
+
+# frames waiting to be encoded, extra frames are dropped rather than blocking capture
+MAX_PENDING_WRITES = 32
+
+QUALITY_FLAGS = {"webp": cv2.IMWRITE_WEBP_QUALITY, "jpg": cv2.IMWRITE_JPEG_QUALITY}
+
+
+# thumbnail written for a screenshot path (the path itself may predate thumbnails)
+def thumbnail_path(path):
+    directory, name = os.path.split(path)
+    return os.path.join(directory, THUMBNAIL_SUBDIR, name)
+
+
+# pixel hash used as the file name, shape included so equal bytes at different sizes differ
+def frame_digest(frame):
+    digest = hashlib.blake2b(str(frame.shape).encode(), digest_size=16)
+    digest.update(frame if frame.flags.c_contiguous else frame.copy(order="C"))
+    return digest.hexdigest()
+
+
+class ScreenshotWriter:
+    def __init__(self, directory=SCREENSHOT_DIR, image_format=SCREENSHOT_FORMAT, quality=SCREENSHOT_QUALITY,
+                 thumbnail_width=THUMBNAIL_WIDTH, max_bytes=SCREENSHOT_MAX_BYTES, max_age=SCREENSHOT_MAX_AGE,
+                 max_pending=MAX_PENDING_WRITES):
+        self.directory = directory
+        self.image_format = image_format
+        self.thumbnail_width = thumbnail_width
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.params = [QUALITY_FLAGS[image_format], quality] if image_format in QUALITY_FLAGS else []
+        self.bytes_written = 0
+        self.files_written = 0
+        self.deduplicated = 0
+        self.evicted = 0
+        self.dropped = 0
+        # digest -> [bytes on disk, last use], least recently used first
+        self.index = OrderedDict()
+        self.stored_bytes = 0
+        self._pending = set()
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(directory, THUMBNAIL_SUBDIR), exist_ok=True)
+        self._load_index()
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(target=self._drain, name="screenshot-writer", daemon=True)
+        self._thread.start()
+
+    # path a screenshot with this digest is stored at
+    def path_for(self, digest):
+        return os.path.join(self.directory, f"{digest}.{self.image_format}")
+
+    # picks up screenshots from earlier runs, ordered by last use (mtime)
+    def _load_index(self):
+        suffix = f".{self.image_format}"
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".tmp"):
+                # half-written file from a run that was killed mid-write
+                os.remove(entry.path)
+                continue
+            if not entry.name.endswith(suffix) or not entry.is_file():
+                continue
+            size = entry.stat().st_size
+            try:
+                size += os.path.getsize(thumbnail_path(entry.path))
+            except OSError:
+                pass
+            entries.append((entry.stat().st_mtime, entry.name[:-len(suffix)], size))
+        for mtime, digest, size in sorted(entries):
+            self.index[digest] = [size, mtime]
+            self.stored_bytes += size
+        if entries:
+            print(f"Screenshot store: {len(entries)} screenshots, {self.stored_bytes / 1024 ** 2:.1f} MiB in {self.directory}")
+
+    # queues the frame for encoding and returns its path, reusing the stored file for a repeated
+    # frame; None when the queue is full
+    def save(self, streamer, timestamp, frame):
+        digest = frame_digest(frame)
+        path = self.path_for(digest)
+        with self._lock:
+            entry = self.index.get(digest)
+            if entry is not None:
+                entry[1] = time.time()
+                self.index.move_to_end(digest)
+                self.deduplicated += 1
+                touch = True
+            elif digest in self._pending:
+                self.deduplicated += 1
+                return path
+            else:
+                touch = False
+                self._pending.add(digest)
+        if touch:
+            try:
+                # persists the use for the LRU order after a restart
+                os.utime(path)
+            except OSError:
+                pass
+            return path
+        try:
+            self._queue.put_nowait((digest, frame))
+        except queue.Full:
+            with self._lock:
+                self._pending.discard(digest)
+            self.dropped += 1
+            print(f"Screenshot queue full, dropping frame for {streamer}")
+            return None
+        return path
+
+    def _encode(self, image):
+        ok, encoded = cv2.imencode(f".{self.image_format}", image, self.params)
+        return encoded if ok else None
+
+    def _thumbnail(self, frame):
+        height, width = frame.shape[:2]
+        if width > self.thumbnail_width:
+            frame = cv2.resize(frame, (self.thumbnail_width, round(height * self.thumbnail_width / width)),
+                               interpolation=cv2.INTER_AREA)
+        return self._encode(frame)
+
+    def _write(self, digest, frame):
+        path = self.path_for(digest)
+        encoded = self._encode(frame)
+        thumbnail = self._thumbnail(frame) if encoded is not None else None
+        if thumbnail is None:
+            print(f"Unable to encode screenshot {path}")
+            return
+        try:
+            # thumbnail first, so a screenshot on disk always has one
+            for target, data in ((thumbnail_path(path), thumbnail), (path, encoded)):
+                tmp_path = target + ".tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(data.tobytes())
+                os.replace(tmp_path, target)
+        except OSError as e:
+            print(f"Unable to write screenshot {path}: {e}")
+            return
+        size = encoded.nbytes + thumbnail.nbytes
+        with self._lock:
+            self.index[digest] = [size, time.time()]
+            self.stored_bytes += size
+        self.bytes_written += size
+        self.files_written += 1
+
+    # deletes least recently used screenshots until the store is within its byte and age budget
+    def _evict(self):
+        cutoff = time.time() - self.max_age
+        while True:
+            with self._lock:
+                if not self.index:
+                    return
+                digest, (size, last_used) = next(iter(self.index.items()))
+                if self.stored_bytes <= self.max_bytes and last_used >= cutoff:
+                    return
+                del self.index[digest]
+                self.stored_bytes -= size
+            path = self.path_for(digest)
+            for target in (path, thumbnail_path(path)):
+                try:
+                    os.remove(target)
+                except OSError:
+                    pass
+            self.evicted += 1
+
+    def _drain(self):
+        # applies the budget to screenshots left by earlier runs
+        self._evict()
+        while True:
+            try:
+                item = self._queue.get(timeout=60)
+            except queue.Empty:
+                # age-based eviction keeps running while nothing is being written
+                self._evict()
+                continue
+            if item is None:
+                break
+            digest, frame = item
+            try:
+                self._write(digest, frame)
+            finally:
+                with self._lock:
+                    self._pending.discard(digest)
+            self._evict()
+
+    def print_report(self):
+        with self._lock:
+            count, stored = len(self.index), self.stored_bytes
+        saved = self.files_written + self.deduplicated
+        print(f"\nScreenshots: {count} stored, {stored / 1024 ** 2:.1f}/{self.max_bytes / 1024 ** 2:.0f} MiB, "
+              f"{self.files_written} written ({self.bytes_written / max(self.files_written, 1) / 1024:.1f} KiB each), "
+              f"{self.deduplicated}/{saved} deduplicated, {self.evicted} evicted, {self.dropped} dropped")
+
+    # waits for queued frames to be written
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
@@ -0,0 +1,90 @@
+# compares per-row connect/insert/commit with the batched DetectionWriter on a local MySQL/MariaDB
+#
+#   MYSQL_HOST=127.0.0.1 MYSQL_USER=root MYSQL_PASSWORD=... MYSQL_DATABASE=twitch_data \
+#       python -m tools.bench_db_writer --rows 5000
+#
+# rows go into a scratch table (twitch_maps_bench) that is dropped afterwards.
+import argparse
+import os
+import time
+import mysql.connector
+
+from db_writer import DetectionWriter, percentile
+
+DB_CONFIG = {
+    "host":     os.environ.get("MYSQL_HOST"),
+    "user":     os.environ.get("MYSQL_USER"),
+    "password": os.environ.get("MYSQL_PASSWORD"),
+    "database": os.environ.get("MYSQL_DATABASE"),
+}
+
+BENCH_TABLE = "twitch_maps_bench"
+
+
+def make_rows(count):
+    return [(f"streamer{i % 50}", time.strftime("%Y-%m-%d %H:%M:%S"), "Krokoa Grove", f"/tmp/bench_{i}.png")
+            for i in range(count)]
+
+
+# the original save_to_database: new connection, one insert, commit, close
+def legacy_insert(row):
+    conn = mysql.connector.connect(**DB_CONFIG)
+    cursor = conn.cursor()
+    cursor.execute(f"INSERT INTO {BENCH_TABLE} (streamer, timestamp, map, storage_path) VALUES (%s, %s, %s, %s)", row)
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+
+def execute(sql):
+    conn = mysql.connector.connect(**DB_CONFIG)
+    cursor = conn.cursor()
+    cursor.execute(sql)
+    result = cursor.fetchall() if cursor.with_rows else None
+    conn.commit()
+    cursor.close()
+    conn.close()
+    return result
+
+
+def run(count):
+    execute(f"DROP TABLE IF EXISTS {BENCH_TABLE}")
+    execute(f"CREATE TABLE {BENCH_TABLE} (id INT AUTO_INCREMENT PRIMARY KEY, streamer VARCHAR(255), "
+            f"timestamp DATETIME, map VARCHAR(255), storage_path TEXT)")
+    rows = make_rows(count)
+    try:
+        legacy_count = min(count, 1000)
+        latencies = []
+        start = time.perf_counter()
+        for row in rows[:legacy_count]:
+            t = time.perf_counter()
+            legacy_insert(row)
+            latencies.append(time.perf_counter() - t)
+        legacy_rate = legacy_count / (time.perf_counter() - start)
+        latencies.sort()
+        print(f"legacy : {legacy_rate:8.1f} rows/s, per-row latency p50 {percentile(latencies, 50) * 1000:.1f} ms "
+              f"p95 {percentile(latencies, 95) * 1000:.1f} ms ({legacy_count} rows)")
+
+        execute(f"TRUNCATE TABLE {BENCH_TABLE}")
+        writer = DetectionWriter(DB_CONFIG, table=BENCH_TABLE, spill_path="/tmp/twitch_maps_bench_spill.jsonl")
+        start = time.perf_counter()
+        submit_start = time.perf_counter()
+        for row in rows:
+            writer.submit(*row)
+        submit_time = time.perf_counter() - submit_start
+        writer.close()
+        elapsed = time.perf_counter() - start
+        latencies = sorted(writer.flush_latencies)
+        stored = execute(f"SELECT COUNT(*) FROM {BENCH_TABLE}")[0][0]
+        print(f"batched: {count / elapsed:8.1f} rows/s, flush latency p50 {percentile(latencies, 50) * 1000:.1f} ms "
+              f"p95 {percentile(latencies, 95) * 1000:.1f} ms, submit {submit_time / count * 1e6:.1f} us/row, "
+              f"{stored}/{count} rows stored")
+    finally:
+        execute(f"DROP TABLE IF EXISTS {BENCH_TABLE}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark detection inserts against a local MySQL/MariaDB.")
+    parser.add_argument("--rows", type=int, default=5000)
+    args = parser.parse_args()
+    run(args.rows)
@@ -0,0 +1,193 @@
+# coverage per unit of compute: the fixed STREAMERS list against discovery with a capture budget,
+# ranked by viewers only or by viewers and time since last sampled
+#
+# a synthetic population of streams (power-law viewers, sessions that start, end and wander off to
+# other games, back-to-back matches of 8-15 minutes) is written as a recorded-listing fixture and
+# replayed through tools.fake_helix, so discovery pages the same /streams?game_id= responses it
+# would get from Helix. A match counts as observed once it got MIN_VOTES samples.
+#
+# Samples are also fed through the match state as main.py does, counting the twitch_maps rows
+# written in "changes" mode while state is kept for every live candidate, against ending it
+# whenever a stream is rotated out of the budget; streams a real run would calibrate are counted too.
+#
+#   python -m tools.bench_discovery --streams 800 --hours 4 --cpu-budget 4
+import argparse
+import os
+import random
+import tempfile
+
+from discovery import StreamDiscovery, DEFAULT_DECODE_CPU, DEFAULT_BANDWIDTH_MBPS, OCR_CPU
+from helix import HelixClient, MARVEL_RIVALS_GAME_ID, is_playing_rivals
+from match_state import MIN_VOTES, UNKNOWN_MAP, MatchStateTracker
+from objectives import MAP_OBJECTIVES
+from tools.fake_helix import FakeHelixState, load_fixture, make_stream, save_fixture, start_server
+
+# the tracker's status check interval, sample interval and stream startup time
+STEP = 30
+SAMPLE_INTERVAL = 5
+STREAM_START = 5
+
+PINNED = 17
+
+
+# per stream: viewers and a timeline of (start, end, game) segments; per Rivals segment, its matches
+def make_population(count, hours, seed):
+    rng = random.Random(seed)
+    # drawn separately so the timelines stay the same for a seed
+    map_rng = random.Random(seed + 1)
+    maps = sorted(set(MAP_OBJECTIVES.values()))
+    horizon = hours * 3600
+    population = []
+    for i in range(count):
+        # the first PINNED streams stand in for STREAMERS: established, well watched channels
+        viewers = int(min(100000, 5 * rng.paretovariate(1.1))) + (300 if i < PINNED else 0)
+        segments, matches = [], []
+        t = rng.uniform(-3 * 3600, horizon)
+        while t < horizon:
+            end = t + rng.uniform(3600, 5 * 3600)
+            # some sessions open in another category before switching to Marvel Rivals
+            if rng.random() < 0.3:
+                chat_end = min(end, t + rng.uniform(600, 1800))
+                segments.append((t, chat_end, "Just Chatting"))
+                t = chat_end
+            segments.append((t, end, "Marvel Rivals"))
+            match_start = t
+            while match_start < end:
+                match_end = min(end, match_start + rng.uniform(480, 900))
+                matches.append((match_start, match_end, map_rng.choice(maps)))
+                match_start = match_end + rng.uniform(30, 120)
+            t = end + rng.uniform(4 * 3600, 20 * 3600)
+        population.append({"login": f"streamer{i:04d}", "viewers": viewers, "segments": segments, "matches": matches})
+    return population
+
+
+def live_streams(population, t):
+    streams = []
+    for stream in population:
+        for start, end, game in stream["segments"]:
+            if start <= t < end:
+                game_id = MARVEL_RIVALS_GAME_ID if game == "Marvel Rivals" else "509658"
+                streams.append(make_stream(stream["login"], game, stream["viewers"], game_id))
+                break
+    return streams
+
+
+# sample times of a stream selected from t for one step; newly selected streams start up first
+def sample_times(t, newly_selected):
+    first = t + (STREAM_START if newly_selected else 0)
+    return [first + k * SAMPLE_INTERVAL for k in range(int((t + STEP - first) / SAMPLE_INTERVAL) + 1) if first + k * SAMPLE_INTERVAL < t + STEP]
+
+
+# map on screen at time t: the match's, or Unknown Map between matches
+def map_at(stream, t):
+    for start, end, detected_map in stream["matches"]:
+        if start <= t < end:
+            return detected_map
+    return UNKNOWN_MAP
+
+
+# twitch_maps rows written in "changes" mode: one per match start or map change
+def stored_rows(events):
+    return sum(1 for event in events if event.kind != "end")
+
+
+# select(helix, t) returns (streams sampled, live candidates, streams calibrated)
+def simulate(name, population, state, base_url, hours, select):
+    helix = HelixClient("bench", "bench", base_url=base_url)
+    by_login = {stream["login"]: stream for stream in population}
+    # match state kept for live candidates (main.py), and ended on every rotation out of the budget
+    kept, rotated = MatchStateTracker(), MatchStateTracker()
+    rows = rotated_rows = 0
+    calibrated = set()
+    samples = {}
+    previous = set()
+    core_seconds = 0.0
+    starts = 0
+    for step in range(int(hours * 3600 / STEP)):
+        t = step * STEP
+        state.replay_time = t
+        selected, live, settled = select(helix, t)
+        selected = set(selected)
+        calibrated.update(settled)
+        rows += stored_rows(kept.retain(live, t)[0])
+        rotated_rows += stored_rows(rotated.retain(selected, t)[0])
+        starts += len(selected - previous)
+        core_seconds += len(selected) * (DEFAULT_DECODE_CPU + OCR_CPU) * STEP
+        for login in sorted(selected):
+            times = sample_times(t, login not in previous)
+            samples.setdefault(login, []).extend(times)
+            for s in times:
+                detected_map = map_at(by_login[login], s)
+                rows += stored_rows(kept.observe(login, detected_map, s)[0])
+                rotated_rows += stored_rows(rotated.observe(login, detected_map, s)[0])
+        previous = selected
+    horizon = hours * 3600
+    total = observed = 0
+    total_views = observed_views = 0
+    for stream in population:
+        times = samples.get(stream["login"], [])
+        for start, end, _ in stream["matches"]:
+            if end <= 0 or start >= horizon:
+                continue
+            total += 1
+            total_views += stream["viewers"]
+            if sum(1 for s in times if start <= s < end) >= MIN_VOTES:
+                observed += 1
+                observed_views += stream["viewers"]
+    core_hours = core_seconds / 3600
+    print(f"{name:<22} {observed:6d}/{total} matches ({observed / max(total, 1):5.1%}, {observed_views / max(total_views, 1):5.1%} "
+          f"viewer-weighted) {len(samples):5d} streams sampled {core_hours:7.1f} core-h "
+          f"{observed / max(core_hours, 1e-9):7.1f} matches/core-h {helix.requests_sent / hours:7.0f} Helix req/h "
+          f"{starts / hours:6.0f} stream starts/h {rows / hours:6.0f} rows/h ({rotated_rows / hours:.0f} if rotation "
+          f"ended matches) {len(calibrated):5d} streams calibrated")
+    helix.close()
+
+
+def run(count, hours, cpu_budget, seed):
+    population = make_population(count, hours, seed)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "helix_streams.json")
+        save_fixture(path, [(t, live_streams(population, t)) for t in range(0, int(hours * 3600), STEP)], MARVEL_RIVALS_GAME_ID)
+        snapshots = load_fixture(path)
+        print(f"{count} streams over {hours}h, {len(snapshots)} recorded listings ({os.path.getsize(path) / 1024 ** 2:.1f} MiB), "
+              f"{max(len(streams) for _, streams in snapshots)} live at peak, budget {cpu_budget} cores "
+              f"(~{int(cpu_budget / (DEFAULT_DECODE_CPU + OCR_CPU))} streams)")
+    state = FakeHelixState(ratelimit=10 ** 9, snapshots=snapshots)
+    server, base_url = start_server(state)
+    pinned = [stream["login"] for stream in population[:PINNED]]
+
+    # the old loop: poll the fixed list every cycle, capture whoever is live on Marvel Rivals
+    def fixed_list(helix, t):
+        statuses = helix.get_stream_statuses(pinned)
+        online = [login for login in pinned if is_playing_rivals(statuses[login])]
+        return online, online, online
+
+    def discovery(**weights):
+        clock = {"t": 0}
+        tracker = StreamDiscovery(helix=None, pinned=pinned, max_pages=None, cpu_budget=cpu_budget,
+                                  bandwidth_budget=cpu_budget / (DEFAULT_DECODE_CPU + OCR_CPU) * DEFAULT_BANDWIDTH_MBPS,
+                                  max_streams=10 ** 6, clock=lambda: clock["t"], **weights)
+
+        def select(helix, t):
+            tracker.helix = helix
+            clock["t"] = t
+            tracker.refresh()
+            return tracker.plan(), tracker.streamers(), tracker.settled()
+        return select
+
+    try:
+        simulate("fixed STREAMERS list", population, state, base_url, hours, fixed_list)
+        simulate("discovery, top viewers", population, state, base_url, hours, discovery(staleness_weight=0, min_dwell=0))
+        simulate("discovery, priority", population, state, base_url, hours, discovery())
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare fixed-list tracking with budgeted stream discovery.")
+    parser.add_argument("--streams", type=int, default=800)
+    parser.add_argument("--hours", type=float, default=4)
+    parser.add_argument("--cpu-budget", type=float, default=4.0)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    run(args.streams, args.hours, args.cpu_budget, args.seed)
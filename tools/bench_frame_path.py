@@ -0,0 +1,85 @@
+# compares the old PNG round-trip through /tmp with the in-memory ROI path (OCR excluded)
+#
+#   python -m tools.bench_frame_path --frames 50 --width 1920 --height 1080
+import argparse
+import os
+import tempfile
+import time
+import cv2
+import numpy as np
+
+from detection import crop_objective_roi
+from storage import ScreenshotWriter
+
+
+# game-like frame: gradient background, noise and an objective banner in the top-left
+def synthetic_frame(width, height, seed=0):
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    frame = np.dstack([(x + y) / 2, np.broadcast_to(x, (height, width)), np.broadcast_to(y, (height, width))])
+    frame = (frame + rng.normal(0, 12, frame.shape)).clip(0, 255).astype(np.uint8)
+    cv2.putText(frame, "Capture the Throne Room", (int(width * 0.02), int(height * 0.06)),
+                cv2.FONT_HERSHEY_SIMPLEX, height / 1080, (255, 255, 255), 2)
+    return frame
+
+
+# ffmpeg writes a PNG, then extract_top_left_text reads it back and grays the whole frame
+def old_path(frame, path):
+    cv2.imwrite(path, frame)
+    image = cv2.imread(path)
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    h, w = gray.shape
+    roi = gray[int(h * 0.032):int(h * 0.093), int(w * 0.013):int(w * 0.313)]
+    return roi, os.path.getsize(path)
+
+
+def measure(label, frames, fn):
+    cpu = time.process_time()
+    wall = time.perf_counter()
+    written = 0
+    for i, frame in enumerate(frames):
+        written += fn(i, frame)
+    cpu = time.process_time() - cpu
+    wall = time.perf_counter() - wall
+    n = len(frames)
+    print(f"{label:<28} {cpu / n * 1000:8.2f} ms CPU/frame {wall / n * 1000:8.2f} ms wall/frame {written / n / 1024:9.1f} KiB written/frame")
+
+
+def run(count, width, height):
+    frames = [synthetic_frame(width, height, seed) for seed in range(count)]
+    with tempfile.TemporaryDirectory() as directory:
+        def old(i, frame):
+            roi, size = old_path(frame, os.path.join(directory, f"old_{i}.png"))
+            return size
+
+        def new(i, frame):
+            crop_objective_roi(frame)
+            return 0
+
+        writer = ScreenshotWriter(directory=directory)
+
+        def new_saving(i, frame):
+            writer.save("bench", f"2025-01-01 00:00:{i:02d}", frame)
+            crop_objective_roi(frame)
+            return 0
+
+        old_roi, _ = old_path(frames[0], os.path.join(directory, "check.png"))
+        assert np.array_equal(old_roi, crop_objective_roi(frames[0]))
+
+        print(f"{count} frames at {width}x{height}")
+        measure("old: PNG round-trip", frames, old)
+        measure("new: in-memory ROI", frames, new)
+        start = writer.bytes_written
+        measure("new: ROI + queued save", frames, new_saving)
+        writer.close()
+        print(f"async writer encoded {(writer.bytes_written - start) / count / 1024:.1f} KiB/frame in the background")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the per-frame path from capture to OCR input.")
+    parser.add_argument("--frames", type=int, default=50)
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    args = parser.parse_args()
+    run(args.frames, args.width, args.height)
@@ -0,0 +1,53 @@
+# compares per-streamer unpooled status checks with batched HelixClient calls
+#
+#   python -m tools.bench_helix --streamers 17 --cycles 20 --latency 0.02
+import argparse
+import time
+import requests
+
+from helix import HelixClient
+from tools.fake_helix import FakeHelixState, make_stream, start_server
+
+
+# the original check_online behaviour: one fresh connection per streamer
+def legacy_cycle(base_url, streamers):
+    for streamer in streamers:
+        requests.get(f"{base_url}/streams", headers={"Client-ID": "bench"}, params={"user_login": streamer})
+
+
+def run(streamers, cycles, latency):
+    live = [make_stream(s) for s in streamers[::2]]
+
+    state = FakeHelixState(live, ratelimit=10 ** 9, latency=latency)
+    server, base_url = start_server(state)
+    start = time.perf_counter()
+    for _ in range(cycles):
+        legacy_cycle(base_url, streamers)
+    legacy_time = time.perf_counter() - start
+    legacy_requests = state.requests
+    server.shutdown()
+
+    state = FakeHelixState(live, ratelimit=10 ** 9, latency=latency)
+    server, base_url = start_server(state)
+    client = HelixClient("bench", "bench", base_url=base_url)
+    start = time.perf_counter()
+    for _ in range(cycles):
+        statuses = client.get_stream_statuses(streamers)
+    batched_time = time.perf_counter() - start
+    batched_requests = state.requests
+    client.close()
+    server.shutdown()
+
+    assert sum(s["live"] for s in statuses.values()) == len(live)
+    print(f"{len(streamers)} streamers x {cycles} cycles")
+    print(f"legacy : {legacy_requests:6d} requests {legacy_time / cycles * 1000:8.1f} ms/cycle")
+    print(f"batched: {batched_requests:6d} requests {batched_time / cycles * 1000:8.1f} ms/cycle")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark Helix live-status checks against a local fake server.")
+    parser.add_argument("--streamers", type=int, default=17)
+    parser.add_argument("--cycles", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+    run([f"streamer{i}" for i in range(args.streamers)], args.cycles, args.latency)
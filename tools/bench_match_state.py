@@ -0,0 +1,160 @@
+# fixed-rate sampling with a row per screenshot vs MatchStateTracker's adaptive sampling and
+# change-only writes, on simulated matches with noisy detections or a replayed detection log
+#
+#   python -m tools.bench_match_state --streamers 20 --hours 4 --noise 0.1
+#   python -m tools.bench_match_state --replay detections.csv
+#
+# a replay CSV has streamer,timestamp,map columns, e.g. exported with
+#   SELECT streamer, timestamp, map FROM twitch_maps ORDER BY timestamp
+# adaptive runs use the recorded sample nearest each due time, accuracy is measured against the
+# recorded detection at every recorded sample.
+import argparse
+import bisect
+import csv
+import random
+from datetime import datetime
+
+from match_state import MatchStateTracker, StreamerState, UNKNOWN_MAP, MIN_INTERVAL, MAX_INTERVAL
+from objectives import MAP_OBJECTIVES
+
+MAP_NAMES = sorted(set(MAP_OBJECTIVES.values()))
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+# [(start_second, map or None)] alternating matches (8-15 min) and menus/queues (1-4 min)
+def make_timeline(seconds, rng):
+    maps = MAP_NAMES
+    timeline, t = [], 0
+    while t < seconds:
+        timeline.append((t, None))
+        t += rng.randint(60, 240)
+        timeline.append((t, rng.choice(maps)))
+        t += rng.randint(480, 900)
+    return timeline
+
+
+def truth_at(timeline, second):
+    starts = [start for start, _ in timeline]
+    return timeline[bisect.bisect_right(starts, second) - 1][1]
+
+
+# what detect_map returns for a frame: usually right, sometimes another map or Unknown Map
+def detect(truth, noise, rng):
+    if rng.random() < noise:
+        return rng.choice(MAP_NAMES + [UNKNOWN_MAP] * 3)
+    return truth if truth is not None else UNKNOWN_MAP
+
+
+def stamp(second):
+    return datetime.fromtimestamp(1700000000 + second).strftime(TIME_FORMAT)
+
+
+# fixed interval, one row per sample; the dashboard's view is the latest raw detection
+def run_fixed(timelines, seconds, noise, seed, interval):
+    rng = random.Random(seed)
+    samples = rows = correct = 0
+    for timeline in timelines:
+        current = None
+        t, next_sample = 0, 0
+        while t < seconds:
+            if t >= next_sample:
+                detected = detect(truth_at(timeline, t), noise, rng)
+                samples += 1
+                rows += 1
+                current = None if detected == UNKNOWN_MAP else detected
+                next_sample = t + interval
+            correct += current == truth_at(timeline, t)
+            t += 1
+    return samples, rows, correct / (len(timelines) * seconds)
+
+
+# adaptive interval from the tracker, rows only for start/change events plus finished intervals
+def run_adaptive(timelines, seconds, noise, seed, min_interval, max_interval):
+    rng = random.Random(seed)
+    samples = rows = intervals = correct = 0
+    for i, timeline in enumerate(timelines):
+        streamer = f"streamer{i}"
+        next_due = {}
+        tracker = MatchStateTracker(on_interval=lambda s, interval: next_due.__setitem__(s, t + interval),
+                                    min_interval=min_interval, max_interval=max_interval)
+        t = 0
+        next_due[streamer] = 0
+        while t < seconds:
+            if t >= next_due[streamer]:
+                samples += 1
+                events, finished = tracker.observe(streamer, detect(truth_at(timeline, t), noise, rng), stamp(t))
+                rows += sum(1 for e in events if e.kind != "end")
+                intervals += len(finished)
+            state = tracker.states.get(streamer)
+            correct += (state.map if state else None) == truth_at(timeline, t)
+            t += 1
+        intervals += len(tracker.close_all(stamp(t))[1])
+    return samples, rows, intervals, correct / (len(timelines) * seconds)
+
+
+def load_replay(path):
+    per_streamer = {}
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            second = datetime.strptime(row["timestamp"][:19], TIME_FORMAT).timestamp()
+            per_streamer.setdefault(row["streamer"], []).append((second, row["map"]))
+    for samples in per_streamer.values():
+        samples.sort()
+    return per_streamer
+
+
+# replays recorded detections: every sample for the baseline, the nearest sample to each due time for the tracker
+def run_replay(per_streamer, min_interval, max_interval):
+    total = sum(len(s) for s in per_streamer.values())
+    samples = rows = intervals = agree = 0
+    for streamer, recorded in per_streamer.items():
+        times = [second for second, _ in recorded]
+        state = StreamerState(streamer, min_interval=min_interval, max_interval=max_interval)
+        due = times[0]
+        for second, detected in recorded:
+            if second >= due:
+                samples += 1
+                events, finished = state.observe(detected, datetime.fromtimestamp(second).strftime(TIME_FORMAT))
+                rows += sum(1 for e in events if e.kind != "end")
+                intervals += len(finished)
+                due = second + state.interval
+            # gaps in the recording (streamer offline) end the match like MATCH_STATE.retain does
+            index = bisect.bisect_right(times, second)
+            if index < len(times) and times[index] - second > max_interval * 2:
+                intervals += len(state.close(second)[1])
+                due = times[index]
+            agree += (state.map or UNKNOWN_MAP) == detected
+        intervals += len(state.close(times[-1])[1])
+    print(f"replayed {total} recorded samples from {len(per_streamer)} streamers")
+    print(f"fixed   : {total:7d} OCR calls, {total:7d} rows")
+    print(f"adaptive: {samples:7d} OCR calls, {rows:7d} rows + {intervals} intervals, "
+          f"state agrees with {agree / max(total, 1):.1%} of recorded detections")
+    print(f"reduction: {total / max(samples, 1):.1f}x OCR calls, {total / max(rows + intervals, 1):.1f}x inserts")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark adaptive sampling and change-only writes.")
+    parser.add_argument("--streamers", type=int, default=20)
+    parser.add_argument("--hours", type=float, default=4)
+    parser.add_argument("--noise", type=float, default=0.1, help="chance a frame is detected as the wrong map")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--min-interval", type=int, default=MIN_INTERVAL)
+    parser.add_argument("--max-interval", type=int, default=MAX_INTERVAL)
+    parser.add_argument("--replay", help="CSV of streamer,timestamp,map detections to replay instead of simulating")
+    args = parser.parse_args()
+
+    if args.replay:
+        run_replay(load_replay(args.replay), args.min_interval, args.max_interval)
+    else:
+        seconds = int(args.hours * 3600)
+        rng = random.Random(args.seed)
+        timelines = [make_timeline(seconds, rng) for _ in range(args.streamers)]
+        fixed_samples, fixed_rows, fixed_accuracy = run_fixed(timelines, seconds, args.noise, args.seed, args.min_interval)
+        samples, rows, intervals, accuracy = run_adaptive(timelines, seconds, args.noise, args.seed,
+                                                          args.min_interval, args.max_interval)
+        print(f"{args.streamers} streamers, {args.hours}h, {args.noise:.0%} noisy detections")
+        print(f"fixed   : {fixed_samples:7d} OCR calls, {fixed_rows:7d} rows, latest-row accuracy {fixed_accuracy:.1%}")
+        print(f"adaptive: {samples:7d} OCR calls, {rows:7d} rows + {intervals} intervals, state accuracy {accuracy:.1%}")
+        print(f"reduction: {fixed_samples / max(samples, 1):.1f}x OCR calls, "
+              f"{fixed_rows / max(rows + intervals, 1):.1f}x inserts")
@@ -0,0 +1,84 @@
+# checks ObjectiveMatcher against the original detect_map loop and reports matches per second
+#
+#   python -m tools.bench_matcher --samples 20000
+import argparse
+import random
+import time
+
+from matcher import ObjectiveMatcher
+from objectives import MAP_OBJECTIVES, SUPER_HIGH_VALUE_WORDS, HIGH_VALUE_WORDS
+
+OCR_JUNK = ["", "|", "ee", "a", "of", "the", "by", "kn", "des", "rn", "i", "ll", "16", "—"]
+
+
+# the detect_map scoring loop as it was before the compiled matcher
+def reference_match(recognized_words):
+    keyword_matches = []
+    for obj_text, map_name in MAP_OBJECTIVES.items():
+        words_matched = 0
+        super_high_value_count = 0
+        high_value_count = 0
+        for word in recognized_words:
+            if word in obj_text.lower():
+                words_matched += 1
+                if word in SUPER_HIGH_VALUE_WORDS:
+                    super_high_value_count += 1
+                elif word in HIGH_VALUE_WORDS:
+                    high_value_count += 1
+        if words_matched > 1:
+            score = 50 + (words_matched * 5) + (high_value_count * 15) + (super_high_value_count * 30)
+            keyword_matches.append((map_name, score))
+    return sorted(keyword_matches, key=lambda x: x[1], reverse=True)
+
+
+# OCR-like word sets: objective words with drops, truncations and junk tokens
+def make_samples(count, seed=0):
+    rng = random.Random(seed)
+    texts = list(MAP_OBJECTIVES)
+    samples = []
+    for _ in range(count):
+        words = []
+        for word in rng.choice(texts).lower().split():
+            roll = rng.random()
+            if roll < 0.2:
+                continue
+            if roll < 0.3 and len(word) > 3:
+                word = word[:rng.randint(2, len(word) - 1)]
+            words.append(word)
+        words += [w for w in rng.sample(OCR_JUNK, 3) if w]
+        samples.append(set(words))
+    return samples
+
+
+def throughput(fn, samples):
+    start = time.perf_counter()
+    for words in samples:
+        fn(words)
+    return len(samples) / (time.perf_counter() - start)
+
+
+def run(count):
+    samples = make_samples(count)
+    compat = ObjectiveMatcher(MAP_OBJECTIVES, SUPER_HIGH_VALUE_WORDS, HIGH_VALUE_WORDS, mode="compat")
+    token = ObjectiveMatcher(MAP_OBJECTIVES, SUPER_HIGH_VALUE_WORDS, HIGH_VALUE_WORDS, mode="token")
+
+    mismatches = sum(reference_match(words) != compat.match(words) for words in samples)
+    changed_best = sum(
+        (reference_match(words) or [(None, 0)])[0][0] != (token.match(words) or [(None, 0)])[0][0]
+        for words in samples
+    )
+
+    print(f"{count} samples, {len(MAP_OBJECTIVES)} objectives")
+    print(f"compat mode mismatches vs original: {mismatches}")
+    print(f"token mode best-map differences vs original: {changed_best}")
+    print(f"original loop: {throughput(reference_match, samples):10.0f} matches/s")
+    print(f"compat mode  : {throughput(compat.match, samples):10.0f} matches/s")
+    print(f"token mode   : {throughput(token.match, samples):10.0f} matches/s")
+    return mismatches == 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark and verify the compiled objective matcher.")
+    parser.add_argument("--samples", type=int, default=20000)
+    args = parser.parse_args()
+    raise SystemExit(0 if run(args.samples) else 1)
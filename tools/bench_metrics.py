@@ -0,0 +1,82 @@
+# cost of the metrics hooks under load: per-observation overhead from many threads, /metrics
+# scrape time with a full streamer roster, and the cost of sampled cProfile
+#
+#   python -m tools.bench_metrics --streamers 60 --threads 16 --observations 200000
+import argparse
+import threading
+import time
+import urllib.request
+
+from metrics import MetricsRegistry
+
+STAGES = ["helix", "capture", "ocr", "detect", "db_submit", "flush_twitch_maps"]
+
+
+def hammer(registry, streamers, count, threads):
+    per_thread = count // threads
+
+    def worker(offset):
+        for i in range(per_thread):
+            with registry.timed(STAGES[i % len(STAGES)], streamers[(i + offset) % len(streamers)]):
+                pass
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return (time.perf_counter() - start) / (per_thread * threads)
+
+
+def empty_blocks(count):
+    start = time.perf_counter()
+    for _ in range(count):
+        pass
+    return (time.perf_counter() - start) / count
+
+
+# a small CPU-bound job, standing in for detect_map, run with and without profiling
+def job():
+    return sum(i * i for i in range(2000))
+
+
+def profile_overhead(every, count):
+    registry = MetricsRegistry(profile_every=every)
+    start = time.perf_counter()
+    for _ in range(count):
+        with registry.profiled():
+            job()
+    return (time.perf_counter() - start) / count, registry.profiled_jobs
+
+
+def run(streamer_count, threads, count, json_path):
+    streamers = [f"streamer{i}" for i in range(streamer_count)]
+    registry = MetricsRegistry(json_path=json_path)
+    baseline = empty_blocks(count)
+    per_observation = hammer(registry, streamers, count, threads)
+    print(f"timed(): {per_observation * 1e6:.2f} us/observation across {threads} threads "
+          f"({(per_observation - baseline) * 1e6:.2f} us over an empty loop){' with JSON lines' if json_path else ''}")
+
+    port = registry.serve(0)
+    start = time.perf_counter()
+    body = urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics").read()
+    print(f"/metrics: {len(body.splitlines())} lines, {len(body) / 1024:.0f} KiB, scraped in "
+          f"{(time.perf_counter() - start) * 1000:.1f} ms for {streamer_count} streamers x {len(STAGES)} stages")
+    registry.close()
+
+    plain, _ = profile_overhead(0, 2000)
+    for every in (100, 10, 1):
+        per_job, profiled = profile_overhead(every, 2000)
+        print(f"cProfile every {every:>3} jobs: {per_job * 1e6:8.1f} us/job vs {plain * 1e6:.1f} unprofiled "
+              f"(+{(per_job / plain - 1) * 100:.1f}%), {profiled} jobs profiled")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure metrics hook overhead.")
+    parser.add_argument("--streamers", type=int, default=60)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--observations", type=int, default=200000)
+    parser.add_argument("--json", help="also write JSON lines here while measuring")
+    args = parser.parse_args()
+    run(args.streamers, args.threads, args.observations, args.json)
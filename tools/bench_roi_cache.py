@@ -0,0 +1,118 @@
+# checks the ROI cache's dHash size and MAX_DISTANCE on rendered objective banners: objectives of
+# different maps must never fall within the threshold (a hit would reuse the wrong map), while the
+# same objective under a moving game scene, encoding noise or JPEG artifacts should stay within it
+#
+#   python -m tools.bench_roi_cache --variants 20
+#   python -m tools.bench_roi_cache --hash-width 16 --hash-height 4
+import argparse
+import itertools
+import random
+import cv2
+import numpy as np
+
+from calibration import roi_bounds
+from objectives import MAP_OBJECTIVES
+from roi_cache import HASH_HEIGHT, HASH_WIDTH, MAX_DISTANCE, dhash, hamming
+from tools.replay import wrap_text
+
+WIDTH, HEIGHT = 1920, 1080
+# only the top-left corner holding the ROI is rendered, in full-frame coordinates
+CORNER = (int(HEIGHT * 0.12), int(WIDTH * 0.35))
+
+
+# game-like background, different for every seed (the scene behind the banner keeps moving)
+def background(seed, height, width):
+    noise = np.random.default_rng(seed)
+    base = noise.integers(20, 160, size=3)
+    x = np.linspace(0, noise.integers(40, 120), width, dtype=np.float32)
+    y = np.linspace(0, noise.integers(40, 120), height, dtype=np.float32)[:, None]
+    frame = np.dstack([base[0] + (x + y) / 2, base[1] + np.broadcast_to(x, (height, width)),
+                       base[2] + np.broadcast_to(y, (height, width))]).astype(np.uint8)
+    return cv2.add(frame, noise.integers(0, 24, frame.shape, dtype=np.uint8))
+
+
+# the corner of a 1080p frame with the objective text where crop_objective_roi looks; the same text
+# always lands in the same place, as the game draws it
+def render(text, seed):
+    frame = background(seed, *CORNER)
+    if text is None:
+        return frame
+    left, top = int(WIDTH * 0.013), int(HEIGHT * 0.032)
+    scale = 0.55
+    lines = wrap_text(text, int(WIDTH * 0.3) - 12, scale)
+    line_height = min(int(HEIGHT * 0.022), int((HEIGHT * 0.061 - 6) / max(len(lines), 1)))
+    for i, line in enumerate(lines):
+        cv2.putText(frame, line, (left, top + line_height * (i + 1)), cv2.FONT_HERSHEY_SIMPLEX,
+                    min(scale, line_height / 26), (255, 255, 255), 1, cv2.LINE_AA)
+    return frame
+
+
+def jpeg(frame, quality):
+    ok, data = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return cv2.imdecode(data, cv2.IMREAD_COLOR)
+
+
+def sensor_noise(frame, seed, sigma=6):
+    noise = np.random.default_rng(seed).normal(0, sigma, frame.shape)
+    return np.clip(frame.astype(np.float32) + noise, 0, 255).astype(np.uint8)
+
+
+def roi_hash(frame, width, height):
+    top, bottom, left, right = roi_bounds(HEIGHT, WIDTH)
+    return dhash(cv2.cvtColor(frame[top:bottom, left:right], cv2.COLOR_BGR2GRAY), width, height)
+
+
+# ways the same banner differs between two samples of one stream
+PERTURBATIONS = {
+    "moving scene": lambda text, seed: render(text, seed + 1),
+    "sensor noise": lambda text, seed: sensor_noise(render(text, seed), seed),
+    "jpeg q85": lambda text, seed: jpeg(render(text, seed), 85),
+    "jpeg q60": lambda text, seed: jpeg(render(text, seed), 60),
+    "scene + jpeg q60": lambda text, seed: jpeg(render(text, seed + 1), 60),
+}
+
+
+def run(variants, width, height, thresholds):
+    objectives = sorted(MAP_OBJECTIVES.items())
+    rng = random.Random(1)
+    print(f"{len(objectives)} objectives of {len(set(MAP_OBJECTIVES.values()))} maps, {variants} renders each, "
+          f"{width}x{height} hash, threshold {MAX_DISTANCE} bits")
+
+    # cross-map distances: every render of one objective against every render of another map's
+    hashes = {text: [roi_hash(render(text, rng.randrange(10 ** 6)), width, height) for _ in range(variants)]
+              for text, _ in objectives}
+    blank = [roi_hash(render(None, rng.randrange(10 ** 6)), width, height) for _ in range(variants)]
+    cross = []
+    for (text_a, map_a), (text_b, map_b) in itertools.combinations(objectives, 2):
+        if map_a != map_b:
+            cross.append(min(hamming(a, b) for a in hashes[text_a] for b in hashes[text_b]))
+    blank_distance = min(hamming(a, b) for hs in hashes.values() for a in hs for b in blank)
+
+    # same-objective distances: a render against its perturbed copy
+    same = {name: [] for name in PERTURBATIONS}
+    for text, _ in objectives:
+        for _ in range(variants):
+            seed = rng.randrange(10 ** 6)
+            reference = roi_hash(render(text, seed), width, height)
+            for name, perturb in PERTURBATIONS.items():
+                same[name].append(hamming(reference, roi_hash(perturb(text, seed), width, height)))
+
+    print(f"\ncross-map pairs: {len(cross)}, closest {min(cross)} bits; objective vs no banner: closest {blank_distance} bits")
+    print("same objective: " + ", ".join(f"{name} max {max(d)} bits" for name, d in same.items()))
+    print(f"\n{'threshold':>9} {'cross-map collisions':>21} " + " ".join(f"{name:>17}" for name in PERTURBATIONS))
+    for threshold in thresholds:
+        collisions = sum(1 for d in cross if d <= threshold)
+        hit_rates = [sum(1 for d in distances if d <= threshold) / len(distances) for distances in same.values()]
+        marker = "  <- MAX_DISTANCE" if threshold == MAX_DISTANCE else ""
+        print(f"{threshold:9d} {collisions:21d} " + " ".join(f"{rate:17.1%}" for rate in hit_rates) + marker)
+    return min(cross) > MAX_DISTANCE and blank_distance > MAX_DISTANCE
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check ROI cache hash collisions and hit rate on rendered banners.")
+    parser.add_argument("--variants", type=int, default=10, help="renders per objective")
+    parser.add_argument("--hash-width", type=int, default=HASH_WIDTH)
+    parser.add_argument("--hash-height", type=int, default=HASH_HEIGHT)
+    args = parser.parse_args()
+    thresholds = sorted({0, 2, 4, 6, 8, MAX_DISTANCE, 16, 24, 32})
+    raise SystemExit(0 if run(args.variants, args.hash_width, args.hash_height, thresholds) else 1)
@@ -0,0 +1,142 @@
+# dashboard query latency on raw twitch_maps scans vs indexed ranges and the hourly rollups
+#
+#   MYSQL_HOST=127.0.0.1 MYSQL_USER=root MYSQL_PASSWORD=... MYSQL_DATABASE=twitch_data \
+#       python -m tools.bench_rollups --rows 2000000
+#
+# rows are seeded into scratch tables (twitch_maps_bench, twitch_map_hourly_bench) that are dropped afterwards.
+import argparse
+import os
+import random
+import time
+from datetime import datetime, timedelta
+import pymysql
+
+from dashboard_data import DashboardData
+from db_writer import percentile
+from objectives import MAP_OBJECTIVES
+from rollups import backfill, ensure_schema
+
+DB_CONFIG = {
+    "host":     os.environ.get("MYSQL_HOST"),
+    "user":     os.environ.get("MYSQL_USER"),
+    "password": os.environ.get("MYSQL_PASSWORD"),
+    "database": os.environ.get("MYSQL_DATABASE"),
+}
+
+BENCH_TABLE = "twitch_maps_bench"
+BENCH_ROLLUP = "twitch_map_hourly_bench"
+SEED_CHUNK = 10000
+DAYS = 90
+
+
+def connect(dict_rows=False):
+    cursorclass = pymysql.cursors.DictCursor if dict_rows else pymysql.cursors.Cursor
+    return pymysql.connect(cursorclass=cursorclass, **DB_CONFIG)
+
+
+def seed(conn, count, streamers):
+    maps = sorted(set(MAP_OBJECTIVES.values())) + ["Unknown Map"]
+    end = datetime.now().replace(microsecond=0)
+    with conn.cursor() as cursor:
+        for start in range(0, count, SEED_CHUNK):
+            rows = []
+            for i in range(start, min(start + SEED_CHUNK, count)):
+                # ids grow with time like the real table
+                timestamp = end - timedelta(seconds=int((count - i) * DAYS * 86400 / count))
+                rows.append((f"streamer{random.randrange(streamers)}", timestamp, random.choice(maps), f"/tmp/bench_{i}.png"))
+            cursor.executemany(f"INSERT INTO {BENCH_TABLE} (streamer, timestamp, map, storage_path) VALUES (%s, %s, %s, %s)", rows)
+            conn.commit()
+    return end
+
+
+# p50/p95 wall time of a query over a few runs
+def time_query(conn, sql, params=(), runs=5):
+    latencies = []
+    with conn.cursor() as cursor:
+        for _ in range(runs):
+            start = time.perf_counter()
+            cursor.execute(sql, params)
+            cursor.fetchall()
+            latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return percentile(latencies, 50), percentile(latencies, 95)
+
+
+def time_call(call, runs=5):
+    latencies = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return percentile(latencies, 50), percentile(latencies, 95)
+
+
+def report(label, timings):
+    p50, p95 = timings
+    print(f"{label:<44} p50 {p50 * 1000:9.1f} ms  p95 {p95 * 1000:9.1f} ms")
+
+
+def raw_queries(conn, start, end):
+    report("raw: counts by streamer/map, last 7 days",
+           time_query(conn, f"SELECT streamer, map, COUNT(*) FROM {BENCH_TABLE} WHERE timestamp >= %s AND timestamp < %s "
+                            f"GROUP BY streamer, map", (start, end)))
+    report("raw: counts for streamer0, last 7 days",
+           time_query(conn, f"SELECT map, COUNT(*) FROM {BENCH_TABLE} WHERE streamer = %s AND timestamp >= %s AND timestamp < %s "
+                            f"GROUP BY map", ("streamer0", start, end)))
+    report("raw: distinct streamers and maps",
+           time_query(conn, f"SELECT DISTINCT streamer, map FROM {BENCH_TABLE}"))
+    report("raw: newest 1000 rows, last 7 days",
+           time_query(conn, f"SELECT * FROM {BENCH_TABLE} WHERE timestamp >= %s AND timestamp < %s "
+                            f"ORDER BY timestamp DESC LIMIT 1000", (start, end)))
+    report("raw: newest 1000 rows for streamer0",
+           time_query(conn, f"SELECT * FROM {BENCH_TABLE} WHERE streamer = %s AND timestamp >= %s AND timestamp < %s "
+                            f"ORDER BY timestamp DESC LIMIT 1000", ("streamer0", start, end)))
+
+
+def run(count, streamers):
+    conn = connect()
+    with conn.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {BENCH_TABLE}, {BENCH_ROLLUP}")
+        cursor.execute(f"CREATE TABLE {BENCH_TABLE} (id INT AUTO_INCREMENT PRIMARY KEY, streamer VARCHAR(255), "
+                       f"timestamp DATETIME, map VARCHAR(255), storage_path TEXT)")
+    try:
+        seed_start = time.perf_counter()
+        end = seed(conn, count, streamers)
+        print(f"seeded {count} rows over {DAYS} days in {time.perf_counter() - seed_start:.1f}s")
+        start = end - timedelta(days=7)
+
+        print("-- before indexes and rollups --")
+        raw_queries(conn, start, end)
+
+        t = time.perf_counter()
+        ensure_schema(conn, detections=BENCH_TABLE, rollup=BENCH_ROLLUP)
+        print(f"indexes created in {time.perf_counter() - t:.1f}s")
+        t = time.perf_counter()
+        backfill(conn, detections=BENCH_TABLE, rollup=BENCH_ROLLUP)
+        print(f"backfill took {time.perf_counter() - t:.1f}s")
+
+        print("-- with indexes --")
+        raw_queries(conn, start, end)
+
+        print("-- dashboard (rollups) --")
+        dict_conn = connect(dict_rows=True)
+        data = DashboardData(lambda: dict_conn, detections=BENCH_TABLE, rollup=BENCH_ROLLUP)
+        report("rollup: summary, last 7 days", time_call(lambda: data.summary(start, end)))
+        report("rollup: summary for streamer0, last 7 days", time_call(lambda: data.summary(start, end, "streamer0")))
+        report("rollup: filter options", time_call(data.options))
+        report("indexed: table, last 7 days", time_call(lambda: data.table(start, end)))
+        report("indexed: table for streamer0", time_call(lambda: data.table(start, end, "streamer0")))
+        dict_conn.close()
+    finally:
+        with conn.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {BENCH_TABLE}, {BENCH_ROLLUP}")
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark dashboard queries against a local MySQL/MariaDB.")
+    parser.add_argument("--rows", type=int, default=2000000)
+    parser.add_argument("--streamers", type=int, default=60)
+    args = parser.parse_args()
+    run(args.rows, args.streamers)
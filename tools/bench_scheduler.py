@@ -0,0 +1,54 @@
+# simulates a large roster with slow captures to check the scheduler keeps its cadence
+#
+#   python -m tools.bench_scheduler --streamers 60 --seconds 60
+import argparse
+import random
+import time
+
+from scheduler import CaptureScheduler
+
+
+def run(streamers, seconds, interval, capture_time, ocr_time, max_captures, max_ocr):
+    starts = {s: [] for s in streamers}
+
+    def capture(streamer):
+        starts[streamer].append(time.monotonic())
+        time.sleep(random.uniform(*capture_time))
+        return streamer
+
+    def process(streamer, payload):
+        time.sleep(random.uniform(*ocr_time))
+
+    scheduler = CaptureScheduler(capture, process, interval, max_captures=max_captures, max_ocr=max_ocr)
+    scheduler.set_streamers(streamers)
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        until_due = scheduler.tick()
+        scheduler.wait(min(until_due if until_due is not None else 1.0, end - time.monotonic()))
+    scheduler.shutdown()
+
+    periods = []
+    for times in starts.values():
+        periods += [b - a for a, b in zip(times, times[1:])]
+    periods.sort()
+    lags = [scheduler.lag[s] for s in streamers]
+    serial_period = len(streamers) * (sum(capture_time) / 2 + sum(ocr_time) / 2)
+    print(f"{len(streamers)} streamers, interval {interval}s, {max_captures} capture / {max_ocr} OCR slots")
+    print(f"samples: {sum(len(t) for t in starts.values())}")
+    if periods:
+        print(f"period p50 {periods[len(periods) // 2]:.2f}s p95 {periods[int(len(periods) * 0.95)]:.2f}s max {periods[-1]:.2f}s")
+    print(f"lag mean {sum(l.mean for l in lags) / len(lags):.2f}s max {max(l.max for l in lags):.2f}s, skipped slots {sum(l.skipped for l in lags)}")
+    print(f"expected serial run_loop period: {serial_period:.1f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate capture scheduling for a large roster.")
+    parser.add_argument("--streamers", type=int, default=60)
+    parser.add_argument("--seconds", type=float, default=60)
+    parser.add_argument("--interval", type=float, default=5)
+    parser.add_argument("--max-captures", type=int, default=32)
+    parser.add_argument("--max-ocr", type=int, default=4)
+    args = parser.parse_args()
+    run([f"streamer{i}" for i in range(args.streamers)], args.seconds, args.interval,
+        capture_time=(0.5, 3.0), ocr_time=(0.05, 0.15),
+        max_captures=args.max_captures, max_ocr=args.max_ocr)
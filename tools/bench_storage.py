@@ -0,0 +1,98 @@
+# the old one-PNG-per-sample screenshots against the bounded store: bytes on disk, background
+# encode time, deduplicated repeats, the store staying within its byte budget, and what the
+# dashboard reads per refresh (full PNG vs thumbnail)
+#
+#   python -m tools.bench_storage --samples 300 --repeat 0.2 --budget-mb 20
+import argparse
+import os
+import tempfile
+import time
+import cv2
+import numpy as np
+
+from calibration import roi_bounds
+from storage import ScreenshotWriter, thumbnail_path
+from tools.bench_frame_path import synthetic_frame
+
+
+def disk_usage(directory):
+    total = 0
+    for root, _, files in os.walk(directory):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total
+
+
+# dashboard cost of showing one screenshot: read the file and decode it
+def load_time(path, count=20):
+    start = time.perf_counter()
+    for _ in range(count):
+        with open(path, "rb") as f:
+            data = f.read()
+        cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    return (time.perf_counter() - start) / count, len(data)
+
+
+# frames to save; with probability repeat a sample is the previous frame again (stalled stream)
+def sample_frames(count, repeat, width, height, roi_only, seed=0):
+    rng = np.random.default_rng(seed)
+    frames = []
+    for i in range(count):
+        if frames and rng.random() < repeat:
+            frames.append(frames[-1])
+            continue
+        frame = synthetic_frame(width, height, seed=i)
+        if roi_only:
+            top, bottom, left, right = roi_bounds(height, width)
+            frame = frame[top:bottom, left:right]
+        frames.append(frame)
+    return frames
+
+
+def run_old(frames, directory):
+    start = time.process_time()
+    for i, frame in enumerate(frames):
+        cv2.imwrite(os.path.join(directory, f"streamer_2025-01-01_00-00-{i:04d}.png"), frame)
+    return time.process_time() - start, os.path.join(directory, "streamer_2025-01-01_00-00-0000.png")
+
+
+def run_store(frames, directory, image_format, budget):
+    writer = ScreenshotWriter(directory, image_format, max_bytes=budget, max_pending=len(frames))
+    start = time.process_time()
+    paths = [writer.save("streamer", f"2025-01-01 00:00:{i:04d}", frame) for i, frame in enumerate(frames)]
+    writer.close()
+    return time.process_time() - start, writer, next(p for p in reversed(paths) if p and os.path.exists(p))
+
+
+def run(count, repeat, width, height, budget_mb, roi_only):
+    budget = budget_mb * 1024 ** 2
+    frames = sample_frames(count, repeat, width, height, roi_only)
+    print(f"{count} samples at {frames[0].shape[1]}x{frames[0].shape[0]}, {repeat:.0%} repeated frames, "
+          f"{budget_mb} MiB budget{' (ROI only)' if roi_only else ''}")
+    with tempfile.TemporaryDirectory() as directory:
+        old_dir = os.path.join(directory, "old")
+        os.makedirs(old_dir)
+        cpu, old_path = run_old(frames, old_dir)
+        old_bytes = disk_usage(old_dir)
+        old_load, old_size = load_time(old_path)
+        print(f"{'old: PNG per sample':<24} {old_bytes / 1024 ** 2:8.1f} MiB on disk {cpu / count * 1000:7.1f} ms CPU/sample"
+              f"   dashboard reads {old_size / 1024:7.1f} KiB in {old_load * 1000:5.1f} ms")
+        for image_format in ("jpg", "webp"):
+            store_dir = os.path.join(directory, image_format)
+            cpu, writer, path = run_store(frames, store_dir, image_format, budget)
+            thumb_load, thumb_size = load_time(thumbnail_path(path))
+            print(f"{'new: ' + image_format + ' store':<24} {disk_usage(store_dir) / 1024 ** 2:8.1f} MiB on disk "
+                  f"{cpu / count * 1000:7.1f} ms CPU/sample   dashboard reads {thumb_size / 1024:7.1f} KiB in "
+                  f"{thumb_load * 1000:5.1f} ms   {writer.files_written} written, {writer.deduplicated} deduplicated, "
+                  f"{writer.evicted} evicted")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare per-sample PNGs with the bounded screenshot store.")
+    parser.add_argument("--samples", type=int, default=300)
+    parser.add_argument("--repeat", type=float, default=0.2, help="share of samples that repeat the previous frame")
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--budget-mb", type=int, default=20)
+    parser.add_argument("--roi-only", action="store_true")
+    args = parser.parse_args()
+    run(args.samples, args.repeat, args.width, args.height, args.budget_mb, args.roi_only)
@@ -0,0 +1,221 @@
+# local fake of the Twitch Helix /streams endpoint for offline testing and benchmarks
+#
+#   python -m tools.fake_helix --port 8787 --live shroud,Kephrii
+#   TWITCH_API_URL=http://127.0.0.1:8787/helix python main.py
+#
+# besides user_login lookups it serves the paged game listing (/streams?game_id=&first=&after=),
+# either of the --live streams or replayed from a fixture of recorded listings, each served from
+# its "at" offset (seconds after startup) until the next one:
+#
+#   python -m tools.fake_helix --record helix_streams.json --snapshots 10 --every 60   # needs TWITCH_* credentials
+#   python -m tools.fake_helix --port 8787 --fixture helix_streams.json
+#   DISCOVER_STREAMS=1 TWITCH_API_URL=http://127.0.0.1:8787/helix python main.py
+import argparse
+import base64
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+# builds a Helix-shaped stream object
+def make_stream(login, game_name="Marvel Rivals", viewer_count=100, game_id="1264310518"):
+    return {
+        "id": str(abs(hash(login)) % 10 ** 10),
+        "user_login": login.lower(),
+        "user_name": login,
+        "game_id": game_id,
+        "game_name": game_name,
+        "type": "live",
+        "title": f"{login} playing {game_name}",
+        "viewer_count": viewer_count,
+        "started_at": "2025-01-01T00:00:00Z",
+    }
+
+
+# opaque pagination cursor, like Helix's, holding the offset of the next page
+def encode_cursor(offset):
+    return base64.urlsafe_b64encode(json.dumps({"o": offset}).encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        return int(json.loads(base64.urlsafe_b64decode(cursor.encode()))["o"])
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+# recorded listings as [(seconds after start, [stream, ...]), ...]
+def load_fixture(path):
+    with open(path) as f:
+        fixture = json.load(f)
+    return [(snapshot["at"], snapshot["streams"]) for snapshot in fixture["snapshots"]]
+
+
+def save_fixture(path, snapshots, game_id):
+    with open(path, "w") as f:
+        json.dump({"game_id": game_id, "snapshots": [{"at": at, "streams": streams} for at, streams in snapshots]}, f)
+
+
+# pages the real game listing count times, every seconds apart, into a fixture
+def record_fixture(helix, game_id, path, count, every, max_pages=None):
+    snapshots = []
+    started = time.time()
+    for i in range(count):
+        if i:
+            time.sleep(max(0.0, started + i * every - time.time()))
+        streams = helix.get_game_streams(game_id, max_pages)
+        if streams is None:
+            print(f"Listing {i + 1}/{count} failed, skipping it.")
+            continue
+        snapshots.append((round(time.time() - started, 1), streams))
+        save_fixture(path, snapshots, game_id)
+        print(f"Recorded listing {i + 1}/{count}: {len(streams)} streams")
+    return snapshots
+
+
+class FakeHelixState:
+    # streams are keyed by lowercase login, the bucket mimics Helix's token bucket; snapshots
+    # (see load_fixture) replace the fixed streams over time, with now() giving the replay position
+    def __init__(self, streams=(), ratelimit=800, refill_seconds=60, latency=0.0, snapshots=None):
+        self.streams = {s["user_login"]: s for s in streams}
+        self.snapshots = sorted(snapshots or [], key=lambda snapshot: snapshot[0])
+        self.started = time.time()
+        # set by benchmarks to replay faster than real time
+        self.replay_time = None
+        self.ratelimit = ratelimit
+        self.refill_seconds = refill_seconds
+        self.latency = latency
+        self.remaining = ratelimit
+        self.reset_at = time.time() + refill_seconds
+        self.requests = 0
+        self.throttled = 0
+        self.lock = threading.Lock()
+
+    def now(self):
+        return self.replay_time if self.replay_time is not None else time.time() - self.started
+
+    # streams live right now, keyed by lowercase login
+    def current_streams(self):
+        if not self.snapshots:
+            return self.streams
+        current = self.snapshots[0][1]
+        for at, streams in self.snapshots:
+            if at > self.now():
+                break
+            current = streams
+        return {stream["user_login"].lower(): stream for stream in current}
+
+    # takes one point from the bucket, returns (allowed, remaining, reset)
+    def take(self):
+        with self.lock:
+            now = time.time()
+            if now >= self.reset_at:
+                self.remaining = self.ratelimit
+                self.reset_at = now + self.refill_seconds
+            self.requests += 1
+            if self.remaining <= 0:
+                self.throttled += 1
+                return False, 0, self.reset_at
+            self.remaining -= 1
+            return True, self.remaining, self.reset_at
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, payload, remaining, reset):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Ratelimit-Limit", str(state.ratelimit))
+            self.send_header("Ratelimit-Remaining", str(remaining))
+            self.send_header("Ratelimit-Reset", str(int(reset)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if state.latency:
+                time.sleep(state.latency)
+            allowed, remaining, reset = state.take()
+            if not allowed:
+                self._send(429, {"error": "Too Many Requests", "status": 429}, remaining, reset)
+                return
+            url = urlparse(self.path)
+            params = parse_qs(url.query)
+            if not url.path.endswith("/streams"):
+                self._send(404, {"error": "Not Found", "status": 404}, remaining, reset)
+                return
+            streams = state.current_streams()
+            if "game_id" in params:
+                self._send_listing(params, streams, remaining, reset)
+                return
+            logins = [login.lower() for login in params.get("user_login", [])]
+            if len(logins) > 100:
+                self._send(400, {"error": "Bad Request", "status": 400}, remaining, reset)
+                return
+            data = [streams[login] for login in logins if login in streams]
+            self._send(200, {"data": data, "pagination": {}}, remaining, reset)
+
+        # one page of the game's streams, most watched first, with a cursor while more remain
+        def _send_listing(self, params, streams, remaining, reset):
+            game_ids = set(params["game_id"])
+            first = int(params.get("first", ["20"])[0])
+            offset = decode_cursor(params["after"][0]) if "after" in params else 0
+            if not 1 <= first <= 100 or offset is None:
+                self._send(400, {"error": "Bad Request", "status": 400}, remaining, reset)
+                return
+            listing = sorted((stream for stream in streams.values() if stream.get("game_id") in game_ids),
+                             key=lambda stream: -stream.get("viewer_count", 0))
+            page = listing[offset:offset + first]
+            pagination = {"cursor": encode_cursor(offset + first)} if offset + first < len(listing) else {}
+            self._send(200, {"data": page, "pagination": pagination}, remaining, reset)
+
+    return Handler
+
+
+# starts the fake server on a background thread, returns (server, base_url)
+def start_server(state, host="127.0.0.1", port=0):
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/helix"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a fake Twitch Helix /streams endpoint.")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--live", default="", help="comma separated logins that are live on Marvel Rivals")
+    parser.add_argument("--ratelimit", type=int, default=800)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds of artificial latency per request")
+    parser.add_argument("--fixture", help="replay recorded game listings from this file")
+    parser.add_argument("--record", help="record real game listings into this file instead of serving")
+    parser.add_argument("--snapshots", type=int, default=10, help="listings to record")
+    parser.add_argument("--every", type=float, default=60, help="seconds between recorded listings")
+    parser.add_argument("--max-pages", type=int, help="pages of 100 per recorded listing")
+    args = parser.parse_args()
+
+    if args.record:
+        from helix import HelixClient, MARVEL_RIVALS_GAME_ID
+        helix = HelixClient(os.environ.get("TWITCH_CLIENT_ID"), os.environ.get("TWITCH_OAUTH_TOKEN"))
+        record_fixture(helix, MARVEL_RIVALS_GAME_ID, args.record, args.snapshots, args.every, args.max_pages)
+        raise SystemExit(0)
+
+    streams = [make_stream(login) for login in args.live.split(",") if login]
+    snapshots = load_fixture(args.fixture) if args.fixture else None
+    state = FakeHelixState(streams, ratelimit=args.ratelimit, latency=args.latency, snapshots=snapshots)
+    server, base_url = start_server(state, port=args.port)
+    print(f"Fake Helix listening on {base_url}"
+          f"{f', replaying {len(snapshots)} recorded listings' if snapshots else ''}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,301 @@
+# offline accuracy and speed harness for the detection pipeline
+#
+#   python -m tools.replay --images screenshots/ --output run.json
+#   python -m tools.replay --video match.mp4 --video-labels spans.csv --sample-every 5
+#   python -m tools.replay --synthetic 500 --workers 4 --output run.json --compare baseline.json
+#
+# each frame goes through the same steps as extract_top_left_text -> clean_text -> detect_map,
+# timed separately: load (imread, video decode or banner rendering), crop, ocr, clean and detect
+# (detect_map, which runs clean_text again internally). The predicted map is picked the same way
+# as process_frame. An image directory is either one folder per map ("Unknown Map" included) or
+# any folder with a labels.csv of filename,map. Video labels are start,end,map rows in seconds;
+# unlabeled video frames are timed but left out of the accuracy.
+import argparse
+import csv
+import json
+import os
+import random
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+import cv2
+import numpy as np
+
+from db_writer import percentile
+from detection import UNKNOWN_MAP, best_map, clean_text, crop_objective_roi, detect_map, objective_ocr_pool, ocr_phrases
+from objectives import MAP_OBJECTIVES
+
+STAGES = ["load", "crop", "ocr", "clean", "detect"]
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".webp")
+
+# share of synthetic frames rendered without a banner (labeled Unknown Map)
+SYNTHETIC_BLANK_SHARE = 0.1
+
+# items in flight per replay worker; video frames are decoded only as workers free up
+ITEMS_PER_WORKER = 4
+
+
+# (path, label) for every image under a labels.csv or one folder per map
+def image_items(directory):
+    labels_path = os.path.join(directory, "labels.csv")
+    if os.path.exists(labels_path):
+        with open(labels_path, newline="") as f:
+            return [("image", os.path.join(directory, row["filename"]), row["map"]) for row in csv.DictReader(f)]
+    items = []
+    for label in sorted(os.listdir(directory)):
+        folder = os.path.join(directory, label)
+        if not os.path.isdir(folder):
+            continue
+        for name in sorted(os.listdir(folder)):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                items.append(("image", os.path.join(folder, name), label))
+    return items
+
+
+def load_video_labels(path):
+    if not path:
+        return []
+    with open(path, newline="") as f:
+        return [(float(row["start"]), float(row["end"]), row["map"]) for row in csv.DictReader(f)]
+
+
+# decodes one frame every sample_every seconds in the parent; labels come from the spans, if any
+def video_items(path, spans, sample_every):
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise SystemExit(f"Unable to open video {path}")
+    fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+    step = max(1, int(round(fps * sample_every)))
+    index = 0
+    while True:
+        # frames between samples are only demuxed, not decoded
+        if index % step:
+            if not capture.grab():
+                break
+            index += 1
+            continue
+        start = time.perf_counter()
+        ok, frame = capture.read()
+        if not ok:
+            break
+        second = index / fps
+        label = next((m for s, e, m in spans if s <= second < e), None)
+        yield ("frame", frame, label, time.perf_counter() - start)
+        index += 1
+    capture.release()
+
+
+# splits an objective text into lines that fit the banner width at this font scale
+def wrap_text(text, width, scale):
+    lines, line = [], ""
+    for word in text.split():
+        candidate = f"{line} {word}".strip()
+        if line and cv2.getTextSize(candidate, cv2.FONT_HERSHEY_SIMPLEX, scale, 1)[0][0] > width:
+            lines.append(line)
+            line = word
+        else:
+            line = candidate
+    return lines + [line] if line else lines
+
+
+# game-like 1080p frame with an objective banner where crop_objective_roi looks, or none for Unknown Map
+def synthetic_frame(seed, width=1920, height=1080):
+    rng = random.Random(seed)
+    noise = np.random.default_rng(seed)
+    base = noise.integers(20, 140, size=3)
+    x = np.linspace(0, 80, width, dtype=np.float32)
+    y = np.linspace(0, 80, height, dtype=np.float32)[:, None]
+    frame = np.dstack([base[0] + (x + y) / 2, base[1] + np.broadcast_to(x, (height, width)),
+                       base[2] + np.broadcast_to(y, (height, width))]).astype(np.uint8)
+    frame = cv2.add(frame, noise.integers(0, 24, frame.shape, dtype=np.uint8))
+    if rng.random() < SYNTHETIC_BLANK_SHARE:
+        return frame, UNKNOWN_MAP
+    text, label = rng.choice(sorted(MAP_OBJECTIVES.items()))
+    if rng.random() < 0.5:
+        text = text.upper()
+    left, top = int(width * 0.013) + rng.randint(0, 6), int(height * 0.032)
+    banner_width = int(width * 0.3) - 12
+    scale = rng.uniform(0.5, 0.6)
+    lines = wrap_text(text, banner_width, scale)
+    line_height = min(int(height * 0.022), int((height * 0.061 - 6) / max(len(lines), 1)))
+    for i, line in enumerate(lines):
+        cv2.putText(frame, line, (left, top + 4 + line_height * (i + 1) - 4), cv2.FONT_HERSHEY_SIMPLEX,
+                    min(scale, line_height / 26), (255, 255, 255), 1, cv2.LINE_AA)
+    return frame, label
+
+
+# one in-process OCR backend per process, so stage times exclude pool IPC; the detection steps come
+# from detection.py, so no tracker threads or writers are started
+_ocr = None
+
+
+def _init_pipeline(backend):
+    global _ocr
+    _ocr = objective_ocr_pool(backend, 0)
+
+
+# runs one item through the pipeline, returns (label, predicted, {stage: seconds})
+def replay_item(item):
+    timings = {}
+    start = time.perf_counter()
+    kind = item[0]
+    if kind == "image":
+        frame, label = cv2.imread(item[1]), item[2]
+    elif kind == "synthetic":
+        frame, label = synthetic_frame(item[1])
+    else:
+        frame, label = item[1], item[2]
+    timings["load"] = time.perf_counter() - start + (item[3] if kind == "frame" else 0.0)
+    if frame is None:
+        return label, "Unreadable", timings
+
+    start = time.perf_counter()
+    roi = crop_objective_roi(frame)
+    timings["crop"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    phrases = ocr_phrases(_ocr, roi)
+    timings["ocr"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    clean_text(" ".join(p[0] for p in phrases))
+    timings["clean"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    maps_detected = detect_map(phrases)
+    timings["detect"] = time.perf_counter() - start
+
+    return label, best_map(maps_detected), timings
+
+
+# submits items as earlier ones finish, at most window at a time, and yields results in order;
+# Executor.map would take the whole (possibly video) iterable up front
+def bounded_map(pool, fn, items, window):
+    pending = deque()
+    for item in items:
+        pending.append(pool.submit(fn, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def run_items(items, workers, backend):
+    start = time.perf_counter()
+    if workers <= 0:
+        _init_pipeline(backend)
+        results = [replay_item(item) for item in items]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_pipeline, initargs=(backend,)) as pool:
+            results = list(bounded_map(pool, replay_item, items, workers * ITEMS_PER_WORKER))
+    return results, time.perf_counter() - start
+
+
+def summarize(results, elapsed, config):
+    labeled = [(label, predicted) for label, predicted, _ in results if label is not None]
+    per_map = {}
+    for label in sorted({label for label, _ in labeled}):
+        hits = [predicted == label for l, predicted in labeled if l == label]
+        per_map[label] = {"frames": len(hits), "correct": sum(hits), "accuracy": sum(hits) / len(hits)}
+    confusion = Counter((label, predicted) for label, predicted in labeled if label != predicted)
+    stages = {}
+    for stage in STAGES:
+        values = sorted(timings[stage] for _, _, timings in results if stage in timings)
+        stages[stage] = {
+            "mean_ms": sum(values) / len(values) * 1000 if values else 0.0,
+            "p50_ms": percentile(values, 50) * 1000,
+            "p95_ms": percentile(values, 95) * 1000,
+            "p99_ms": percentile(values, 99) * 1000,
+        }
+    correct = sum(1 for label, predicted in labeled if label == predicted)
+    return {
+        "config": config,
+        "frames": len(results),
+        "labeled": len(labeled),
+        "correct": correct,
+        "accuracy": correct / len(labeled) if labeled else None,
+        "fps": len(results) / elapsed if elapsed else 0.0,
+        "elapsed_s": elapsed,
+        "stages": stages,
+        "per_map": per_map,
+        "confusion": [{"label": l, "predicted": p, "count": n} for (l, p), n in confusion.most_common()],
+    }
+
+
+def print_summary(summary, top_confusions=10):
+    if summary["accuracy"] is not None:
+        print(f"accuracy: {summary['correct']}/{summary['labeled']} ({summary['accuracy']:.2%})")
+    print(f"{summary['frames']} frames in {summary['elapsed_s']:.1f}s ({summary['fps']:.1f} fps)")
+    print(f"{'stage':<8} {'mean':>9} {'p50':>9} {'p95':>9} {'p99':>9}  (ms)")
+    for stage, s in summary["stages"].items():
+        print(f"{stage:<8} {s['mean_ms']:9.2f} {s['p50_ms']:9.2f} {s['p95_ms']:9.2f} {s['p99_ms']:9.2f}")
+    if summary["per_map"]:
+        print("\nper map:")
+        for map_name, m in summary["per_map"].items():
+            print(f" - {map_name}: {m['correct']}/{m['frames']} ({m['accuracy']:.1%})")
+    if summary["confusion"]:
+        print("\nmost common confusions (label -> predicted):")
+        for c in summary["confusion"][:top_confusions]:
+            print(f" - {c['label']} -> {c['predicted']}: {c['count']}")
+
+
+# prints accuracy, fps, stage latency and per-map accuracy changes against an earlier result file
+def print_comparison(summary, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\ncompared with {baseline_path}:")
+    if summary["accuracy"] is not None and baseline.get("accuracy") is not None:
+        print(f"accuracy {baseline['accuracy']:.2%} -> {summary['accuracy']:.2%} "
+              f"({(summary['accuracy'] - baseline['accuracy']) * 100:+.2f} pts)")
+    print(f"fps      {baseline['fps']:.1f} -> {summary['fps']:.1f} ({summary['fps'] / max(baseline['fps'], 1e-9):.2f}x)")
+    for stage, s in summary["stages"].items():
+        old = baseline["stages"].get(stage)
+        if old:
+            print(f"{stage:<8} p50 {old['p50_ms']:.2f} -> {s['p50_ms']:.2f} ms, p95 {old['p95_ms']:.2f} -> {s['p95_ms']:.2f} ms, "
+                  f"p99 {old['p99_ms']:.2f} -> {s['p99_ms']:.2f} ms")
+    for map_name, m in summary["per_map"].items():
+        old = baseline["per_map"].get(map_name)
+        if old and abs(old["accuracy"] - m["accuracy"]) > 1e-9:
+            print(f" - {map_name}: {old['accuracy']:.1%} -> {m['accuracy']:.1%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay labeled frames through the detection pipeline.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--images", help="directory of labeled screenshots")
+    source.add_argument("--video", help="recorded stream to sample frames from")
+    source.add_argument("--synthetic", type=int, help="number of rendered objective banners")
+    parser.add_argument("--video-labels", help="CSV of start,end,map spans (seconds) for --video")
+    parser.add_argument("--sample-every", type=float, default=5.0, help="seconds between sampled video frames")
+    parser.add_argument("--seed", type=int, default=0, help="first seed for --synthetic")
+    parser.add_argument("--workers", type=int, default=0, help="replay processes (0 = serial)")
+    parser.add_argument("--ocr-backend", default="tesserocr", choices=["tesserocr", "pytesseract"])
+    parser.add_argument("--output", help="write the result JSON here")
+    parser.add_argument("--compare", help="earlier result JSON to compare against")
+    args = parser.parse_args()
+
+    if args.images:
+        items = image_items(args.images)
+    elif args.video:
+        # decoded lazily, so only the frames in flight are held in memory
+        items = video_items(args.video, load_video_labels(args.video_labels), args.sample_every)
+    else:
+        items = [("synthetic", args.seed + i) for i in range(args.synthetic)]
+
+    config = {
+        "source": args.images or args.video or f"synthetic:{args.synthetic}@{args.seed}",
+        "workers": args.workers,
+        "ocr_backend": args.ocr_backend,
+        "started": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    results, elapsed = run_items(items, args.workers, args.ocr_backend)
+    if not results:
+        raise SystemExit("nothing to replay")
+    summary = summarize(results, elapsed, config)
+    print_summary(summary)
+    if args.compare:
+        print_comparison(summary, args.compare)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"\nwrote {args.output}")
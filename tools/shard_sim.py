@@ -0,0 +1,186 @@
+# runs several ShardCoordinator nodes as local processes against a local MySQL/MariaDB with short
+# leases: one node is killed mid-run, a new one joins later and another shuts down cleanly. Every
+# node logs its (simulated) captures, and the log is checked for a streamer captured by two nodes
+# at once, for how long the dead and the stopped node's streamers took to move, and for how
+# evenly the roster ended up spread.
+#
+#   MYSQL_HOST=127.0.0.1 MYSQL_USER=root MYSQL_PASSWORD=... MYSQL_DATABASE=twitch_data \
+#       python -m tools.shard_sim --nodes 3 --streamers 60 --seconds 60
+#
+# leases go into scratch tables (shard_sim_nodes, shard_sim_leases) that are dropped afterwards.
+import argparse
+import multiprocessing
+import os
+import queue
+import time
+from collections import Counter, defaultdict
+import mysql.connector
+
+from sharding import ShardCoordinator, ensure_shard_tables
+
+DB_CONFIG = {
+    "host":     os.environ.get("MYSQL_HOST"),
+    "user":     os.environ.get("MYSQL_USER"),
+    "password": os.environ.get("MYSQL_PASSWORD"),
+    "database": os.environ.get("MYSQL_DATABASE"),
+}
+
+SIM_NODES = "shard_sim_nodes"
+SIM_LEASES = "shard_sim_leases"
+
+
+def connect():
+    return mysql.connector.connect(**DB_CONFIG, connection_timeout=5)
+
+
+# drops the scratch tables, recreating them empty unless create is False
+def reset_tables(create=True):
+    conn = connect()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f"DROP TABLE IF EXISTS {SIM_NODES}, {SIM_LEASES}")
+        cursor.close()
+        if create:
+            ensure_shard_tables(conn, SIM_NODES, SIM_LEASES)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+# one tracker node: renews leases on its schedule and "captures" every streamer it holds each sweep
+def run_node(node_id, roster, options, events, stop):
+    coordinator = ShardCoordinator(connect, node_id, lease_ttl=options.ttl, node_timeout=options.node_timeout,
+                                   safety_margin=options.margin, nodes_table=SIM_NODES, leases_table=SIM_LEASES)
+    parent = os.getppid()
+    next_renewal = 0
+    # a node whose simulation was killed stops instead of heartbeating on as an orphan
+    while not stop.is_set() and os.getppid() == parent:
+        if time.monotonic() >= next_renewal:
+            coordinator.renew(roster)
+            next_renewal = time.monotonic() + options.renew
+        for streamer in roster:
+            if coordinator.holds(streamer):
+                start = time.time()
+                # stands in for taking a frame from the streamer's grabber
+                time.sleep(options.capture_seconds)
+                events.put((streamer, node_id, start, time.time()))
+        stop.wait(options.sweep)
+    coordinator.close()
+
+
+# pairs of captures of the same streamer by different nodes that overlap in time
+def find_overlaps(captures):
+    overlaps = []
+    for streamer, spans in captures.items():
+        active = []
+        for node, start, end in sorted(spans, key=lambda span: span[1]):
+            active = [span for span in active if span[2] > start]
+            overlaps.extend((streamer, other, node, start) for other, _, _ in active if other != node)
+            active.append((node, start, end))
+    return overlaps
+
+
+# seconds from when a node went away until each streamer it was capturing then was captured by another node
+def handover_delays(captures, node, since):
+    delays = []
+    for spans in captures.values():
+        before = [(start, owner) for owner, start, _ in spans if start <= since]
+        if not before or max(before)[1] != node:
+            continue
+        after = [start for owner, start, _ in spans if owner != node and start > since]
+        delays.append(min(after) - since if after else float("inf"))
+    return delays
+
+
+def describe(delays):
+    if not delays:
+        return "no streamers"
+    if float("inf") in delays:
+        return f"{delays.count(float('inf'))}/{len(delays)} streamers never moved"
+    return f"{len(delays)} streamers moved in {sum(delays) / len(delays):.1f}s on average, {max(delays):.1f}s at most"
+
+
+def run(options):
+    reset_tables()
+    roster = [f"streamer{i:03d}" for i in range(options.streamers)]
+    events = multiprocessing.Queue()
+    nodes = {}
+
+    def start_node(node_id):
+        stop = multiprocessing.Event()
+        process = multiprocessing.Process(target=run_node, args=(node_id, roster, options, events, stop), daemon=True)
+        process.start()
+        nodes[node_id] = (process, stop)
+
+    captures = defaultdict(list)
+
+    def drain(until):
+        while time.time() < until:
+            try:
+                streamer, node, start, end = events.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            captures[streamer].append((node, start, end))
+
+    started = time.time()
+    for i in range(options.nodes):
+        start_node(f"node-{i}")
+    # the first node is killed without releasing anything, a new node joins, then the second
+    # node shuts down cleanly
+    drain(started + options.seconds * 0.3)
+    killed_at = time.time()
+    nodes["node-0"][0].kill()
+    print(f"{killed_at - started:5.1f}s killed node-0")
+    drain(started + options.seconds * 0.6)
+    print(f"{time.time() - started:5.1f}s node-{options.nodes} joins")
+    start_node(f"node-{options.nodes}")
+    drain(started + options.seconds * 0.8)
+    stopped_at = time.time()
+    nodes["node-1"][1].set()
+    print(f"{stopped_at - started:5.1f}s stopping node-1")
+    drain(started + options.seconds)
+    for process, stop in nodes.values():
+        # the killed node may have died inside stop.wait(), leaving the event's lock held
+        if process.is_alive():
+            stop.set()
+    # nodes only exit once their queued captures are read, so keep draining while they release
+    deadline = time.time() + options.ttl + 5
+    while any(process.is_alive() for process, _ in nodes.values()) and time.time() < deadline:
+        drain(time.time() + 0.2)
+    drain(time.time() + 0.5)
+    reset_tables(create=False)
+
+    total = sum(len(spans) for spans in captures.values())
+    overlaps = find_overlaps(captures)
+    bound = max(options.ttl, options.node_timeout) + options.renew
+    print(f"\n{total} captures of {len(roster)} streamers by {len(nodes)} nodes over {options.seconds:.0f}s "
+          f"(lease {options.ttl}s, renewal every {options.renew}s, node timeout {options.node_timeout}s)")
+    print(f"captured by two nodes at once: {len(overlaps)}")
+    for streamer, first, second, start in overlaps[:10]:
+        print(f" - {streamer}: {first} and {second} at {start - started:.2f}s")
+    print(f"killed node-0: {describe(handover_delays(captures, 'node-0', killed_at))} (bound {bound}s)")
+    print(f"stopped node-1: {describe(handover_delays(captures, 'node-1', stopped_at))}")
+    tail = started + options.seconds * 0.9
+    final = Counter()
+    for streamer, spans in captures.items():
+        owners = [node for node, start, _ in spans if start >= tail]
+        if owners:
+            final[owners[-1]] += 1
+    print(f"final split: {', '.join(f'{node} {count}' for node, count in sorted(final.items()))}, "
+          f"{len(roster) - sum(final.values())} uncovered")
+    return not overlaps
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate several sharded tracker nodes against MySQL/MariaDB.")
+    parser.add_argument("--nodes", type=int, default=3)
+    parser.add_argument("--streamers", type=int, default=60)
+    parser.add_argument("--seconds", type=float, default=60)
+    parser.add_argument("--ttl", type=float, default=6, help="lease TTL in seconds")
+    parser.add_argument("--renew", type=float, default=2, help="seconds between lease renewals")
+    parser.add_argument("--node-timeout", type=float, default=6)
+    parser.add_argument("--margin", type=float, default=1.5, help="stop capturing this long before a lease expires")
+    parser.add_argument("--sweep", type=float, default=0.25, help="seconds between capture sweeps")
+    parser.add_argument("--capture-seconds", type=float, default=0.002)
+    args = parser.parse_args()
+    raise SystemExit(0 if run(args) else 1)
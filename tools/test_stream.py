@@ -0,0 +1,164 @@
+# runs a FrameGrabber against a local ffmpeg-generated test stream
+#
+#   python -m tools.test_stream --mode lavfi --seconds 15
+#   python -m tools.test_stream --mode hls --seconds 30    # ffmpeg -> HLS -> http.server -> streamlink
+#   python -m tools.test_stream --mode calibrate           # 1080p/720p/480p ladder through calibration.Calibrator
+#
+# halfway through the run the pipeline is killed to check that the grabber restarts. The calibrate
+# mode streams a rendered objective banner at three renditions and calibrates against it with
+# main.detect_frame (Tesseract required), printing the chosen rendition and measured savings.
+import argparse
+import functools
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import grabber as grabber_module
+from grabber import FrameGrabber
+from tools.replay import synthetic_frame
+
+TEST_SOURCE = ["-re", "-f", "lavfi", "-i", "testsrc2=size=1280x720:rate=30"]
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+# ffmpeg writes a rolling HLS playlist into directory, served over a local HTTP server
+# (mpeg4 in fMP4 segments keeps the test independent of libx264 being compiled into ffmpeg)
+def start_hls_source(directory):
+    encoder = subprocess.Popen(
+        ["ffmpeg", "-hide_banner", "-loglevel", "error", *TEST_SOURCE,
+         "-c:v", "mpeg4", "-q:v", "5", "-g", "30", "-f", "hls",
+         "-hls_time", "1", "-hls_list_size", "5", "-hls_flags", "delete_segments", "-hls_segment_type", "fmp4",
+         os.path.join(directory, "index.m3u8")],
+        stdin=subprocess.DEVNULL,
+    )
+    handler = functools.partial(QuietHandler, directory=directory)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    playlist = os.path.join(directory, "index.m3u8")
+    while not os.path.exists(playlist):
+        time.sleep(0.2)
+    return encoder, server, f"hls://http://127.0.0.1:{server.server_address[1]}/index.m3u8"
+
+
+# (width, height) of each rendition in the calibrate mode's HLS ladder
+LADDER = [(1920, 1080), (1280, 720), (854, 480)]
+LADDER_FPS = 5
+
+
+# feeds a rendered banner frame to ffmpeg, which writes a multi-variant HLS ladder with a master playlist
+def start_ladder_source(directory, seed=3):
+    width, height = LADDER[0]
+    split = "".join(f"[s{i}]" for i in range(len(LADDER)))
+    scales = ";".join(f"[s{i}]scale={w}:{h}[v{i}]" for i, (w, h) in enumerate(LADDER))
+    maps = [arg for i in range(len(LADDER)) for arg in ("-map", f"[v{i}]")]
+    encoder = subprocess.Popen(
+        ["ffmpeg", "-hide_banner", "-loglevel", "error",
+         "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{width}x{height}", "-r", str(LADDER_FPS), "-i", "pipe:0",
+         "-filter_complex", f"[0:v]split={len(LADDER)}{split};{scales}", *maps,
+         "-c:v", "mpeg4", "-q:v", "5", "-g", str(LADDER_FPS), "-f", "hls",
+         "-hls_time", "1", "-hls_list_size", "5", "-hls_flags", "delete_segments", "-hls_segment_type", "fmp4",
+         "-master_pl_name", "master.m3u8", "-var_stream_map", " ".join(f"v:{i}" for i in range(len(LADDER))),
+         os.path.join(directory, "stream_%v.m3u8")],
+        stdin=subprocess.PIPE,
+    )
+    frame = synthetic_frame(seed, width, height)[0].tobytes()
+
+    def feed():
+        start = time.time()
+        count = 0
+        try:
+            while encoder.poll() is None:
+                encoder.stdin.write(frame)
+                count += 1
+                time.sleep(max(0.0, start + count / LADDER_FPS - time.time()))
+        except (BrokenPipeError, ValueError):
+            pass
+
+    threading.Thread(target=feed, daemon=True).start()
+    handler = functools.partial(QuietHandler, directory=directory)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    while not os.path.exists(os.path.join(directory, "master.m3u8")):
+        time.sleep(0.2)
+    # let every variant playlist list a few segments before streamlink reads them
+    time.sleep(3)
+    return encoder, server, f"hls://http://127.0.0.1:{server.server_address[1]}/master.m3u8"
+
+
+def run_calibration(detect=None):
+    import main
+    from calibration import CalibrationCache, Calibrator, print_savings, list_renditions
+    directory = tempfile.mkdtemp(prefix="grabber-ladder-")
+    encoder, server, url = start_ladder_source(directory)
+    calibrator = None
+    try:
+        print(f"renditions: {list_renditions(url)}")
+        cache = CalibrationCache(os.path.join(directory, "calibration.json"))
+        calibrator = Calibrator(cache, detect or main.detect_frame, stream_url=url)
+        entry = calibrator.calibrate("teststream")
+        print_savings(cache)
+    finally:
+        if calibrator is not None:
+            calibrator.close()
+        encoder.kill()
+        encoder.wait()
+        server.shutdown()
+        shutil.rmtree(directory, ignore_errors=True)
+    ok = entry is not None
+    print(f"{'OK' if ok else 'FAILED'}: {entry['quality'] if ok else 'no calibration'}")
+    return ok
+
+
+def run(mode, seconds, fps):
+    grabber_module.RESTART_DELAY = 1
+    encoder = server = directory = None
+    if mode == "hls":
+        directory = tempfile.mkdtemp(prefix="grabber-hls-")
+        encoder, server, url = start_hls_source(directory)
+        grabber = FrameGrabber("teststream", fps=fps, stream_url=url)
+    else:
+        grabber = FrameGrabber("teststream", fps=fps, input_args=TEST_SOURCE)
+
+    grabber.start()
+    start = time.time()
+    killed = False
+    try:
+        while time.time() - start < seconds:
+            time.sleep(1)
+            latest = grabber.latest_frame(max_age=5)
+            shape = latest[0].shape if latest else None
+            print(f"{time.time() - start:5.1f}s frames={grabber.frames_read} restarts={grabber.restarts} latest={shape}")
+            if not killed and time.time() - start > seconds / 2 and grabber.running:
+                print("killing ffmpeg to simulate a stream drop")
+                grabber._ffmpeg.kill()
+                killed = True
+    finally:
+        grabber.stop()
+        if encoder is not None:
+            encoder.terminate()
+            encoder.wait()
+            server.shutdown()
+            shutil.rmtree(directory, ignore_errors=True)
+
+    ok = grabber.frames_read > 0 and (not killed or grabber.restarts > 0)
+    print(f"{'OK' if ok else 'FAILED'}: {grabber.frames_read} frames, {grabber.restarts} restarts")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exercise a FrameGrabber against a local test stream.")
+    parser.add_argument("--mode", choices=["lavfi", "hls", "calibrate"], default="lavfi")
+    parser.add_argument("--seconds", type=float, default=15)
+    parser.add_argument("--fps", type=float, default=1)
+    args = parser.parse_args()
+    if args.mode == "calibrate":
+        raise SystemExit(0 if run_calibration() else 1)
+    raise SystemExit(0 if run(args.mode, args.seconds, args.fps) else 1)